@@ -0,0 +1,97 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(BENCH_DIR.parent), str(BENCH_DIR.parent / 'src')]
+
+import numpy as np
+import pandas as pd
+
+from schema import apply_dtype_plan, dtype_plan
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_numeric_data, fill_nan_numeric_data, round_metrics, clean_fill_round_metrics
+from synthetic import generate_country_sheet
+
+logger = logging.getLogger('benchmarks')
+
+RESULTS_DIR = BENCH_DIR / 'results'
+
+SIZES = {'60k': 60_000, '1m': 1_000_000, '10m': 10_000_000}
+
+
+def three_steps(df):
+    return round_metrics(fill_nan_numeric_data(clean_numeric_data(df)))
+
+
+IMPLEMENTATIONS = [
+    ('clean + fill + round', three_steps),
+    ('clean_fill_round_metrics', clean_fill_round_metrics),
+]
+
+
+def numeric_input(rows, seed, float_dtype):
+    """Entrada da etapa numérica: planilha sintética já com o plano de tipos e as transformações textuais."""
+
+    df = apply_dtype_plan(generate_country_sheet(rows, seed), dtype_plan(float_dtype=float_dtype))
+    return clean_text_data(normalize_text_data(normalize_text_columns(df)))
+
+
+
+def best_seconds(func, df, repeat):
+    """Menor tempo de parede de `repeat` execuções, cada uma sobre uma cópia nova da entrada."""
+
+    timings = []
+    for _ in range(repeat):
+        data = df.copy()
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vazão da etapa numérica: as três funções de referência contra o bloco 2D fundido.")
+    parser.add_argument('--sizes', default='60k,1m', help=f"tamanhos separados por vírgula ({', '.join(SIZES)})")
+    parser.add_argument('--repeat', type=int, default=5, help="execuções por implementação (vale a mais rápida)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--metric-dtype', default='float64', choices=('float64', 'float32'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+
+    results = []
+    for label in args.sizes.split(','):
+        label = label.strip().lower()
+        if label not in SIZES:
+            parser.error(f"tamanho desconhecido: '{label}' (opções: {', '.join(SIZES)})")
+
+        df = numeric_input(SIZES[label], args.seed, args.metric_dtype)
+
+        # as duas implementações precisam concordar antes de serem comparadas
+        pd.testing.assert_frame_equal(clean_fill_round_metrics(df.copy()), three_steps(df.copy()))
+
+        logger.info(f"⏱️  {label}: {len(df):,} linhas na entrada da etapa numérica ({args.metric_dtype})")
+        timings = {name: best_seconds(func, df, args.repeat) for name, func in IMPLEMENTATIONS}
+        reference = timings[IMPLEMENTATIONS[0][0]]
+
+        for name, seconds in timings.items():
+            logger.info(f"   {name:<28} {seconds:>8.4f}s   {len(df) / seconds / 1e6:>7.2f} M linhas/s   {reference / seconds:>5.2f}x")
+
+        results.append({'size': label, 'rows': len(df), 'metric_dtype': args.metric_dtype, 'seconds': timings})
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    result_path = RESULTS_DIR / f"numeric_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    result_path.write_text(json.dumps({'numpy': np.__version__, 'pandas': pd.__version__, 'results': results}, indent=2), encoding='utf-8')
+    logger.info(f"📁 Resultado salvo em {result_path}")
+
+
+
+if __name__ == "__main__":
+    main()
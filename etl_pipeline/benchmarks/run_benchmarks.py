@@ -0,0 +1,247 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(BENCH_DIR.parent), str(BENCH_DIR.parent / 'src')]
+
+import numpy as np
+import pandas as pd
+
+from metrics import start_run, stage_records, measure, run_stage
+from extract import extract_data
+from schema import apply_dtype_plan
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_numeric_data, fill_nan_numeric_data, round_metrics
+from validation import validate_data
+from synthetic import generate_country_sheet, write_workbook, EXCEL_MAX_ROWS
+
+logger = logging.getLogger('benchmarks')
+
+SIZES = {'60k': 60_000, '1m': 1_000_000, '10m': 10_000_000}
+
+DATA_DIR = BENCH_DIR / '.data'
+BASELINE_DIR = BENCH_DIR / 'baselines'
+RESULTS_DIR = BENCH_DIR / 'results'
+
+# tolerância sobre a baseline antes de considerar regressão
+DEFAULT_THRESHOLD = float(os.getenv('BENCH_THRESHOLD', '0.25'))
+# etapas muito curtas oscilam mais que isso só por ruído; abaixo desse delta não há regressão
+MIN_DELTA_SECONDS = 0.05
+
+TRANSFORMS = [
+    ('normalize_text_columns', normalize_text_columns),
+    ('normalize_text_data', normalize_text_data),
+    ('clean_text_data', clean_text_data),
+    ('clean_numeric_data', clean_numeric_data),
+    ('fill_nan_numeric_data', fill_nan_numeric_data),
+    ('round_metrics', round_metrics),
+]
+
+
+def standin_database_url():
+    """
+    URL do banco usado na etapa de carga.
+
+    BENCH_DATABASE_URL tem prioridade (ex.: um Postgres descartável em Docker). Sem ela, usa um
+    Postgres embutido via pgserver (benchmarks/requirements.txt) em benchmarks/.data/pg. A carga usa
+    COPY, TRUNCATE ... RESTART IDENTITY e pg_get_serial_sequence, então o substituto precisa ser Postgres.
+
+    Returns:
+        str | None: URL de conexão, ou None se nenhum banco estiver disponível.
+    """
+
+    url = os.getenv('BENCH_DATABASE_URL')
+    if url:
+        return url
+
+    try:
+        import pgserver
+    except ImportError:
+        return None
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    server = pgserver.get_server(DATA_DIR / 'pg', cleanup_mode='stop')
+    if 'renewable_energy_bench' not in server.psql("SELECT datname FROM pg_database;"):
+        server.psql("CREATE DATABASE renewable_energy_bench;")
+    return server.get_uri('renewable_energy_bench')
+
+
+
+def synthetic_workbook(rows, seed):
+    """Gera (ou reaproveita de benchmarks/.data) a planilha sintética, limitada a EXCEL_MAX_ROWS linhas."""
+
+    rows = min(rows, EXCEL_MAX_ROWS)
+    path = DATA_DIR / f"country_{rows}_{seed}.xlsx"
+
+    if not path.exists():
+        logger.info(f"📝 Gerando planilha sintética com {rows:,} linhas em {path}")
+        write_workbook(generate_country_sheet(rows, seed), path)
+
+    return path
+
+
+
+def run_once(rows, seed, database_url):
+    """Executa todas as etapas uma vez e devolve os registros de medição por etapa."""
+
+    start_run('benchmark')
+
+    # a extração lê a planilha real; acima do limite do Excel, as etapas seguintes recebem o
+    # DataFrame gerado em memória com o mesmo plano de tipos
+    workbook = synthetic_workbook(rows, seed)
+    with measure('extract') as record:
+        df = extract_data(workbook, use_cache=False)
+        record['rows_out'] = len(df)
+
+    if rows > len(df):
+        df = apply_dtype_plan(generate_country_sheet(rows, seed))
+
+    for stage, function in TRANSFORMS:
+        df = run_stage(stage, function, df)
+
+    run_stage('validate_data', validate_data, df, fail_fast=False)
+
+    if database_url:
+        from load import load_data
+        run_stage('load_data', load_data, df, mode='full')
+
+    return stage_records()
+
+
+
+def summarize(records):
+    """Agrega os registros por etapa (etapas repetidas são somadas)."""
+
+    stages = {}
+    for record in records:
+        stage = stages.setdefault(record['stage'], {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows_in': None,
+                                                    'rows_out': None, 'peak_rss_delta_bytes': 0})
+        stage['wall_seconds'] = round(stage['wall_seconds'] + record['wall_seconds'], 6)
+        stage['cpu_seconds'] = round(stage['cpu_seconds'] + record['cpu_seconds'], 6)
+        stage['peak_rss_delta_bytes'] += record.get('peak_rss_delta_bytes') or 0
+        stage['rows_in'] = record['rows_in'] if stage['rows_in'] is None else stage['rows_in']
+        stage['rows_out'] = record['rows_out']
+    return stages
+
+
+
+def benchmark_size(label, rows, repeat, seed, database_url):
+    """Roda `repeat` vezes e mantém, por etapa, a medição mais rápida."""
+
+    best = {}
+    for _ in range(repeat):
+        for stage, result in summarize(run_once(rows, seed, database_url)).items():
+            if stage not in best or result['wall_seconds'] < best[stage]['wall_seconds']:
+                best[stage] = result
+
+    return {
+        'size': label,
+        'rows': rows,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'load': 'postgres' if database_url else 'skipped',
+        'stages': best,
+    }
+
+
+
+def compare(result, baseline, threshold):
+    """
+    Compara o tempo de parede de cada etapa com a baseline.
+
+    Returns:
+        list[str]: Etapas mais lentas que baseline * (1 + threshold), com delta acima de MIN_DELTA_SECONDS.
+    """
+
+    regressions = []
+
+    for stage, current in result['stages'].items():
+        reference = baseline['stages'].get(stage)
+        if reference is None:
+            logger.info(f"   {stage:<45} {current['wall_seconds']:>9.3f}s   (sem baseline)")
+            continue
+
+        before, after = reference['wall_seconds'], current['wall_seconds']
+        ratio = after / before if before else float('inf')
+        regressed = after > before * (1 + threshold) and after - before > MIN_DELTA_SECONDS
+        marker = '❌' if regressed else '  '
+
+        logger.info(f"{marker} {stage:<45} {after:>9.3f}s   baseline {before:>9.3f}s   {ratio:>6.2f}x")
+        if regressed:
+            regressions.append(stage)
+
+    return regressions
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline com planilhas sintéticas no formato da IRENA.")
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f"tamanhos separados por vírgula ({', '.join(SIZES)})")
+    parser.add_argument('--repeat', type=int, default=1, help="execuções por tamanho (vale a mais rápida)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="tolerância de lentidão (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="grava o resultado como nova baseline")
+    parser.add_argument('--skip-load', action='store_true', help="não mede a carga no banco")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+
+    database_url = None if args.skip_load else standin_database_url()
+    if database_url:
+        # get_engine() mantém uma engine por URL: a do benchmark ganha seu próprio pool
+        os.environ.pop('DATABASE_URL_DOCKER', None)
+        os.environ['DATABASE_URL'] = database_url
+    elif not args.skip_load:
+        logger.warning("⚠️ Nenhum banco disponível (BENCH_DATABASE_URL ou pgserver): etapa de carga ignorada")
+
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    failed = []
+    for label in args.sizes.split(','):
+        label = label.strip().lower()
+        if label not in SIZES:
+            parser.error(f"tamanho desconhecido: '{label}' (opções: {', '.join(SIZES)})")
+
+        logger.info("=" * 60)
+        logger.info(f"⏱️  BENCHMARK {label} ({SIZES[label]:,} linhas)")
+        logger.info("=" * 60)
+
+        result = benchmark_size(label, SIZES[label], args.repeat, args.seed, database_url)
+
+        result_path = RESULTS_DIR / f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        result_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+
+        baseline_path = BASELINE_DIR / f"{label}.json"
+        if args.update_baseline or not baseline_path.exists():
+            baseline_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+            for stage, current in result['stages'].items():
+                logger.info(f"   {stage:<45} {current['wall_seconds']:>9.3f}s")
+            logger.info(f"📁 Baseline gravada em {baseline_path}")
+            continue
+
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            logger.error(f"❌ {label}: {len(regressions)} etapas acima de {args.threshold:.0%} da baseline: {regressions}")
+            failed.append(label)
+
+    return 1 if failed else 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from schema import SOURCE_COLUMNS, METRIC_COLUMNS
+from transform.rules import INVALID_COUNTRIES
+
+
+# Limite de linhas de uma aba do Excel (sem contar o cabeçalho)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Regiões e sub-regiões M49, como aparecem na aba 'Country' da IRENA
+REGIONS = {
+    'Africa': ['Northern Africa', 'Sub-Saharan Africa'],
+    'Americas': ['Latin America and the Caribbean', 'Northern America'],
+    'Asia': ['Central Asia', 'Eastern Asia', 'South-eastern Asia', 'Southern Asia', 'Western Asia'],
+    'Europe': ['Eastern Europe', 'Northern Europe', 'Southern Europe', 'Western Europe'],
+    'Oceania': ['Australia and New Zealand', 'Melanesia', 'Micronesia', 'Polynesia'],
+}
+
+# (RE or Non-RE, Group Technology, Technology, Sub-Technology)
+TECHNOLOGIES = [
+    ('Total Renewable', 'Solar energy', 'Solar photovoltaic', 'On-grid Solar photovoltaic'),
+    ('Total Renewable', 'Solar energy', 'Solar photovoltaic', 'Off-grid Solar photovoltaic'),
+    ('Total Renewable', 'Solar energy', 'Solar thermal energy', 'Concentrated solar power'),
+    ('Total Renewable', 'Wind energy', 'Onshore wind energy', 'Onshore wind energy'),
+    ('Total Renewable', 'Wind energy', 'Offshore wind energy', 'Offshore wind energy'),
+    ('Total Renewable', 'Hydropower (excl. Pumped Storage)', 'Renewable hydropower', 'Renewable hydropower'),
+    ('Total Renewable', 'Hydropower (excl. Pumped Storage)', 'Mixed Hydro Plants', 'Mixed Hydro Plants'),
+    ('Total Renewable', 'Bioenergy', 'Solid biofuels', 'Bagasse'),
+    ('Total Renewable', 'Bioenergy', 'Solid biofuels', 'Rice husks'),
+    ('Total Renewable', 'Bioenergy', 'Solid biofuels', 'Other primary solid biofuels n.e.s.'),
+    ('Total Renewable', 'Bioenergy', 'Renewable municipal waste', 'Renewable municipal waste'),
+    ('Total Renewable', 'Bioenergy', 'Biogas', 'Landfill gas'),
+    ('Total Renewable', 'Bioenergy', 'Biogas', 'Other biogases from anaerobic fermentation'),
+    ('Total Renewable', 'Bioenergy', 'Liquid biofuels', 'Advanced biodiesel'),
+    ('Total Renewable', 'Geothermal energy', 'Geothermal energy', 'Geothermal energy'),
+    ('Total Renewable', 'Marine energy', 'Marine energy', 'Marine energy'),
+    ('Total Non-Renewable', 'Fossil fuels', 'Coal and peat', 'Coal and peat'),
+    ('Total Non-Renewable', 'Fossil fuels', 'Natural gas', 'Natural gas'),
+    ('Total Non-Renewable', 'Fossil fuels', 'Oil', 'Crude oil'),
+    ('Total Non-Renewable', 'Fossil fuels', 'Fossil fuels n.e.s.', 'Fossil fuels n.e.s.'),
+    ('Total Non-Renewable', 'Nuclear', 'Nuclear', 'Nuclear'),
+    ('Total Non-Renewable', 'Pumped storage', 'Pumped storage', 'Pumped storage'),
+    ('Total Non-Renewable', 'Other non-renewable energy', 'Other non-renewable energy', 'Other non-renewable energy'),
+]
+
+PRODUCER_TYPES = ['On-grid electricity', 'Off-grid electricity']
+
+N_COUNTRIES = 230
+FIRST_YEAR = 2000
+N_YEARS = 24
+
+# fração de valores com espaços e caixa irregulares, e de métricas vazias
+DIRTY_RATE = 0.05
+NULL_RATE = 0.4
+
+
+def _countries():
+    """Países sintéticos (nome, ISO3, M49, região, sub-região) seguidos dos agregados inválidos da IRENA."""
+
+    subregions = [(region, sub) for region, subs in REGIONS.items() for sub in subs]
+    countries = []
+
+    for i in range(N_COUNTRIES):
+        region, sub_region = subregions[i % len(subregions)]
+        iso3 = ''.join(chr(ord('A') + (i // 26 ** k) % 26) for k in (2, 1, 0))
+        countries.append((f"Country {i:03d}", iso3, 4 + i * 3, region, sub_region))
+
+    # agregados que clean_text_data descarta (sem região nem código)
+    countries += [(name, None, None, None, None) for name in INVALID_COUNTRIES]
+    return countries
+
+
+
+def _dirty(codes, values, rng):
+    """
+    Categórico com uma variante "suja" (espaços e minúsculas) de cada valor, sorteada em DIRTY_RATE das linhas.
+    As categorias ficam [limpas..., sujas...], então o código sujo é o código limpo + len(values);
+    o código -1 (nulo) é preservado.
+    """
+
+    categories = list(values) + [f"  {value.lower()} " for value in values]
+    dirty = (rng.random(len(codes)) < DIRTY_RATE) & (codes >= 0)
+    return pd.Categorical.from_codes(codes + dirty * len(values), categories=categories)
+
+
+
+def generate_country_sheet(rows, seed=0):
+    """
+    Gera uma aba 'Country' sintética no formato da IRENA, com os cabeçalhos originais.
+
+    As cardinalidades seguem o arquivo real: 5 regiões, 17 sub-regiões, ~230 países mais os
+    agregados inválidos, 23 sub-tecnologias e 2 tipos de produtor. A chave composta
+    (país, ano, tecnologia, sub-tecnologia, produtor) é única: as combinações são sorteadas sem
+    reposição e, acima de ~130 mil linhas, a faixa de anos é estendida para caber o volume pedido.
+
+    Args:
+        rows (int): Quantidade de linhas.
+        seed (int): Semente do gerador aleatório.
+
+    Returns:
+        pd.DataFrame: Colunas textuais como categóricas (com variantes sujas) e métricas float64.
+    """
+
+    rng = np.random.default_rng(seed)
+    countries = _countries()
+
+    per_year = len(countries) * len(TECHNOLOGIES) * len(PRODUCER_TYPES)
+    # no máximo metade da grade ocupada, para o sorteio não ficar denso demais
+    years = max(N_YEARS, math.ceil(2 * rows / per_year))
+
+    combos = rng.choice(per_year * years, size=rows, replace=False)
+    country, tech, producer, year = np.unravel_index(combos, (len(countries), len(TECHNOLOGIES), len(PRODUCER_TYPES), years))
+
+    names, iso3, m49, region, sub_region = zip(*countries)
+    region_codes = {name: code for code, name in enumerate(REGIONS)}
+    subregion_names = [sub for subs in REGIONS.values() for sub in subs]
+    subregion_codes = {name: code for code, name in enumerate(subregion_names)}
+
+    def lookup(values, mapping):
+        table = np.array([mapping.get(value, -1) for value in values])
+        return table[country]
+
+    re_or_not, group, technology, sub_technology = (list(column) for column in zip(*TECHNOLOGIES))
+
+    df = pd.DataFrame({
+        'Region': _dirty(lookup(region, region_codes), list(REGIONS), rng),
+        'Sub-region': _dirty(lookup(sub_region, subregion_codes), subregion_names, rng),
+        'Country': _dirty(country, list(names), rng),
+        'ISO3 code': pd.Categorical.from_codes(np.where(country < N_COUNTRIES, country, -1), categories=list(iso3[:N_COUNTRIES])),
+        'M49 code': pd.array(np.array(m49, dtype=object)[country], dtype='Int64'),
+        'RE or Non-RE': pd.Categorical(np.array(re_or_not, dtype=object)[tech]),
+        'Group Technology': pd.Categorical(np.array(group, dtype=object)[tech]),
+        'Technology': pd.Categorical(np.array(technology, dtype=object)[tech]),
+        'Sub-Technology': pd.Categorical(np.array(sub_technology, dtype=object)[tech]),
+        'Producer Type': pd.Categorical.from_codes(producer, categories=PRODUCER_TYPES),
+        'Year': (FIRST_YEAR + year).astype('float64'),
+    })
+
+    # métricas: distribuição log-normal, ~40% vazias e ~10% de linhas zeradas
+    metrics = rng.lognormal(mean=3, sigma=2, size=(rows, 6))
+    metrics[rng.random((rows, 6)) < NULL_RATE] = np.nan
+    metrics[rng.random(rows) < 0.1] = 0
+
+    metric_headers = [header for header, name in SOURCE_COLUMNS.items() if name in METRIC_COLUMNS]
+    for position, header in enumerate(metric_headers):
+        df[header] = metrics[:, position]
+
+    return df[list(SOURCE_COLUMNS)]
+
+
+
+def write_workbook(df, path, max_rows=EXCEL_MAX_ROWS):
+    """
+    Grava o DataFrame como .xlsx com uma aba 'Country' (openpyxl em modo write-only).
+
+    Args:
+        df (pd.DataFrame): Dados gerados por generate_country_sheet.
+        path (Path): Arquivo de destino.
+        max_rows (int): Linhas gravadas no máximo (o Excel não comporta mais que EXCEL_MAX_ROWS).
+
+    Returns:
+        int: Quantidade de linhas gravadas.
+    """
+
+    rows = min(len(df), max_rows)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Country')
+    sheet.append(list(df.columns))
+
+    frame = df.iloc[:rows].astype(object)
+    for values in frame.itertuples(index=False, name=None):
+        sheet.append([None if pd.isna(value) else value for value in values])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook.save(path)
+    return rows
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera uma planilha sintética no formato da IRENA.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output', type=Path)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = write_workbook(generate_country_sheet(args.rows, args.seed), args.output)
+    print(f"✅ {written:,} linhas gravadas em {args.output}")
@@ -1,16 +1,21 @@
 import os
+import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.exc import OperationalError
 import logging
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 logger.propagate = False
 
+# as novas tentativas de conexão precisam chegar ao log do pipeline (console e etl.jsonl), que só tem
+# handlers na raiz: vão por um logger próprio, que propaga
+pool_logger = logging.getLogger('database')
 
-load_dotenv() 
+
+# único ponto que lê o .env: todos os módulos (e o cli) importam as configurações daqui
+load_dotenv()
 
 
 # Centraliza a lógica do diretório base
@@ -24,40 +29,284 @@ else:
 DATA_RAW_DIR = BASE_DIR / 'data' / 'raw'
 DATA_PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
 DATA_LOGS_DIR = BASE_DIR / 'data' / 'logs'
+DATA_CACHE_DIR = BASE_DIR / 'data' / 'cache'
+DATA_CHECKPOINT_DIR = BASE_DIR / 'data' / 'checkpoints'
+DATA_MIRROR_DIR = BASE_DIR / 'data' / 'mirror'
 
+# As pastas são criadas por quem grava nelas (ex.: mkdir antes de salvar), não na importação: health
+# checks e subcomandos que só leem não tocam no disco
 
-# Garante que TODAS as pastas existam
-for folder in [DATA_RAW_DIR, DATA_PROCESSED_DIR, DATA_LOGS_DIR]:
-    folder.mkdir(parents=True, exist_ok=True)
 
+def env_flag(name, default=False):
+    """Lê uma variável de ambiente booleana (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
-def get_engine():
+
+# Modo streaming: lê a planilha em blocos de linhas em vez de carregar tudo na memória
+STREAMING_MODE = env_flag("ETL_STREAMING")
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "50000"))
+
+# Execução sobreposta (com ETL_STREAMING): leitura, transformação e carga dos blocos em paralelo,
+# ligadas por filas de no máximo ETL_QUEUE_DEPTH blocos
+PIPELINED_MODE = env_flag("ETL_PIPELINED")
+QUEUE_DEPTH = int(os.getenv("ETL_QUEUE_DEPTH", "2"))
+
+# Cache colunar (Parquet) das planilhas já lidas, indexado pelo hash do arquivo de origem
+CACHE_ENABLED = env_flag("ETL_CACHE", True)
+CACHE_MAX_BYTES = int(os.getenv("ETL_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Plano de tipos: atributos textuais ('category' ou 'string[pyarrow]') e largura das métricas ('float64' ou 'float32')
+TEXT_DTYPE = os.getenv("ETL_TEXT_DTYPE", "category").strip()
+METRIC_FLOAT_DTYPE = os.getenv("ETL_METRIC_DTYPE", "float64").strip().lower()
+
+# Backend das transformações: 'pandas' (referência, etapa a etapa) ou 'polars'/'duckdb' (plano lazy único)
+FRAME_BACKEND = os.getenv("ETL_FRAME_BACKEND", "pandas").strip().lower()
+
+# Método de escrita na carga: 'copy' (COPY FROM STDIN) ou 'insert' (DataFrame.to_sql)
+LOAD_METHOD = os.getenv("ETL_LOAD_METHOD", "copy").strip().lower()
+
+# Interrompe o pipeline quando uma regra de validação de severidade 'error' falha
+VALIDATION_FAIL_FAST = env_flag("ETL_VALIDATION_FAIL_FAST")
+
+# Modo de carga: 'full' (TRUNCATE e recarga), 'incremental' (apenas as diferenças, IDs estáveis)
+# ou 'swap' (carga em tabelas de staging e publicação por rename em uma transação curta)
+LOAD_MODE = os.getenv("ETL_LOAD_MODE", "full").strip().lower()
+
+# Espelho local do star schema em Parquet (data/mirror), gravado a cada carga para consultas sem servidor
+MIRROR_ENABLED = env_flag("ETL_MIRROR", True)
+
+# Agregados pré-calculados na carga (src/rollups.py): 'all', 'none' ou nomes separados por vírgula
+ROLLUPS = [name.strip() for name in os.getenv("ETL_ROLLUPS", "all").split(",") if name.strip()]
+# Dias sem leitura para um agregado ser descartado por `python src/rollups.py --drop-unused`
+ROLLUP_UNUSED_DAYS = int(os.getenv("ETL_ROLLUP_UNUSED_DAYS", "30"))
+
+# Tempo máximo de espera pelos locks na publicação do modo swap (por tentativa)
+SWAP_LOCK_TIMEOUT_MS = int(os.getenv("ETL_SWAP_LOCK_TIMEOUT_MS", "2000"))
+
+# Extração em lote: todas as planilhas de DATA_RAW_DIR que casam com o padrão, abas em paralelo. Só abas
+# no formato da aba 'Country' passam pelo pipeline (as agregadas, como 'Region' e 'Global', são rejeitadas)
+BATCH_MODE = env_flag("ETL_BATCH")
+BATCH_FILE_PATTERN = os.getenv("ETL_BATCH_PATTERN", "*.xlsx")
+BATCH_SHEETS = [sheet.strip() for sheet in os.getenv("ETL_BATCH_SHEETS", "Country").split(",") if sheet.strip()]
+EXTRACT_WORKERS = int(os.getenv("ETL_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+
+# Instrumentação por etapa: dump do cProfile por etapa e pico de alocações via tracemalloc (ambos com custo)
+PROFILE_STAGES = env_flag("ETL_PROFILE")
+TRACE_MEMORY = env_flag("ETL_TRACEMALLOC")
+
+# Perfil (nulos, distintos, mínimo/máximo) da saída de cada etapa, calculado só com o log em DEBUG,
+# uma vez por etapa e sobre no máximo ETL_PROFILE_SAMPLE_ROWS linhas (0 usa todas)
+PROFILE_SAMPLE_ROWS = int(os.getenv("ETL_PROFILE_SAMPLE_ROWS", "10000"))
+
+# Checkpoints por etapa: uma nova execução retoma a partir da primeira etapa desatualizada ou que falhou
+CHECKPOINT_ENABLED = env_flag("ETL_CHECKPOINTS", True)
+# Pula a carga quando dados, código, modo e destino são os mesmos da última carga concluída (marcador
+# local em data/checkpoints). Desligado por padrão: o marcador não enxerga alterações feitas no banco
+# por fora do pipeline, e a nova execução é justamente o jeito de reparar o Data Warehouse
+SKIP_UNCHANGED_LOAD = env_flag("ETL_SKIP_UNCHANGED_LOAD")
+
+
+# Pool de conexões compartilhado pelo processo (uma engine por URL, reaproveitada por todos os módulos)
+DB_POOL_SIZE = int(os.getenv("ETL_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("ETL_DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("ETL_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("ETL_DB_POOL_RECYCLE", "1800"))
+
+# Tempo máximo de cada comando no servidor (statement_timeout do Postgres); 0 desativa
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("ETL_DB_STATEMENT_TIMEOUT_MS", "600000"))
+
+# Novas tentativas de conexão em OperationalError, com espera exponencial (1s, 2s, 4s...)
+DB_CONNECT_RETRIES = int(os.getenv("ETL_DB_CONNECT_RETRIES", "3"))
+DB_RETRY_BACKOFF = float(os.getenv("ETL_DB_RETRY_BACKOFF", "1.0"))
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+_pool_stats = {'connects': 0, 'connect_retries': 0, 'checkouts': 0, 'checked_out': 0,
+               'peak_checked_out': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+_pool_stats_lock = threading.Lock()
+
+# tempo que o checkout corrente de cada thread passou abrindo conexões novas (não conta como espera)
+_connecting = threading.local()
+
+
+# o SQLAlchemy só é importado quando a primeira engine é criada (subcomandos sem banco iniciam mais rápido)
+_pool_class = None
+
+
+def _instrumented_pool_class():
+    """
+    QueuePool que mede quanto tempo cada checkout esperou por uma conexão livre (criado na primeira engine).
+
+    Só usa a API pública do pool: a espera é a duração de connect() menos o tempo gasto abrindo
+    conexões novas (medido no evento do_connect); sobra a fila por conexão livre e o pre-ping.
+    """
+
+    global _pool_class
+    if _pool_class is not None:
+        return _pool_class
+
+    from sqlalchemy.pool import QueuePool
+
+    class InstrumentedQueuePool(QueuePool):
+
+        def connect(self):
+            _connecting.seconds = 0.0
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                waited = max(time.perf_counter() - start - _connecting.seconds, 0.0)
+                with _pool_stats_lock:
+                    _pool_stats['wait_seconds_total'] += waited
+                    _pool_stats['wait_seconds_max'] = max(_pool_stats['wait_seconds_max'], waited)
+
+    _pool_class = InstrumentedQueuePool
+    return _pool_class
+
+
+
+def database_url():
     """
-    Cria a engine de conexão com o banco de dados via SQLAlchemy.
+    URL de conexão do Data Warehouse.
 
     A função prioriza a URL de conexão do Docker (DATABASE_URL_DOCKER) se disponível,
     caindo para a URL local (DATABASE_URL) caso contrário. Isso permite que o 
     pipeline seja executado de forma transparente em diferentes ambientes.
+    """
+    url = os.getenv("DATABASE_URL")
+
+    # Se o Docker injetar a variável DATABASE_URL_DOCKER, usamos ela, caso contrário, usamos a do .env (localhost)
+    return os.getenv("DATABASE_URL_DOCKER", url)
+
+
+
+def _instrument(engine):
+    """Registra os eventos do pool: conexões físicas (com novas tentativas) e checkouts."""
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "do_connect")
+    def connect_with_retry(dialect, conn_rec, cargs, cparams):
+        start = time.perf_counter()
+        try:
+            for attempt in range(DB_CONNECT_RETRIES + 1):
+                try:
+                    connection = dialect.connect(*cargs, **cparams)
+                    break
+                except dialect.loaded_dbapi.OperationalError as e:
+                    if attempt == DB_CONNECT_RETRIES:
+                        raise
+                    delay = DB_RETRY_BACKOFF * 2 ** attempt
+                    with _pool_stats_lock:
+                        _pool_stats['connect_retries'] += 1
+                    pool_logger.warning(f"⚠️ Falha ao conectar ({str(e).strip().splitlines()[0]}); nova tentativa em {delay:.1f}s...")
+                    time.sleep(delay)
+        finally:
+            # abrir a conexão (e esperar entre as tentativas) não é espera por conexão livre
+            _connecting.seconds = getattr(_connecting, 'seconds', 0.0) + time.perf_counter() - start
+
+        with _pool_stats_lock:
+            _pool_stats['connects'] += 1
+        return connection
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_stats_lock:
+            _pool_stats['checkouts'] += 1
+            _pool_stats['checked_out'] += 1
+            _pool_stats['peak_checked_out'] = max(_pool_stats['peak_checked_out'], _pool_stats['checked_out'])
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        with _pool_stats_lock:
+            _pool_stats['checked_out'] = max(_pool_stats['checked_out'] - 1, 0)
+
+
+
+def get_engine():
+    """
+    Engine de conexão com o banco de dados via SQLAlchemy, compartilhada pelo processo.
+
+    A primeira chamada para uma URL cria a engine com o pool configurado (ETL_DB_POOL_*), pre-ping
+    (conexões derrubadas pelo servidor são descartadas no checkout), novas tentativas com espera
+    exponencial ao conectar e statement_timeout no servidor; as seguintes devolvem a mesma engine,
+    de modo que extração, validação e carga reaproveitam conexões já autenticadas.
 
     Returns:
         sqlalchemy.engine.Engine: Objeto de conexão configurado para o PostgreSQL.
     """
-    url = os.getenv("DATABASE_URL")
+    from sqlalchemy import create_engine
+
+    url = database_url()
+
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            connect_args = {}
+            if DB_STATEMENT_TIMEOUT_MS and url and url.startswith("postgresql"):
+                connect_args['options'] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+            engine = create_engine(
+                url,
+                poolclass=_instrumented_pool_class(),
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+                connect_args=connect_args,
+            )
+            _instrument(engine)
+            _engines[url] = engine
+
+    return engine
+
 
-    url = os.getenv("DATABASE_URL_DOCKER", url)
-    
-    # Se o Docker injetar a variável DATABASE_URL_DOCKER, usamos ela, caso contrário, usamos a do .env (localhost)
 
-    return create_engine(url)
+def pool_stats():
+    """Contadores do pool desde o início do processo (conexões, checkouts e espera por conexão livre)."""
+    with _pool_stats_lock:
+        return dict(_pool_stats)
+
+
+
+def dispose_engines():
+    """Fecha as conexões de todas as engines compartilhadas e esvazia o registro."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+
+def _forget_engines_after_fork():
+    # o processo filho herda os sockets do pool: descarta sem fechar para não derrubar as conexões do pai
+    global _engines_lock, _pool_stats_lock
+    _engines_lock, _pool_stats_lock = threading.Lock(), threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engines_after_fork)
 
 
 
 def check_connection():
-    """Testa se o banco está online e acessível."""
-    engine = get_engine()
+    """Testa se o banco está online e acessível (e deixa uma conexão aquecida no pool)."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
     try:
         engine = get_engine()
         with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
             logger.info("✅ Conexão com o Data Warehouse estabelecida com sucesso!")
             return True
     except OperationalError as e:
@@ -1,3 +1,6 @@
+-- chaves naturais únicas, chave composta da fato e índices das FKs ficam em src/load.py (star_constraints,
+-- star_indexes): a carga full os remove antes do COPY e recria ao final (build_star_indexes)
+
 CREATE TABLE IF NOT EXISTS dim_country(
     country_id SERIAL PRIMARY KEY,
     country VARCHAR(100) NOT NULL,
@@ -41,5 +44,33 @@ CREATE TABLE IF NOT EXISTS fact_energy_generation(
     heat_generation_tj NUMERIC(12,2),
     total_public_flows_usd_m NUMERIC(12,2),
     international_public_flows_usd_m NUMERIC(12,2),
-    capacity_per_capita_w NUMERIC(10,2)
+    capacity_per_capita_w NUMERIC(10,2),
+
+    -- hash da linha (chave composta + métricas) usado pela carga incremental
+    row_hash BIGINT
+);
+
+-- ADD COLUMN IF NOT EXISTS pega lock exclusivo mesmo quando a coluna já existe; só altera se faltar
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'fact_energy_generation' AND column_name = 'row_hash'
+    ) THEN
+        ALTER TABLE fact_energy_generation ADD COLUMN row_hash BIGINT;
+    END IF;
+END $$;
+
+-- agregados pré-calculados na carga (src/rollups.py): definição, última atualização e uso medido pelo pg_stat
+CREATE TABLE IF NOT EXISTS etl_rollups(
+    name VARCHAR(63) PRIMARY KEY,
+    definition TEXT NOT NULL,
+    definition_hash CHAR(16) NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL,
+    group_count BIGINT,
+    scans_after_refresh BIGINT NOT NULL DEFAULT 0,
+    uses BIGINT NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP,
+    dropped_at TIMESTAMP
 );
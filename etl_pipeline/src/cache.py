@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from config import DATA_CACHE_DIR, CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+CACHE_SUFFIX = '.parquet'
+
+# impressões já calculadas neste processo, por (caminho, tamanho, mtime): o input_key dos checkpoints
+# e o cache consultam o mesmo arquivo na mesma execução e não precisam relê-lo inteiro
+_fingerprints = {}
+
+
+def _pyarrow_available():
+    """Verifica se o pyarrow (necessário para Parquet) está instalado."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("⚠️ pyarrow não instalado - cache desativado.")
+        return False
+
+
+
+def file_fingerprint(file_path: Path, block_size: int = 1024 * 1024):
+    """
+    Calcula a impressão digital de um arquivo a partir do conteúdo (SHA-256) e do tamanho.
+
+    O arquivo é lido em blocos para não carregar tudo na memória, e no máximo uma vez por processo
+    enquanto tamanho e mtime não mudarem.
+
+    Args:
+        file_path (Path): Arquivo de origem.
+        block_size (int): Tamanho dos blocos de leitura em bytes.
+
+    Returns:
+        str: Identificador no formato '<hash>-<tamanho>'.
+    """
+
+    stat = file_path.stat()
+    key = (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key in _fingerprints:
+        return _fingerprints[key]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    _fingerprints[key] = f"{digest.hexdigest()[:32]}-{stat.st_size}"
+    return _fingerprints[key]
+
+
+
+def _entry_prefix(file_path: Path, sheet_name: str):
+    return f"{file_path.stem}__{sheet_name}__"
+
+
+def _entry_path(file_path: Path, sheet_name: str, fingerprint: str):
+    return DATA_CACHE_DIR / f"{_entry_prefix(file_path, sheet_name)}{fingerprint}{CACHE_SUFFIX}"
+
+
+def _lookup(file_path: Path, sheet_name: str, fingerprint: str = None):
+    """Retorna o caminho da entrada de cache válida para o arquivo, ou None em caso de miss."""
+
+    if not _pyarrow_available():
+        return None
+
+    entry = _entry_path(file_path, sheet_name, fingerprint or file_fingerprint(file_path))
+    if not entry.exists():
+        logger.info(f"📭 Cache miss: {file_path.name} [{sheet_name}]")
+        return None
+
+    # atualiza o mtime para que a remoção por tamanho descarte primeiro as entradas menos usadas
+    entry.touch()
+    logger.info(f"📬 Cache hit: {file_path.name} [{sheet_name}] → {entry.name}")
+    return entry
+
+
+
+def load_cached_frame(file_path: Path, sheet_name: str = 'Country', fingerprint: str = None):
+    """
+    Carrega do cache o DataFrame já extraído de uma planilha, se o arquivo não mudou.
+
+    Args:
+        file_path (Path): Arquivo xlsx de origem.
+        sheet_name (str): Aba lida do arquivo.
+        fingerprint (str, opcional): file_fingerprint(file_path) já calculado; num miss, o mesmo
+            valor deve ir para store_cached_frame.
+
+    Returns:
+        pd.DataFrame | None: O DataFrame em cache, ou None se não houver entrada válida.
+    """
+
+    entry = _lookup(file_path, sheet_name, fingerprint)
+    if entry is None:
+        return None
+
+    start = time.perf_counter()
+    df = pd.read_parquet(entry)
+    logger.info(f"✅ {len(df)} registros lidos do cache em {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    return df
+
+
+
+def iter_cached_frame(file_path: Path, chunk_size: int, sheet_name: str = 'Country', fingerprint: str = None):
+    """
+    Percorre a entrada de cache de uma planilha em blocos de até `chunk_size` linhas.
+
+    Returns:
+        Iterator[pd.DataFrame] | None: Iterador de blocos, ou None se não houver entrada válida.
+    """
+
+    entry = _lookup(file_path, sheet_name, fingerprint)
+    if entry is None:
+        return None
+
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(entry)
+    return (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size))
+
+
+
+def store_cached_frame(file_path: Path, df: pd.DataFrame, sheet_name: str = 'Country', fingerprint: str = None):
+    """
+    Grava no cache o DataFrame extraído de uma planilha, em Parquet comprimido (zstd).
+
+    Versões anteriores do mesmo arquivo são descartadas e, em seguida, o tamanho total do cache
+    é limitado a CACHE_MAX_BYTES. Falhas de gravação não interrompem o pipeline.
+
+    Args:
+        file_path (Path): Arquivo xlsx de origem.
+        df (pd.DataFrame): Dados extraídos da planilha.
+        sheet_name (str): Aba lida do arquivo.
+        fingerprint (str, opcional): A impressão usada na consulta que deu miss.
+    """
+
+    if not _pyarrow_available():
+        return
+
+    entry = _entry_path(file_path, sheet_name, fingerprint or file_fingerprint(file_path))
+
+    try:
+        DATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_suffix('.tmp')
+        df.to_parquet(tmp_path, index=False, compression='zstd')
+        tmp_path.replace(entry)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o cache: {e}")
+        return
+
+    logger.info(f"💾 Cache gravado: {entry.name} ({entry.stat().st_size / 1024:.0f} KB)")
+
+    # versões antigas do mesmo arquivo
+    for old in DATA_CACHE_DIR.glob(f"{_entry_prefix(file_path, sheet_name)}*{CACHE_SUFFIX}"):
+        if old != entry:
+            old.unlink(missing_ok=True)
+            logger.info(f"🗑️  Versão antiga removida do cache: {old.name}")
+
+    evict_cache()
+
+
+
+def evict_cache(max_bytes: int = CACHE_MAX_BYTES):
+    """Remove as entradas usadas há mais tempo até o cache caber em `max_bytes`."""
+
+    entries = sorted(DATA_CACHE_DIR.glob(f"*{CACHE_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+
+    while entries and total > max_bytes:
+        oldest = entries.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
+        logger.info(f"🗑️  Entrada removida do cache (limite de tamanho): {oldest.name}")
+
+
+
+def invalidate_cache(file_path: Path = None):
+    """
+    Invalida o cache explicitamente.
+
+    Args:
+        file_path (Path, opcional): Remove apenas as entradas deste arquivo; sem argumento, limpa todo o cache.
+    """
+
+    pattern = f"{file_path.stem}__*{CACHE_SUFFIX}" if file_path else f"*{CACHE_SUFFIX}"
+    removed = 0
+    for entry in DATA_CACHE_DIR.glob(pattern):
+        entry.unlink(missing_ok=True)
+        removed += 1
+
+    logger.info(f"🗑️  Cache invalidado: {removed} entradas removidas")
+
+
+
+if __name__ == "__main__":
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    invalidate_cache()
@@ -0,0 +1,245 @@
+import hashlib
+import inspect
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from config import DATA_CHECKPOINT_DIR, CHECKPOINT_ENABLED, SKIP_UNCHANGED_LOAD
+from cache import file_fingerprint
+from metrics import measure
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+CHECKPOINT_SUFFIX = '.feather'
+LOAD_MARKER = DATA_CHECKPOINT_DIR / 'load.done'
+
+# O Feather exige índice padrão; o índice original (linhas removidas na limpeza) vira esta coluna
+INDEX_COLUMN = '__index__'
+
+
+# Etapa com checkpoint: `run` recebe o DataFrame da etapa anterior (None na primeira) e
+# `sources` lista as funções, módulos ou arquivos cujo código define a versão da etapa
+Stage = namedtuple('Stage', ['name', 'run', 'sources'])
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+
+def code_version(*sources):
+    """
+    Versão do código de uma etapa: hash do código-fonte de funções e módulos, ou do conteúdo de arquivos.
+
+    Qualquer edição nessas fontes (uma regra textual, o plano de tipos, o SQL de criação) muda a
+    versão e invalida o checkpoint da etapa e de todas as seguintes.
+    """
+
+    parts = []
+    for source in sources:
+        if isinstance(source, Path):
+            parts.append(source.read_bytes() if source.exists() else b'')
+        else:
+            parts.append(inspect.getsource(source))
+    return _digest(*parts)[:16]
+
+
+
+def input_key(file_paths, *parts):
+    """
+    Impressão digital da entrada do pipeline: conteúdo dos arquivos de origem mais parâmetros que mudam
+    o resultado sem mudar o código (ex.: o plano de tipos vindo do ambiente).
+
+    Args:
+        file_paths (Path | list[Path]): Arquivo de origem, ou todos os arquivos da extração em lote.
+
+    Raises:
+        FileNotFoundError: Se algum arquivo de origem não existir (ou a lista estiver vazia).
+    """
+
+    if isinstance(file_paths, Path):
+        file_paths = [file_paths]
+    if not file_paths:
+        raise FileNotFoundError("Nenhum arquivo de origem encontrado.")
+
+    fingerprints = []
+    for file_path in file_paths:
+        if not file_path.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
+        fingerprints.append(f"{file_path.name}:{file_fingerprint(file_path)}")
+
+    return _digest(*fingerprints, *parts)[:16]
+
+
+
+def stage_keys(source_key, stages):
+    """
+    Chaves encadeadas das etapas: a chave de cada etapa depende da anterior e da própria versão de código.
+
+    Como a chave não depende dos dados, todas podem ser calculadas antes de executar qualquer etapa.
+
+    Returns:
+        list[str]: Uma chave por etapa, na mesma ordem.
+    """
+
+    keys = []
+    key = source_key
+    for stage in stages:
+        key = _digest(key, stage.name, code_version(*stage.sources))[:16]
+        keys.append(key)
+    return keys
+
+
+
+def _checkpoint_path(position, stage, key):
+    return DATA_CHECKPOINT_DIR / f"{position:02d}_{stage}__{key}{CHECKPOINT_SUFFIX}"
+
+
+
+def save_checkpoint(df, path):
+    """Grava o DataFrame em Feather (Arrow IPC, lz4), preservando índice e tipos; remove versões antigas da etapa."""
+
+    prefix = path.name.split('__')[0]
+
+    try:
+        DATA_CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        df.reset_index(names=INDEX_COLUMN).to_feather(tmp_path, compression='lz4')
+        tmp_path.replace(path)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o checkpoint {path.name}: {e}")
+        return
+
+    for old in DATA_CHECKPOINT_DIR.glob(f"{prefix}__*{CHECKPOINT_SUFFIX}"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+    logger.info(f"💾 Checkpoint gravado: {path.name} ({path.stat().st_size / 1024:.0f} KB)")
+
+
+
+def load_checkpoint(path):
+    """Lê um checkpoint gravado por save_checkpoint, restaurando o índice original."""
+
+    df = pd.read_feather(path).set_index(INDEX_COLUMN)
+    df.index.name = None
+    return df
+
+
+
+def run_stages(stages, source_key, enabled=CHECKPOINT_ENABLED):
+    """
+    Executa as etapas em sequência, retomando a partir do último checkpoint válido.
+
+    Procura, de trás para frente, a última etapa com checkpoint para a chave atual; o DataFrame dela
+    é lido do disco e só as etapas seguintes são executadas, gravando um novo checkpoint a cada uma.
+    Uma etapa que falha não grava checkpoint, então a próxima execução recomeça exatamente nela.
+
+    Args:
+        stages (list[Stage]): Etapas na ordem de execução.
+        source_key (str): Impressão digital da entrada (input_key).
+        enabled (bool): Sem checkpoints, executa todas as etapas normalmente.
+
+    Returns:
+        tuple[pd.DataFrame, str]: Resultado da última etapa e a chave dele.
+    """
+
+    keys = stage_keys(source_key, stages)
+    paths = [_checkpoint_path(position, stage.name, key) for position, (stage, key) in enumerate(zip(stages, keys))]
+
+    resume_at = 0
+    df = None
+
+    if enabled:
+        for position in reversed(range(len(stages))):
+            if paths[position].exists():
+                with measure(f"checkpoint.load.{stages[position].name}") as record:
+                    df = load_checkpoint(paths[position])
+                    record['rows_out'] = len(df)
+                resume_at = position + 1
+                logger.info(f"⏭️  Etapas até '{stages[position].name}' sem mudanças: retomando do checkpoint ({len(df)} registros)")
+                break
+
+    for position in range(resume_at, len(stages)):
+        stage = stages[position]
+        df = stage.run(df)
+
+        if df is None or df.empty:
+            raise ValueError(f"A etapa '{stage.name}' retornou um DataFrame vazio ou None.")
+
+        if enabled:
+            with measure(f"checkpoint.save.{stage.name}", rows_in=len(df)):
+                save_checkpoint(df, paths[position])
+
+    return df, keys[-1]
+
+
+
+def load_marker_key(data_key, *parts):
+    """Chave da carga: dados finais mais tudo o que muda o resultado no banco (código, modo, destino)."""
+    return _digest(data_key, *parts)[:16]
+
+
+
+def load_completed(key, enabled=SKIP_UNCHANGED_LOAD):
+    """Indica se a última carga concluída foi exatamente com esta chave (só com ETL_SKIP_UNCHANGED_LOAD)."""
+
+    if not enabled or not LOAD_MARKER.exists():
+        return False
+
+    try:
+        marker = json.loads(LOAD_MARKER.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+
+    return marker.get('key') == key
+
+
+
+def mark_load_completed(key, enabled=SKIP_UNCHANGED_LOAD):
+    """
+    Grava o marcador de carga concluída (chamado só depois do commit da transação).
+
+    Desligado, remove o marcador anterior: ele descreveria uma carga que esta acabou de substituir.
+    """
+
+    if not enabled:
+        LOAD_MARKER.unlink(missing_ok=True)
+        return
+
+    marker = {'key': key, 'completed_at': datetime.now().isoformat(timespec='seconds')}
+    LOAD_MARKER.parent.mkdir(parents=True, exist_ok=True)
+    LOAD_MARKER.write_text(json.dumps(marker), encoding='utf-8')
+
+
+
+def invalidate_checkpoints():
+    """Remove todos os checkpoints e o marcador de carga, forçando uma execução completa."""
+
+    removed = 0
+    for entry in DATA_CHECKPOINT_DIR.glob(f"*{CHECKPOINT_SUFFIX}"):
+        entry.unlink(missing_ok=True)
+        removed += 1
+    LOAD_MARKER.unlink(missing_ok=True)
+
+    logger.info(f"🗑️  Checkpoints invalidados: {removed} arquivos removidos")
+
+
+
+if __name__ == "__main__":
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    invalidate_checkpoints()
@@ -0,0 +1,177 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Ponto de entrada único do pipeline: `python src/cli.py <subcomando>`.
+# Este módulo importa só a biblioteca padrão; pandas, SQLAlchemy e os módulos do pipeline entram
+# dentro de cada subcomando, então `--help` e `check-connection` (health checks, probes do cron)
+# iniciam sem pagar a importação das bibliotecas pesadas.
+
+logger = logging.getLogger('cli')
+
+# orçamento de tempo para `import cli` (verificado em tests/test_cli.py)
+IMPORT_BUDGET_SECONDS = 0.2
+
+# módulos que não podem ser carregados só por importar o cli
+HEAVY_MODULES = ('pandas', 'numpy', 'sqlalchemy', 'pyarrow', 'openpyxl', 'psycopg2')
+
+# opções de linha de comando que sobrescrevem variáveis de ambiente (lidas por config.py na importação)
+ENV_OPTIONS = {
+    'mode': 'ETL_LOAD_MODE',
+    'backend': 'ETL_FRAME_BACKEND',
+    'streaming': 'ETL_STREAMING',
+    'pipelined': 'ETL_PIPELINED',
+    'checkpoints': 'ETL_CHECKPOINTS',
+}
+
+
+def configure_logging(level=logging.INFO, log_file=True):
+    """
+    Log no console e, para os subcomandos que processam dados, também em data/logs/etl.jsonl (uma
+    linha JSON por registro). A escrita é feita em segundo plano (diagnostics.start_logging).
+    """
+
+    from config import DATA_LOGS_DIR
+    from diagnostics import start_logging
+
+    start_logging(level, DATA_LOGS_DIR / "etl.jsonl" if log_file else None)
+
+
+
+def apply_env_options(args):
+    """Repassa as opções informadas para o ambiente antes de config.py ser importado."""
+
+    for option, variable in ENV_OPTIONS.items():
+        value = getattr(args, option, None)
+        if value is None:
+            continue
+        os.environ[variable] = str(value).lower() if isinstance(value, bool) else value
+
+
+
+def cmd_check_connection(args):
+    from config import check_connection
+
+    ok = check_connection()
+    logger.info("✅ Banco de dados acessível" if ok else "❌ Banco de dados inacessível")
+    return 0 if ok else 1
+
+
+
+def cmd_extract(args):
+    from extract import extract_data
+
+    df = extract_data(export=True)
+    return 0 if df is not None and not df.empty else 1
+
+
+
+def cmd_transform(args):
+    from frame_io import read_frame, write_frame
+    from main import transform_frame
+    from transform.text import FILE_PATH
+    from transform.numeric import OUTPUT_PATH
+
+    # key_hash segue no arquivo: validate e load reaproveitam o hash em vez de recalculá-lo
+    write_frame(transform_frame(read_frame(FILE_PATH)), OUTPUT_PATH)
+    return 0
+
+
+
+def cmd_validate(args):
+    from frame_io import read_frame, write_frame
+    from validation import INPUT_DIR, OUTPUT_PATH, REPORT_PATH, validate_data
+
+    df = read_frame(INPUT_DIR)
+    report = validate_data(df, fail_fast=False, report_path=REPORT_PATH)
+
+    write_frame(df, OUTPUT_PATH)
+    return 0 if report['passed'] else 1
+
+
+
+def cmd_load(args):
+    from pathlib import Path
+    from frame_io import read_input
+    from load import load_data
+    from validation import OUTPUT_PATH
+
+    path = Path(args.input) if args.input else OUTPUT_PATH
+    if not path.exists():
+        logger.error(f"❌ Arquivo não encontrado: {path}")
+        return 1
+
+    return 0 if load_data(read_input(path)) else 1
+
+
+
+def cmd_run(args):
+    from main import run_pipeline
+
+    run_pipeline()
+    return 0
+
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='etl', description="Pipeline ETL - Renewable Energy Data")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log em nível DEBUG")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='SUBCOMANDO')
+
+    def command(name, func, help):
+        sub = commands.add_parser(name, help=help, description=help)
+        sub.set_defaults(func=func)
+        return sub
+
+    command('check-connection', cmd_check_connection, "verifica se o Data Warehouse está acessível (sem pandas)")
+    command('extract', cmd_extract, "etapa 1: lê a planilha e grava a cópia em Arrow IPC na pasta raw")
+
+    transform = command('transform', cmd_transform, "etapas 2-3: transformações textuais e numéricas da cópia extraída")
+    transform.add_argument('--backend', choices=('pandas', 'polars', 'duckdb'), help="ETL_FRAME_BACKEND")
+
+    command('validate', cmd_validate, "etapa 4: valida os dados transformados (código de saída 1 se reprovar)")
+
+    load = command('load', cmd_load, "etapa 6: carrega os dados validados no Data Warehouse")
+    load.add_argument('--input', help="arquivo .arrow ou .csv a carregar (padrão: o gerado por `validate`)")
+    load.add_argument('--mode', choices=('full', 'incremental', 'swap'), help="ETL_LOAD_MODE")
+
+    run = command('run', cmd_run, "pipeline completo (etapas 1 a 6), como `python src/main.py`")
+    run.add_argument('--mode', choices=('full', 'incremental', 'swap'), help="ETL_LOAD_MODE")
+    run.add_argument('--backend', choices=('pandas', 'polars', 'duckdb'), help="ETL_FRAME_BACKEND")
+    run.add_argument('--streaming', action='store_true', default=None, help="ETL_STREAMING=true")
+    run.add_argument('--pipelined', action='store_true', default=None, help="ETL_PIPELINED=true (com --streaming)")
+    run.add_argument('--no-checkpoints', dest='checkpoints', action='store_false', default=None, help="ETL_CHECKPOINTS=false")
+
+    return parser
+
+
+
+def main(argv=None):
+    """
+    Executa um subcomando e devolve o código de saída do processo.
+
+    As opções são aplicadas ao ambiente antes de qualquer módulo do pipeline ser importado, então
+    valem como as variáveis ETL_* correspondentes.
+    """
+
+    args = build_parser().parse_args(argv)
+    apply_env_options(args)
+
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO, log_file=args.command != 'check-connection')
+
+    start = time.perf_counter()
+    try:
+        code = args.func(args)
+    except Exception as e:
+        logger.error(f"❌ {args.command} falhou: {e}")
+        code = 1
+
+    logger.debug(f"⏱️  {args.command}: {time.perf_counter() - start:.2f}s")
+    return code
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
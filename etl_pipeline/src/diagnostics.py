@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+
+from config import PROFILE_SAMPLE_ROWS
+
+# Diagnóstico do pipeline: logging em segundo plano (fila + thread), log estruturado em JSON e prévias /
+# perfis de DataFrames calculados só quando o nível DEBUG está ativo. Só usa a biblioteca padrão na
+# importação: o cli configura o logging antes de carregar o pandas.
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+LOG_FORMAT = '%(asctime)s | %(levelname)s | %(message)s'
+
+# atributos de todo LogRecord; o que sobra foi passado em `extra=` e vai como campo do JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+# etapas já perfiladas na execução atual (no modo streaming a mesma etapa roda uma vez por bloco)
+_profiled = set()
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: horário UTC, nível, logger, thread, mensagem e os campos de `extra=`."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+
+def start_logging(level=logging.INFO, json_file=None):
+    """
+    Direciona o logging do processo para uma fila consumida por uma thread em segundo plano.
+
+    Quem loga só enfileira o registro (QueueHandler); console e arquivo são escritos pela thread do
+    QueueListener, então a escrita em disco não fica no caminho das etapas. O console mantém o formato
+    legível; `json_file` recebe uma linha JSON por registro. A fila é esvaziada na saída do processo.
+
+    Args:
+        level (int): Nível do logger raiz.
+        json_file (Path | None): Arquivo de log estruturado (ex.: data/logs/etl.jsonl).
+    """
+
+    global _listener
+    stop_logging()
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [console]
+
+    if json_file is not None:
+        json_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(json_file, mode='a', encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+
+def stop_logging():
+    """Escreve os registros ainda na fila e encerra a thread de logging (sem efeito se não estiver ativa)."""
+
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+
+class Preview:
+    """
+    Prévia de um DataFrame renderizada só quando o registro de log é emitido.
+
+    `logger.debug("%s", preview(df))` não converte nada para texto com o DEBUG desligado, ao contrário
+    de `logger.debug(f"{df.head()}")`, que monta a tabela antes de o logger decidir descartá-la.
+    """
+
+    __slots__ = ('df', 'rows', 'tail')
+
+    def __init__(self, df, rows, tail):
+        self.df = df
+        self.rows = rows
+        self.tail = tail
+
+    def __str__(self):
+        part = self.df.tail(self.rows) if self.tail else self.df.head(self.rows)
+        return f"\n{part}\n"
+
+
+
+def preview(df, rows=5, tail=False):
+    """Prévia adiada das primeiras (ou, com `tail`, das últimas) `rows` linhas, para usar como argumento do log."""
+    return Preview(df, rows, tail)
+
+
+
+def _scalar(value):
+    """Converte escalares numpy/pandas em tipos do Python para o JSON."""
+    return value.item() if hasattr(value, 'item') else value
+
+
+
+def profile_frame(df, sample_rows=PROFILE_SAMPLE_ROWS):
+    """
+    Perfil por coluna de um DataFrame: nulos, valores distintos e, nas numéricas, mínimo e máximo.
+
+    Acima de `sample_rows` linhas o perfil é calculado sobre uma amostra fixa (mesma semente em toda
+    execução), então o custo não cresce com o volume; contagens de nulos e distintos referem-se à amostra.
+
+    Returns:
+        dict: {'rows', 'sample_rows', 'columns': {coluna: {...}}}.
+    """
+
+    sample = df.sample(n=sample_rows, random_state=0) if 0 < sample_rows < len(df) else df
+
+    columns = {}
+    for col in sample.columns:
+        series = sample[col]
+        nulls = int(series.isna().sum())
+        entry = {'dtype': str(series.dtype), 'nulls': nulls, 'distinct': int(series.nunique())}
+
+        # Int16 anulável também tem kind 'i'; categorias (kind 'O') ficam sem mínimo/máximo
+        if series.dtype.kind in 'iuf' and nulls < len(series):
+            entry['min'] = _scalar(series.min())
+            entry['max'] = _scalar(series.max())
+
+        columns[str(col)] = entry
+
+    return {'rows': len(df), 'sample_rows': len(sample), 'columns': columns}
+
+
+
+def log_profile(stage, df):
+    """
+    Registra em DEBUG o perfil da saída de uma etapa, uma vez por etapa e execução.
+
+    Com o DEBUG desligado nada é calculado. O perfil vai como campo `profile` do log JSON e é
+    devolvido para entrar também no registro da etapa em metrics.
+
+    Returns:
+        dict | None: O perfil, ou None se não foi calculado.
+    """
+
+    if not logger.isEnabledFor(logging.DEBUG) or stage in _profiled:
+        return None
+
+    _profiled.add(stage)
+    profile = profile_frame(df)
+
+    nulls = sum(entry['nulls'] for entry in profile['columns'].values())
+    logger.debug(
+        f"📊 Perfil de {stage}: {profile['rows']} linhas (amostra de {profile['sample_rows']}), "
+        f"{len(profile['columns'])} colunas, {nulls} nulos na amostra",
+        extra={'stage': stage, 'profile': profile},
+    )
+    return profile
+
+
+
+def reset_profiles():
+    """Permite perfilar de novo todas as etapas (chamado no início de cada execução)."""
+    _profiled.clear()
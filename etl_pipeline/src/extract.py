@@ -1,14 +1,47 @@
+import numpy as np
 import pandas as pd
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from openpyxl import load_workbook
 
-from config import DATA_RAW_DIR  
+from config import DATA_RAW_DIR, CHUNK_SIZE, CACHE_ENABLED
+from config import BATCH_FILE_PATTERN, BATCH_SHEETS, EXTRACT_WORKERS
+from cache import file_fingerprint, load_cached_frame, iter_cached_frame, store_cached_frame
+from schema import apply_dtype_plan, SOURCE_COLUMNS, COMPOSED_KEY, METRIC_COLUMNS
+from frame_io import FRAME_SUFFIX, write_frame
+from diagnostics import preview
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+RAW_FILE_NAME = 'renewable_energy_data_raw.xlsx'
 
-def extract_data(file_name: str = 'renewable_energy_data_raw.xlsx'):
-    """Realiza a extração dos dados do arquivo xlsx e converte para csv."""
+# cabeçalhos sem os quais uma aba não passa pelo pipeline de países: a chave composta e as métricas.
+# No modo em lote, abas sem eles (ex.: uma aba 'Region' em ETL_BATCH_SHEETS) são rejeitadas na leitura
+# dos cabeçalhos - sem 'Country', clean_text_data descartaria todas as linhas delas em silêncio
+REQUIRED_SOURCE_COLUMNS = [source for source, column in SOURCE_COLUMNS.items() if column in COMPOSED_KEY + METRIC_COLUMNS]
+
+# entrada de `transform` quando as etapas rodam isoladas (frame_io.py)
+EXPORT_PATH = DATA_RAW_DIR / f'renewable_energy_data{FRAME_SUFFIX}'
+
+
+def extract_data(file_name: str = RAW_FILE_NAME, use_cache: bool = CACHE_ENABLED, export: bool = False):
+    """
+    Realiza a extração dos dados do arquivo xlsx, já aplicando o plano de tipos compactos (schema.py).
+
+    Quando o cache está ativo, um arquivo já lido anteriormente (mesmo hash e tamanho) é carregado
+    direto do Parquet em cache, sem passar pelo openpyxl. A cópia em Arrow IPC na pasta raw só é
+    gerada quando `export` é verdadeiro (execução isolada da etapa).
+
+    Args:
+        file_name (str): Nome do arquivo dentro de DATA_RAW_DIR.
+        use_cache (bool): Usa e alimenta o cache colunar.
+        export (bool): Grava também a cópia EXPORT_PATH, com os tipos já aplicados.
+
+    Returns:
+        pd.DataFrame | None: Os dados da aba 'Country', ou None em caso de erro.
+    """
 
     file_path = DATA_RAW_DIR / file_name
  
@@ -18,34 +51,267 @@ def extract_data(file_name: str = 'renewable_energy_data_raw.xlsx'):
         return None
     
 
+    # calculada uma vez: a mesma impressão serve para a consulta e, num miss, para a gravação
+    fingerprint = file_fingerprint(file_path) if use_cache else None
+    df = load_cached_frame(file_path, fingerprint=fingerprint) if use_cache else None
+
     # lê o arquivo xlsx
-    try:
-        df = pd.read_excel(file_path, sheet_name='Country')
-    except Exception as e:
-        logger.error(f"⚠️ Erro ao ler o arquivo: {e}")
-        return None
+    if df is None:
+        try:
+            df = pd.read_excel(file_path, sheet_name='Country')
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao ler o arquivo: {e}")
+            return None
+
+        df = apply_dtype_plan(df)
+
+        if use_cache:
+            store_cached_frame(file_path, df, fingerprint=fingerprint)
+
+    # o cache pode ter sido gravado com outro plano de tipos (ex.: float64 → float32)
+    df = apply_dtype_plan(df)
     
 
-    # transforma o arquivo xlsx em csv
-    try:
-        csv_path = DATA_RAW_DIR / 'renewable_energy_data.csv'
-        df.to_csv(csv_path, index=False, encoding='utf-8')
-        logger.info(f"✅ CSV gerado em: {csv_path}")
-    except Exception as e:
-        logger.error(f"⚠️ Erro ao transformar em csv: {e}")
-        # Mesmo que o CSV falhe, podemos retornar o DF para o pipeline seguir
-        return df
+    # grava a cópia lida pela etapa seguinte quando ela roda isolada
+    if export:
+        try:
+            write_frame(df, EXPORT_PATH)
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao gravar {EXPORT_PATH.name}: {e}")
+            # Mesmo que a cópia falhe, podemos retornar o DF para o pipeline seguir
+            return df
 
 
     # prévia dos dados
     logger.debug(f"\n✅ Arquivo carregado com sucesso: {file_path.name}")
     logger.debug(f"📊 Linhas: {len(df)}, Colunas {len(df.columns)}\n")
 
-    logger.debug("Prévia das 10 primeiras linhas:\n")
-    logger.debug(f"{df.head(10)}\n")
+    logger.debug("Prévia das 10 primeiras linhas:%s", preview(df, 10))
+    logger.debug("Prévia das últimas 10 linhas:%s", preview(df, 10, tail=True))
+
+    return df
+
+
+
+def extract_data_chunks(file_name: str = RAW_FILE_NAME, chunk_size: int = CHUNK_SIZE, use_cache: bool = CACHE_ENABLED):
+    """
+    Lê a aba 'Country' do arquivo xlsx em blocos de linhas, sem carregar a planilha inteira na memória.
+
+    Usa o modo read-only do openpyxl, que percorre as linhas sob demanda. A cada `chunk_size`
+    linhas é gerado um DataFrame com os mesmos cabeçalhos do arquivo original, permitindo que
+    as etapas seguintes processem um bloco por vez e a memória fique limitada ao tamanho do bloco.
+    Se o arquivo já estiver no cache, os blocos são lidos do Parquet em vez da planilha.
+
+    Os blocos somam as mesmas linhas e colunas do pd.read_excel da extração completa: cabeçalhos vazios
+    viram 'Unnamed: N', linhas vazias no meio da aba viram linhas nulas e só as do fim são descartadas.
+    A única diferença: valores à direita do último cabeçalho preenchido são ignorados (o read_excel
+    criaria colunas 'Unnamed' para eles).
+
+    Args:
+        file_name (str): Nome do arquivo dentro de DATA_RAW_DIR.
+        chunk_size (int): Quantidade máxima de linhas por bloco.
+        use_cache (bool): Lê do cache colunar quando houver uma entrada válida.
+
+    Yields:
+        pd.DataFrame: Blocos consecutivos da planilha.
+    """
+
+    file_path = DATA_RAW_DIR / file_name
+
+    if not file_path.exists():
+        logger.error(f"❌ Arquivo não encontrado: {file_path}")
+        return
+
+    cached_chunks = iter_cached_frame(file_path, chunk_size) if use_cache else None
+    if cached_chunks is not None:
+        for chunk in cached_chunks:
+            yield apply_dtype_plan(chunk)
+        return
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+
+    try:
+        rows = workbook['Country'].iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            logger.warning(f"⚠️ Planilha vazia: {file_path.name}")
+            return
+
+        # nomes como o read_excel dá a eles ('Unnamed: N' nos vazios, sufixo '.1' nos repetidos); só lê o cabeçalho
+        columns = list(pd.read_excel(file_path, sheet_name='Country', nrows=0).columns)
+        width = len(columns)
+
+        def frame(values):
+            # None vira NaN, como nas células vazias do read_excel (colunas só com vazios ficam float)
+            return apply_dtype_plan(pd.DataFrame(values, columns=columns).fillna(np.nan))
+
+        buffer = []
+        blank = []
+        total = 0
+        for row in rows:
+            # células vazias ou com texto vazio são nulas, como no read_excel
+            values = [None if i >= len(row) or row[i] == '' else row[i] for i in range(width)]
+
+            # linhas vazias só entram quando aparece uma linha com dados depois delas: as do fim da aba ficam de fora
+            if all(v is None for v in values):
+                blank.append(values)
+                continue
+            buffer.extend(blank)
+            blank = []
+            buffer.append(values)
+
+            while len(buffer) >= chunk_size:
+                total += chunk_size
+                yield frame(buffer[:chunk_size])
+                buffer = buffer[chunk_size:]
+
+        if buffer:
+            total += len(buffer)
+            yield frame(buffer)
+
+        logger.info(f"✅ Leitura em blocos concluída: {total} linhas de {file_path.name}")
+
+    finally:
+        workbook.close()
+
+
+
+def discover_workbooks(pattern: str = BATCH_FILE_PATTERN):
+    """Planilhas de DATA_RAW_DIR que casam com o padrão, em ordem de nome (arquivos temporários do Excel '~$' ignorados)."""
+    return sorted(path for path in DATA_RAW_DIR.glob(pattern) if not path.name.startswith('~$'))
+
+
+
+def _parse_sheet(file_path, sheet_name):
+    """Lê uma aba e aplica o plano de tipos (executada nos processos do pool). Retorna (DataFrame, segundos)."""
+
+    start = time.perf_counter()
+    df = apply_dtype_plan(pd.read_excel(file_path, sheet_name=sheet_name))
+    return df, time.perf_counter() - start
+
+
+
+def _batch_tasks(files, sheets):
+    """
+    Pares (arquivo, aba) a ler; abas ausentes e arquivos ilegíveis são registrados no log e ignorados.
+
+    Abas sem os cabeçalhos de REQUIRED_SOURCE_COLUMNS são rejeitadas (erro no log) antes do parse.
+    """
+
+    tasks = []
+    for file_path in files:
+        try:
+            workbook = load_workbook(file_path, read_only=True)
+            headers = {}
+            for sheet in sheets:
+                if sheet in workbook.sheetnames:
+                    first_row = next(workbook[sheet].iter_rows(max_row=1, values_only=True), ())
+                    headers[sheet] = {name for name in first_row if name is not None}
+            workbook.close()
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao abrir {file_path.name}: {e}")
+            continue
+
+        for sheet in sheets:
+            if sheet not in headers:
+                logger.warning(f"⚠️ Aba '{sheet}' não encontrada em {file_path.name}")
+                continue
+
+            missing = [column for column in REQUIRED_SOURCE_COLUMNS if column not in headers[sheet]]
+            if missing:
+                logger.error(f"❌ Aba '{sheet}' de {file_path.name} rejeitada: fora do formato da aba 'Country' "
+                             f"(colunas ausentes: {missing})")
+                continue
+
+            tasks.append((file_path, sheet))
+
+    return tasks
+
+
+
+def extract_batch(pattern: str = BATCH_FILE_PATTERN, sheets: list = BATCH_SHEETS,
+                  workers: int = EXTRACT_WORKERS, use_cache: bool = CACHE_ENABLED):
+    """
+    Extrai todas as planilhas de DATA_RAW_DIR que casam com `pattern`, lendo as abas em paralelo.
+
+    Cada par (arquivo, aba) é uma tarefa de um pool de processos: o parse do openpyxl é limitado por
+    CPU, então o tempo total cai quase linearmente com o número de núcleos. Abas já presentes no cache
+    colunar não vão para o pool, e as lidas agora são gravadas no cache pelo processo principal.
+    O resultado é concatenado com as colunas 'source_file' e 'sheet', e o tempo de parse de cada
+    arquivo é registrado no log.
+
+    Args:
+        pattern (str): Padrão glob dos arquivos (ETL_BATCH_PATTERN).
+        sheets (list[str]): Abas lidas de cada arquivo (ETL_BATCH_SHEETS), no formato da aba 'Country'.
+        workers (int): Processos do pool (ETL_EXTRACT_WORKERS; padrão: núcleos disponíveis).
+        use_cache (bool): Usa e alimenta o cache colunar.
+
+    Returns:
+        pd.DataFrame | None: Todas as abas concatenadas, ou None se nada pôde ser lido.
+    """
+
+    files = discover_workbooks(pattern)
+    if not files:
+        logger.error(f"❌ Nenhum arquivo '{pattern}' encontrado em {DATA_RAW_DIR}")
+        return None
+
+    tasks = _batch_tasks(files, sheets)
+    logger.info(f"📚 Extração em lote: {len(files)} arquivos, {len(tasks)} abas")
+
+    # uma impressão por arquivo, compartilhada pelas abas dele e pela gravação no cache
+    fingerprints = {file_path: file_fingerprint(file_path) for file_path, _ in tasks} if use_cache else {}
+
+    frames = {}
+    pending = []
+    for task in tasks:
+        cached = load_cached_frame(*task, fingerprint=fingerprints[task[0]]) if use_cache else None
+        if cached is None:
+            pending.append(task)
+        else:
+            frames[task] = apply_dtype_plan(cached)
+
+    start = time.perf_counter()
+    parse_seconds = 0.0
+
+    def collect(task, df, seconds):
+        nonlocal parse_seconds
+        parse_seconds += seconds
+        frames[task] = df
+        logger.info(f"📄 {task[0].name} [{task[1]}]: {len(df)} linhas em {seconds:.2f}s")
+        if use_cache:
+            store_cached_frame(task[0], df, task[1], fingerprint=fingerprints[task[0]])
+
+    workers = max(1, min(workers, len(pending)))
+
+    if workers == 1:
+        for task in pending:
+            try:
+                collect(task, *_parse_sheet(*task))
+            except Exception as e:
+                logger.error(f"⚠️ Erro ao ler {task[0].name} [{task[1]}]: {e}")
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_parse_sheet, *task): task for task in pending}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    collect(task, *future.result())
+                except Exception as e:
+                    logger.error(f"⚠️ Erro ao ler {task[0].name} [{task[1]}]: {e}")
+
+    if pending:
+        wall = time.perf_counter() - start
+        logger.info(f"⏱️  Parse de {len(pending)} abas com {workers} processos: {wall:.2f}s "
+                    f"(soma dos parses: {parse_seconds:.2f}s, {parse_seconds / wall if wall else 0:.1f}x)")
+
+    parts = [frames[task].assign(source_file=task[0].name, sheet=task[1]) for task in tasks if task in frames]
+    if not parts:
+        return None
 
-    logger.debug("Prévia das últimas 10 linhas:\n")
-    logger.debug(f"{df.tail(10)}\n")
+    # categorias diferentes entre arquivos viram object no concat; o plano de tipos recategoriza
+    df = apply_dtype_plan(pd.concat(parts, ignore_index=True))
+    logger.info(f"✅ {len(df)} registros extraídos de {len(parts)} abas")
 
     return df
 
@@ -58,4 +324,4 @@ if __name__ == "__main__":
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
 
-    extract_data()
\ No newline at end of file
+    extract_data(export=True)
\ No newline at end of file
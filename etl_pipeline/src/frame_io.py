@@ -0,0 +1,62 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Arquivos intermediários entre execuções isoladas das etapas (extract → text → numeric → validation).
+# Arrow IPC (Feather v2) sem compressão: o arquivo tem o mesmo layout da memória, então a leitura por
+# memory map não decodifica texto nem reinfere tipos - colunas numéricas sem nulos nem são copiadas.
+FRAME_SUFFIX = '.arrow'
+
+
+def write_frame(df, path):
+    """
+    Grava o DataFrame como Arrow IPC, preservando os tipos (categorias, Int16 anuláveis, string[pyarrow])
+    e o índice quando ele não é o padrão.
+
+    A gravação passa por um arquivo temporário, então uma etapa interrompida não deixa para a
+    seguinte um arquivo pela metade.
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix('.tmp')
+    # sem compressão: um bloco lz4/zstd precisaria ser descomprimido, o que impede o memory map
+    feather.write_feather(df, tmp_path, compression='uncompressed')
+    tmp_path.replace(path)
+
+    logger.info(f"📁 {len(df)} registros salvos em: {path} ({path.stat().st_size / 1024:.0f} KB)")
+
+
+
+def read_frame(path, columns=None):
+    """
+    Lê um arquivo gravado por write_frame via memory map.
+
+    Args:
+        path (Path): Arquivo .arrow da etapa anterior.
+        columns (list[str] | None): Lê só estas colunas (as demais nem são tocadas no disco).
+
+    Returns:
+        pd.DataFrame: Os dados com os mesmos tipos do DataFrame gravado.
+    """
+
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    # split_blocks evita consolidar as colunas num bloco 2D, o que copiaria os buffers mapeados
+    return table.to_pandas(split_blocks=True)
+
+
+
+def read_input(path):
+    """Lê a entrada de uma etapa: Arrow IPC pelo memory map ou, para arquivos informados à mão, CSV."""
+
+    path = Path(path)
+    if path.suffix == FRAME_SUFFIX:
+        return read_frame(path)
+
+    return pd.read_csv(path)
@@ -0,0 +1,169 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from schema import COMPOSED_KEY, KEY_HASH_COLUMN
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# sufixo temporário das colunas da chave do lado direito em merge_on_key
+RIGHT_KEY_SUFFIX = '__right'
+
+
+def compute_key_hash(df, columns=COMPOSED_KEY):
+    """
+    Hash de 64 bits da chave composta, vetorizado (uma passada por coluna, sem tuplas em Python).
+
+    O ano é convertido para float64 antes do hash: o mesmo registro gera o mesmo hash lido como
+    Int16 do pipeline, int64 do banco ou float de um CSV. Textos geram o mesmo hash como 'category',
+    object ou 'string[pyarrow]'.
+
+    Returns:
+        pd.Series: Hashes como int64, com o mesmo índice do DataFrame.
+    """
+
+    canonical = df[columns].astype({'year': 'float64'}) if 'year' in columns else df[columns]
+    hashes = pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+    return pd.Series(hashes.view('int64'), index=df.index, name=KEY_HASH_COLUMN)
+
+
+
+def add_key_hash(df):
+    """Acrescenta a coluna KEY_HASH_COLUMN ao DataFrame transformado (última etapa das transformações)."""
+
+    df[KEY_HASH_COLUMN] = compute_key_hash(df)
+    logger.info(f"✅ Hash da chave composta calculado para {len(df)} registros")
+    return df
+
+
+
+def key_hash(df):
+    """Hash da chave composta já calculado nas transformações, ou calculado agora se a coluna não existir."""
+
+    if KEY_HASH_COLUMN in df.columns:
+        return df[KEY_HASH_COLUMN]
+    return compute_key_hash(df)
+
+
+
+def duplicated_keys(df, keep='first'):
+    """
+    Equivalente exato de df.duplicated(subset=COMPOSED_KEY, keep=keep), guiado pelo hash.
+
+    A busca de repetições é feita só na coluna int64 do hash (tabela hash, O(n)); as colunas da
+    chave são comparadas apenas nas linhas com hash repetido. Duas chaves diferentes com o mesmo
+    hash (colisão) não são marcadas, então o resultado é sempre o mesmo da comparação completa.
+
+    Returns:
+        pd.Series: Máscara booleana com o índice do DataFrame.
+    """
+
+    candidates = key_hash(df).duplicated(keep=False).to_numpy()
+    result = np.zeros(len(df), dtype=bool)
+
+    if candidates.any():
+        result[candidates] = df.loc[candidates, COMPOSED_KEY].duplicated(keep=keep).to_numpy()
+
+    return pd.Series(result, index=df.index)
+
+
+
+def duplicate_groups(df):
+    """
+    Registros cuja chave composta aparece mais de uma vez, agrupados pela chave.
+
+    Returns:
+        pd.DataFrame: As linhas repetidas (todas as ocorrências), ordenadas pela chave composta.
+    """
+
+    repeated = duplicated_keys(df, keep=False).to_numpy()
+    return df[repeated].sort_values(COMPOSED_KEY, kind='stable')
+
+
+
+def _keys_differ(merged):
+    """Pares em que as colunas da chave dos dois lados não são iguais (nulos dos dois lados contam como iguais)."""
+
+    differ = np.zeros(len(merged), dtype=bool)
+    for col in COMPOSED_KEY:
+        left = merged[col].astype(object)
+        right = merged[f"{col}{RIGHT_KEY_SUFFIX}"].astype(object)
+        differ |= ~((left == right) | (left.isna() & right.isna())).to_numpy()
+    return differ
+
+
+
+def keep_latest_release(df, column='source_file'):
+    """
+    Extração em lote: quando a mesma chave composta aparece em mais de um arquivo (edições anuais da
+    planilha da IRENA repetem a série histórica), mantém só as linhas do arquivo mais recente.
+
+    A ordem das edições é a ordem de nome dos arquivos (a mesma de discover_workbooks): o arquivo cujo
+    nome ordena por último vence, então nomes como 'IRENA_2023.xlsx' e 'IRENA_2024.xlsx' bastam.
+    Duplicatas dentro de um mesmo arquivo são mantidas, para a regra 'composed_key' da validação.
+
+    Returns:
+        pd.DataFrame: As linhas das edições mais recentes de cada chave, na ordem original.
+    """
+
+    if column not in df.columns or df[column].nunique() < 2:
+        return df
+
+    releases = sorted(df[column].dropna().unique())
+    rank = df[column].map({name: position for position, name in enumerate(releases)}).astype('int64')
+
+    # agrupa pelas colunas da chave (não pelo hash): uma colisão não pode descartar um registro
+    latest = rank.groupby([df[col] for col in COMPOSED_KEY], observed=True, dropna=False, sort=False).transform('max')
+    keep = (rank == latest).to_numpy()
+
+    if not keep.all():
+        logger.info(f"🗂️  {int((~keep).sum())} registros substituídos por edições mais recentes "
+                    f"(ordem: {', '.join(releases)})")
+    return df[keep]
+
+
+
+def merge_on_key(left, right, how='outer', suffixes=('', '_db')):
+    """
+    Junção de dois DataFrames pela chave composta, comparando só o hash de 64 bits.
+
+    Os valores da chave são conferidos nas linhas pareadas; se houver colisão (chaves diferentes com
+    o mesmo hash), a junção é refeita pelas próprias colunas da chave, então o resultado é sempre
+    exato. O formato é o de left.merge(right, on=COMPOSED_KEY, how=how, indicator=True).
+
+    Args:
+        left (pd.DataFrame): Lado esquerdo, com as colunas da chave (e o hash, se já calculado).
+        right (pd.DataFrame): Lado direito, idem.
+        how (str): Tipo de junção do pandas.
+        suffixes (tuple[str, str]): Sufixos das demais colunas com o mesmo nome.
+
+    Returns:
+        pd.DataFrame: Resultado da junção, com a coluna '_merge'.
+    """
+
+    left_hash, right_hash = key_hash(left).to_numpy(), key_hash(right).to_numpy()
+    left = left.drop(columns=KEY_HASH_COLUMN, errors='ignore').assign(**{KEY_HASH_COLUMN: left_hash})
+    right = (right.drop(columns=KEY_HASH_COLUMN, errors='ignore')
+             .rename(columns={col: f"{col}{RIGHT_KEY_SUFFIX}" for col in COMPOSED_KEY})
+             .assign(**{KEY_HASH_COLUMN: right_hash}))
+
+    merged = left.merge(right, on=KEY_HASH_COLUMN, how=how, suffixes=suffixes, indicator=True)
+
+    both = (merged['_merge'] == 'both').to_numpy()
+    if both.any() and _keys_differ(merged[both]).any():
+        logger.warning("⚠️ Colisão no hash da chave composta: junção refeita pelas colunas da chave")
+        right = right.rename(columns={f"{col}{RIGHT_KEY_SUFFIX}": col for col in COMPOSED_KEY})
+        return (left.drop(columns=KEY_HASH_COLUMN)
+                .merge(right.drop(columns=KEY_HASH_COLUMN), on=COMPOSED_KEY, how=how, suffixes=suffixes, indicator=True))
+
+    # registros só do lado direito trazem a chave de lá
+    right_only = (merged['_merge'] == 'right_only').to_numpy()
+    for col in COMPOSED_KEY:
+        right_col = merged.pop(f"{col}{RIGHT_KEY_SUFFIX}")
+        if right_only.any():
+            merged[col] = merged[col].astype(object).where(~right_only, right_col.astype(object))
+
+    return merged.drop(columns=KEY_HASH_COLUMN)
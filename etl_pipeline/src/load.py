@@ -1,95 +1,671 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import logging
 from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from pathlib import Path
-from config import DATA_PROCESSED_DIR
+from config import DATA_PROCESSED_DIR, LOAD_METHOD, LOAD_MODE, SWAP_LOCK_TIMEOUT_MS, MIRROR_ENABLED, VALIDATION_FAIL_FAST
 from config import get_engine, check_connection
+from transform.numeric import metric_columns
+from metrics import measure
+from mirror import write_mirror, read_star
+from rollups import refresh_rollups
+from keys import key_hash, duplicated_keys, merge_on_key
+from schema import COMPOSED_KEY, KEY_HASH_COLUMN
 
 logger = logging.getLogger(__name__)
 
 INPUT_FILE = DATA_PROCESSED_DIR / 'renewable_energy_data_final.csv'
 
+# Se o load.py está em /app/src/ e o sql em /app/
+SQL_PATH = Path(__file__).parent.parent / 'sql' / 'create_tables.sql'
 
-def load_dimensions(df, conn):
-    """Extrai e carrega as tabelas de dimensão garantindo a unicidade dos registros (Drop Duplicates)."""
+LOAD_METHODS = ('copy', 'insert')
+LOAD_MODES = ('full', 'incremental', 'swap')
+
+# marcador de nulo do COPY (o mesmo do formato texto do Postgres)
+COPY_NULL = '\\N'
+
+# chave composta que identifica um registro da tabela fato
+FACT_KEY = COMPOSED_KEY
+
+FACT_ID_COLUMNS = ['country_id', 'technology_id', 'time_id', 'producer_id']
+FACT_COLUMNS = FACT_ID_COLUMNS + metric_columns + ['row_hash']
+
+# id, chave natural e atributos de cada dimensão
+DIMENSIONS = {
+    'dim_country': {'id': 'country_id', 'key': ['country'], 'attributes': ['iso3_code', 'm49_code', 'region', 'sub_region']},
+    'dim_technology': {'id': 'technology_id', 'key': ['technology', 'sub_technology', 'group_technology', 'renewable_or_not'], 'attributes': []},
+    'dim_time': {'id': 'time_id', 'key': ['year'], 'attributes': ['decade']},
+    'dim_producer': {'id': 'producer_id', 'key': ['producer_type'], 'attributes': []},
+}
+
+FACT_TABLE = 'fact_energy_generation'
+
+# tabelas do star schema e a coluna SERIAL de cada uma
+STAR_TABLES = {**{table: spec['id'] for table, spec in DIMENSIONS.items()}, FACT_TABLE: 'fact_id'}
+
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_retired'
+SWAP_RETRIES = 5
+
+EXISTING_FACT_SQL = """
+    SELECT f.fact_id, c.country, ti.year, t.technology, t.sub_technology, p.producer_type,
+           COALESCE(f.row_hash, 0) AS row_hash
+    FROM fact_energy_generation f
+    LEFT JOIN dim_country c ON c.country_id = f.country_id
+    LEFT JOIN dim_technology t ON t.technology_id = f.technology_id
+    LEFT JOIN dim_time ti ON ti.time_id = f.time_id
+    LEFT JOIN dim_producer p ON p.producer_id = f.producer_id
+"""
+
+
+def _copy_table(df, table, conn):
+    """
+    Envia o DataFrame para a tabela via COPY FROM STDIN, usando um buffer csv em memória.
+
+    Nulos vão como \\N: no COPY csv um campo vazio sem aspas seria lido como NULL, e o texto '' (que a
+    carga por to_sql grava como '') chegaria nulo.
+    """
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+    buffer.seek(0)
+
+    columns = ', '.join(df.columns)
+
+    # conn.connection é a conexão psycopg2 da própria transação aberta em load_data
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+    finally:
+        cursor.close()
+
+
+
+def write_table(df, table, conn, method=LOAD_METHOD):
+    """
+    Grava o DataFrame em uma tabela existente usando o método de carga configurado.
+
+    - 'copy': transmite todas as linhas em um único COPY FROM STDIN (PostgreSQL).
+    - 'insert': usa DataFrame.to_sql em lotes de 500 linhas.
+
+    Em ambos os casos a escrita acontece na conexão recebida, ou seja, dentro da transação atual.
+    O tempo e a vazão (linhas/s) são registrados no log para comparação entre os métodos.
+
+    Args:
+        df (pd.DataFrame): Dados com colunas de mesmo nome das colunas da tabela.
+        table (str): Nome da tabela de destino.
+        conn (sqlalchemy.engine.Connection): Conexão com a transação ativa.
+        method (str): 'copy' ou 'insert'.
+    """
+
+    start = time.perf_counter()
+
+    if method == 'copy':
+        _copy_table(df, table, conn)
+    elif method == 'insert':
+        df.to_sql(table, conn, if_exists='append', index=False, chunksize=500)
+    else:
+        raise ValueError(f"Método de carga desconhecido: '{method}' (opções: {LOAD_METHODS})")
+
+    elapsed = time.perf_counter() - start
+    rate = len(df) / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"    ⏱️  {table}: {len(df)} linhas em {elapsed:.2f}s ({rate:,.0f} linhas/s via {method})")
+
+
+def load_dimensions(star, conn):
+    """Carrega as tabelas de dimensão já com os IDs atribuídos em memória por build_star_schema."""
 
     logger.info("Carregando dimensões...")
 
-    # dim_country
-    logger.info("  → dim_country...")
-    df_country = df[['country', 'iso3_code', 'm49_code', 'region', 'sub_region']].drop_duplicates()
-    df_country.to_sql('dim_country', conn, if_exists='append', index=False, chunksize=500)
-    logger.info(f"    ✅ {len(df_country)} países inseridos")
-
-    # dim_technology
-    logger.info("  → dim_technology...")
-    df_tech = df[['technology', 'sub_technology', 'group_technology', 'renewable_or_not']].drop_duplicates()
-    df_tech.to_sql('dim_technology', conn, if_exists='append', index=False, chunksize=500)
-    logger.info(f"    ✅ {len(df_tech)} tecnologias inseridas")
-
-    # dim_time
-    logger.info("  → dim_time...")
-    df_time = df[['year']].drop_duplicates()
-    df_time['decade'] = (df_time['year'] // 10) * 10
-    df_time.to_sql('dim_time', conn, if_exists='append', index=False, chunksize=500)
-    logger.info(f"    ✅ {len(df_time)} anos inseridos")
-
-    # dim_producer
-    logger.info("  → dim_producer...")
-    df_producer = df[['producer_type']].drop_duplicates()
-    df_producer.to_sql('dim_producer', conn, if_exists='append', index=False, chunksize=500)
-    logger.info(f"    ✅ {len(df_producer)} tipos de produtor inseridos")
+    for table in DIMENSIONS:
+        logger.info(f"  → {table}...")
+        write_table(star[table], table, conn)
+        logger.info(f"    ✅ {len(star[table])} registros inseridos")
+
+    sync_sequences(conn)
 
     logger.info("✅ Dimensões carregadas!\n")
 
 
-def get_ids_dimensions(df, conn):
-    """Converte atributos textuais em IDs numéricos via lookup nas tabelas de dimensão, preparando o esquema para a tabela fato."""
 
-    logger.info("Mapeando IDs das dimensões...")
+def _factorize_key(frame):
+    """
+    Converte a chave natural (uma ou mais colunas) em códigos inteiros 0..n-1, em ordem de aparição.
 
-    # Lê as dimensões do banco
-    dim_country = pd.read_sql('SELECT country_id, country FROM dim_country', conn)
-    dim_tech = pd.read_sql('SELECT technology_id, technology FROM dim_technology', conn)
-    dim_time = pd.read_sql('SELECT time_id, year FROM dim_time', conn)
-    dim_producer = pd.read_sql('SELECT producer_id, producer_type FROM dim_producer', conn)
-    
-    # Faz merge para obter IDs
-    df = df.merge(dim_country, on='country', how='left')
-    df = df.merge(dim_tech, on='technology', how='left')
-    df = df.merge(dim_time, on='year', how='left')
-    df = df.merge(dim_producer, on='producer_type', how='left')
-    
-    logger.info("✅ IDs mapeados!\n")
-    
-    return df
+    Cada coluna é fatorada separadamente e os códigos são combinados e refatorados a cada passo,
+    então o resultado nunca passa do número de linhas. Valores nulos contam como um valor da chave.
+    """
+
+    codes = np.zeros(len(frame), dtype='int64')
+
+    for col in frame.columns:
+        col_codes, uniques = pd.factorize(frame[col], use_na_sentinel=False)
+        codes, _ = pd.factorize(codes * len(uniques) + col_codes)
+
+    return codes
+
+
+
+def _dimension_ids(df, table, existing=None):
+    """
+    Atribui os IDs de uma dimensão a partir da chave natural completa.
+
+    Args:
+        df (pd.DataFrame): DataFrame final do pipeline.
+        table (str): Nome da dimensão (chave de DIMENSIONS).
+        existing (pd.DataFrame, opcional): Dimensão já gravada no banco (id + chave); membros já
+            conhecidos mantêm o ID e os novos recebem IDs a partir do maior existente.
+
+    Returns:
+        tuple[pd.DataFrame, np.ndarray]: Os membros da dimensão (com o ID) e o ID de cada linha de `df`.
+    """
+
+    spec = DIMENSIONS[table]
+    id_col, key = spec['id'], spec['key']
+
+    codes = _factorize_key(df[key])
+
+    # os códigos seguem a ordem de aparição, então a primeira ocorrência de cada código já vem ordenada
+    first_rows = pd.Series(codes).drop_duplicates().index.to_numpy()
+    members = df[[col for col in key + spec['attributes'] if col in df.columns]].iloc[first_rows].reset_index(drop=True)
+
+    if table == 'dim_time':
+        members = members.astype({'year': 'int64'})
+        members['decade'] = (members['year'] // 10) * 10
+
+    if existing is None or existing.empty:
+        member_ids = np.arange(1, len(members) + 1, dtype='int64')
+    else:
+        known = existing[[id_col] + key].drop_duplicates(subset=key)
+        matched = members[key].merge(known, on=key, how='left')[id_col]
+        missing = matched.isna()
+        next_id = int(existing[id_col].max()) + 1
+        matched[missing] = np.arange(next_id, next_id + missing.sum())
+        member_ids = matched.to_numpy(dtype='int64')
+
+    members.insert(0, id_col, member_ids)
+
+    return members, member_ids[codes]
+
+
+
+def build_star_schema(df, existing=None):
+    """
+    Monta em memória as dimensões e a tabela fato do star schema.
+
+    Os IDs das dimensões são atribuídos no cliente a partir de códigos inteiros da chave natural
+    completa (ex.: technology + sub_technology + group_technology + renewable_or_not), então não é
+    preciso ler as dimensões de volta do banco nem fazer merge do DataFrame inteiro. A tabela fato
+    é montada diretamente dos vetores de IDs, com uma linha por linha de `df`.
+
+    Args:
+        df (pd.DataFrame): DataFrame final do pipeline.
+        existing (dict, opcional): Dimensões já gravadas no banco, por tabela (carga incremental).
+
+    Returns:
+        dict[str, pd.DataFrame]: As quatro dimensões e 'fact_energy_generation'.
+    """
+
+    existing = existing or {}
+
+    star = {}
+    fact = {}
+    for table, spec in DIMENSIONS.items():
+        star[table], fact[spec['id']] = _dimension_ids(df, table, existing.get(table))
+
+    fact = pd.DataFrame(fact, index=df.index)
+    for col in metric_columns + ['row_hash']:
+        if col in df.columns:
+            fact[col] = df[col]
+
+    star['fact_energy_generation'] = fact
+
+    return star
 
 
-def load_fact(df, conn):
+
+def sync_sequences(conn, tables=None):
+    """Ajusta as sequences ao maior ID gravado (por padrão, das dimensões), já que os IDs são atribuídos no cliente."""
+
+    tables = tables or {table: spec['id'] for table, spec in DIMENSIONS.items()}
+
+    for table, id_col in tables.items():
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{id_col}'), COALESCE(MAX({id_col}), 0) + 1, false) FROM {table}"
+        ))
+
+
+
+def load_fact(df_fact, conn):
     """ Carrega a tabela fato com os dados de geração de energia, utilizando os IDs das dimensões e as métricas numéricas."""
 
     logger.info("Carregando tabela fato...")
 
-    # Seleciona apenas colunas necessárias
-    df_fact = df[[
-        'country_id', 'technology_id', 'time_id', 'producer_id',
-        'electricity_generation_gwh', 'electricity_installed_capacity_mw', 'heat_generation_tj',
-        'total_public_flows_usd_m', 'international_public_flows_usd_m',
-        'capacity_per_capita_w'
-    ]]
-
     # Insere
-    df_fact.to_sql('fact_energy_generation', conn, if_exists='append', index=False, chunksize=500)
+    write_table(df_fact[FACT_COLUMNS], 'fact_energy_generation', conn)
     
     logger.info(f"✅ {len(df_fact)} registros inseridos na tabela fato!\n")
 
 
 
+def compute_row_hash(df):
+    """
+    Calcula um hash de 64 bits por linha, usado para detectar registros alterados entre cargas.
+
+    O hash cobre a chave composta, os atributos que definem a tecnologia e as métricas. Os tipos
+    são normalizados antes (ano inteiro, métricas float64) para que o mesmo dado gere sempre o
+    mesmo hash, independentemente de como foi lido.
+
+    Returns:
+        pd.Series: Hashes como int64 (tipo BIGINT no banco), com o mesmo índice do DataFrame.
+    """
+
+    columns = FACT_KEY + ['group_technology', 'renewable_or_not'] + metric_columns
+    canonical = df[columns].astype({'year': 'int64', **{col: 'float64' for col in metric_columns}})
+    hashes = pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+    return pd.Series(hashes.view('int64'), index=df.index)
+
+
+
+def _same_values(current, stored):
+    """Compara valores do DataFrame com os lidos do banco, tolerando diferenças de tipo (ex.: 4 x '4.0')."""
+
+    if pd.api.types.is_numeric_dtype(current) or pd.api.types.is_numeric_dtype(stored):
+        current, stored = pd.to_numeric(current, errors='coerce'), pd.to_numeric(stored, errors='coerce')
+    else:
+        current, stored = current.astype('string'), stored.astype('string')
+
+    same = (current == stored).fillna(False) | (current.isna() & stored.isna())
+    return same.to_numpy(dtype=bool)
+
+
+
+def _update_from_frame(df, table, id_col, conn):
+    """Atualiza linhas existentes (pelo id) com os valores do DataFrame, via tabela temporária."""
+
+    delta = f"{table}_delta"
+    conn.execute(text(f"CREATE TEMP TABLE {delta} AS SELECT {', '.join(df.columns)} FROM {table} WITH NO DATA"))
+    write_table(df, delta, conn)
+
+    assignments = ', '.join(f"{col} = d.{col}" for col in df.columns if col != id_col)
+    conn.execute(text(f"UPDATE {table} t SET {assignments} FROM {delta} d WHERE t.{id_col} = d.{id_col}"))
+    conn.execute(text(f"DROP TABLE {delta}"))
+
+
+
+def read_dimension(table, conn):
+    """Lê uma dimensão do banco (id, chave natural e atributos)."""
+
+    spec = DIMENSIONS[table]
+    return pd.read_sql(f"SELECT {', '.join([spec['id']] + spec['key'] + spec['attributes'])} FROM {table}", conn)
+
+
+
+def upsert_dimension(members, existing, table, conn):
+    """
+    Sincroniza uma dimensão sem reemitir IDs: insere apenas membros novos e atualiza atributos alterados.
+
+    Args:
+        members (pd.DataFrame): Membros da dimensão com IDs já atribuídos (build_star_schema).
+        existing (pd.DataFrame): A mesma dimensão, como está gravada no banco.
+        table (str): Nome da dimensão (chave de DIMENSIONS).
+        conn (sqlalchemy.engine.Connection): Conexão com a transação ativa.
+
+    Returns:
+        set[str]: Atributos alterados em algum membro existente (ex.: a região de um país). Essas
+            mudanças não alteram o row_hash da fato, então os agregados por esses atributos precisam
+            ser recalculados por inteiro.
+    """
+
+    spec = DIMENSIONS[table]
+    id_col, attributes = spec['id'], spec['attributes']
+
+    merged = members.merge(existing.drop(columns=spec['key']), on=id_col, how='left', suffixes=('', '_db'), indicator=True)
+    known = (merged['_merge'] == 'both').to_numpy()
+
+    new = members[~known]
+    if len(new) > 0:
+        write_table(new, table, conn)
+
+    changed = np.zeros(len(merged), dtype=bool)
+    changed_attributes = set()
+    for col in attributes:
+        differs = known & ~_same_values(merged[col], merged[f"{col}_db"])
+        if differs.any():
+            changed_attributes.add(col)
+        changed |= differs
+
+    if changed.any():
+        _update_from_frame(members.loc[changed, [id_col] + attributes], table, id_col, conn)
+
+    logger.info(f"    ✅ {table}: {len(new)} novos, {int(changed.sum())} atualizados, {int(known.sum() - changed.sum())} inalterados")
+    return changed_attributes
+
+
+
+def load_incremental(df, conn):
+    """
+    Carga incremental: aplica no DW apenas a diferença em relação à carga anterior.
+
+    Os registros são comparados pela chave composta (FACT_KEY) e pelo hash de linha:
+    - chave nova → INSERT
+    - chave existente com hash diferente → UPDATE (mantém o fact_id)
+    - chave que não veio nesta execução → DELETE
+
+    As dimensões recebem apenas os membros novos, então os IDs já emitidos continuam os mesmos.
+
+    Args:
+        df (pd.DataFrame): DataFrame final do pipeline, com a coluna 'row_hash'.
+        conn (sqlalchemy.engine.Connection): Conexão com a transação ativa.
+
+    Returns:
+        tuple[set[int], set[str]]: Anos com registros inseridos, alterados ou removidos e atributos de
+            dimensão alterados (atualização dos agregados).
+    """
+
+    logger.info("Sincronizando dimensões...")
+    existing_dims = {table: read_dimension(table, conn) for table in DIMENSIONS}
+    star = build_star_schema(df, existing_dims)
+
+    changed_attributes = set()
+    for table in DIMENSIONS:
+        changed_attributes |= upsert_dimension(star[table], existing_dims[table], table, conn)
+    sync_sequences(conn)
+
+    logger.info("Calculando diferença da tabela fato...")
+    # as chaves são pareadas pelo hash de 64 bits das transformações (keys.py), conferido no merge
+    incoming = pd.concat([df[FACT_KEY], star['fact_energy_generation']], axis=1).assign(**{KEY_HASH_COLUMN: key_hash(df)})
+    deduplicated = incoming[~duplicated_keys(incoming, keep='last').to_numpy()]
+    if len(deduplicated) < len(incoming):
+        logger.warning(f"⚠️ {len(incoming) - len(deduplicated)} registros com chave composta repetida - mantendo o último")
+
+    existing = pd.read_sql(EXISTING_FACT_SQL, conn)
+    existing[KEY_HASH_COLUMN] = key_hash(existing)
+    repeated = duplicated_keys(existing, keep='first')
+    stale_years = existing.loc[repeated, 'year']
+    existing, stale_ids = existing[~repeated], existing.loc[repeated, 'fact_id']
+
+    # Int64 (nullable) evita que o merge externo converta os hashes para float e perca precisão
+    deduplicated = deduplicated.astype({'row_hash': 'Int64'})
+    existing = existing.astype({'row_hash': 'Int64', 'fact_id': 'Int64'})
+
+    merged = merge_on_key(deduplicated, existing, how='outer', suffixes=('', '_db'))
+
+    new = merged[merged['_merge'] == 'left_only']
+    changed = merged[(merged['_merge'] == 'both') & (merged['row_hash'] != merged['row_hash_db']).fillna(True)]
+    deleted_ids = pd.concat([merged.loc[merged['_merge'] == 'right_only', 'fact_id'], stale_ids])
+    unchanged = (merged['_merge'] == 'both').sum() - len(changed)
+
+    logger.info(f"  ➕ {len(new)} novos | ✏️  {len(changed)} alterados | ➖ {len(deleted_ids)} removidos | = {unchanged} inalterados")
+
+    # o merge externo transforma os IDs em float; Int64 mantém o tipo inteiro esperado pelo COPY
+    id_types = {col: 'Int64' for col in ['fact_id'] + FACT_ID_COLUMNS}
+
+    if len(new) > 0:
+        load_fact(new.astype({col: 'Int64' for col in FACT_ID_COLUMNS}), conn)
+
+    if len(changed) > 0:
+        _update_from_frame(changed[['fact_id'] + FACT_COLUMNS].astype(id_types), 'fact_energy_generation', 'fact_id', conn)
+
+    if len(deleted_ids) > 0:
+        conn.execute(
+            text("DELETE FROM fact_energy_generation WHERE fact_id = ANY(:ids)"),
+            {'ids': [int(i) for i in deleted_ids]}
+        )
+
+    logger.info("✅ Carga incremental aplicada!\n")
+
+    # chaves repetidas removidas do banco (stale_ids) também mudam os totais do ano delas
+    touched = (merged['_merge'] != 'both') | merged.index.isin(changed.index)
+    years = pd.concat([merged.loc[touched, 'year'], stale_years]).dropna()
+    return {int(year) for year in years.unique()}, changed_attributes
+
+
+
+def star_constraints():
+    """
+    Restrições do star schema como (tabela, nome, definição), na ordem de criação.
+
+    - chaves primárias (nomes gerados pelo PostgreSQL para o create_tables.sql);
+    - chave natural única de cada dimensão (nulos contam como valor, como em _factorize_key);
+    - chave composta única da fato: os quatro IDs identificam um registro de FACT_KEY;
+    - FKs da fato, com o sufixo da tabela referenciada como '{suffix}', para apontarem para as
+      dimensões de staging durante a carga swap.
+    """
+
+    constraints = [(table, f"{table}_pkey", f"PRIMARY KEY ({id_col})") for table, id_col in STAR_TABLES.items()]
+
+    for table, spec in DIMENSIONS.items():
+        constraints.append((table, f"{table}_natural_key", f"UNIQUE NULLS NOT DISTINCT ({', '.join(spec['key'])})"))
+
+    constraints.append((FACT_TABLE, f"{FACT_TABLE}_composite_key", f"UNIQUE ({', '.join(FACT_ID_COLUMNS)})"))
+
+    for table, spec in DIMENSIONS.items():
+        id_col = spec['id']
+        constraints.append((FACT_TABLE, f"{FACT_TABLE}_{id_col}_fkey",
+                            f"FOREIGN KEY ({id_col}) REFERENCES {table}{{suffix}}({id_col})"))
+
+    return constraints
+
+
+
+def star_indexes():
+    """
+    Índices das FKs da fato (joins da camada de BI) como (tabela, nome, colunas).
+
+    country_id não precisa de índice próprio: é a primeira coluna da chave composta única.
+    """
+
+    return [(FACT_TABLE, f"{FACT_TABLE}_{id_col}_idx", id_col) for id_col in FACT_ID_COLUMNS[1:]]
+
+
+
+def _constraint_exists(conn, table, name):
+    return conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = to_regclass(:table)"),
+        {'name': name, 'table': table}
+    ).scalar() is not None
+
+
+
+def drop_star_indexes(conn):
+    """
+    Remove índices e restrições do star schema antes de uma carga em massa (FKs primeiro).
+
+    Com as tabelas vazias (TRUNCATE), o COPY não mantém índices nem verifica FKs linha a linha;
+    build_star_indexes recria tudo ao final, na mesma transação.
+    """
+
+    for table, name, _ in star_indexes():
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    for table, name, _ in reversed(star_constraints()):
+        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}"))
+
+
+
+def build_star_indexes(conn, suffix=''):
+    """
+    Cria as restrições e índices do star schema que estiverem faltando e atualiza as estatísticas.
+
+    Depois de drop_star_indexes (carga full) ou em tabelas de staging novas, recria tudo; numa carga
+    incremental, só o que faltar (ex.: um banco criado antes destas restrições). O tempo de cada
+    objeto criado vai para o log.
+
+    Args:
+        conn (sqlalchemy.engine.Connection): Conexão com a transação ativa.
+        suffix (str): Sufixo das tabelas e dos nomes ('_staging' na carga swap).
+
+    Returns:
+        dict[str, float]: Segundos gastos por objeto criado.
+    """
+
+    timings = {}
+
+    def timed(name, statement):
+        start = time.perf_counter()
+        conn.execute(text(statement))
+        timings[name] = time.perf_counter() - start
+
+    for table, name, definition in star_constraints():
+        if not _constraint_exists(conn, f"{table}{suffix}", f"{name}{suffix}"):
+            timed(name, f"ALTER TABLE {table}{suffix} ADD CONSTRAINT {name}{suffix} {definition.format(suffix=suffix)}")
+
+    for table, name, column in star_indexes():
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': f"{name}{suffix}"}).scalar() is None:
+            timed(name, f"CREATE INDEX {name}{suffix} ON {table}{suffix} ({column})")
+
+    if timings:
+        for table in STAR_TABLES:
+            conn.execute(text(f"ANALYZE {table}{suffix}"))
+
+        for name, seconds in timings.items():
+            logger.info(f"    ⏱️  {name}: {seconds:.2f}s")
+        logger.info(f"✅ {len(timings)} índices e restrições criados em {sum(timings.values()):.2f}s")
+
+    return timings
+
+
+
+def prepare_staging(conn):
+    """Recria as tabelas *_staging vazias, com as colunas das tabelas publicadas e sem índices nem restrições."""
+
+    for table in reversed(list(STAR_TABLES)):
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}{STAGING_SUFFIX}, {table}{RETIRED_SUFFIX}"))
+
+    for table in STAR_TABLES:
+        conn.execute(text(f"CREATE TABLE {table}{STAGING_SUFFIX} (LIKE {table})"))
+
+
+
+def fill_staging(star, engine):
+    """
+    Carrega cada tabela de staging em paralelo, uma conexão (e uma transação) por tabela.
+
+    Sem restrições nas tabelas de staging, a ordem entre dimensões e fato não importa; a
+    integridade é verificada depois, quando as FKs são criadas.
+    """
+
+    def fill(table):
+        with engine.begin() as conn:
+            write_table(star[table], f"{table}{STAGING_SUFFIX}", conn)
+
+    with ThreadPoolExecutor(max_workers=len(STAR_TABLES)) as pool:
+        # list() propaga a primeira exceção de qualquer thread
+        list(pool.map(fill, STAR_TABLES))
+
+
+
+def publish_staging(conn):
+    """
+    Troca as tabelas publicadas pelas de staging em uma única transação curta.
+
+    Cada tabela publicada vira *_retired e a de staging assume o nome dela. A sequence do SERIAL
+    passa a pertencer à nova tabela (senão seria removida junto com a antiga) e volta a ser o
+    default do ID. Depois as tabelas antigas são removidas, sem CASCADE: se houver uma view que
+    dependa delas a troca inteira é desfeita, e as restrições recebem os nomes definitivos.
+    """
+
+    conn.execute(text(f"SET LOCAL lock_timeout = {int(SWAP_LOCK_TIMEOUT_MS)}"))
+
+    # todos os locks de uma vez, antes de qualquer rename
+    tables = [FACT_TABLE] + list(DIMENSIONS)
+    conn.execute(text(f"LOCK TABLE {', '.join(tables)} IN ACCESS EXCLUSIVE MODE"))
+
+    for table in tables:
+        id_col = STAR_TABLES[table]
+        sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{table}', '{id_col}')")).scalar()
+
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}{RETIRED_SUFFIX}"))
+        conn.execute(text(f"ALTER TABLE {table}{STAGING_SUFFIX} RENAME TO {table}"))
+
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{id_col}"))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {id_col} SET DEFAULT nextval('{sequence}'::regclass)"))
+
+    for table in tables:
+        conn.execute(text(f"DROP TABLE {table}{RETIRED_SUFFIX}"))
+
+    for table, name, _ in star_constraints():
+        conn.execute(text(f"ALTER TABLE {table} RENAME CONSTRAINT {name}{STAGING_SUFFIX} TO {name}"))
+
+    for _, name, _ in star_indexes():
+        conn.execute(text(f"ALTER INDEX {name}{STAGING_SUFFIX} RENAME TO {name}"))
+
+    sync_sequences(conn, STAR_TABLES)
+
+
+
+def load_swap(df, engine):
+    """
+    Carga 'swap': preenche tabelas de staging sem bloquear leitores e publica com uma troca de nomes.
+
+    1. cria *_staging vazias (transação própria);
+    2. carrega cada tabela em paralelo, uma conexão por tabela;
+    3. cria chaves, restrições e índices nas tabelas de staging (build_star_indexes);
+    4. atualiza os agregados (refresh_rollups) e publica trocando os nomes, na mesma transação, com
+       lock_timeout e novas tentativas.
+
+    As tabelas publicadas só ficam bloqueadas na troca de nomes, que não depende do volume de dados: os
+    agregados vêm do DataFrame em memória e são gravados antes dela. Se algo falhar antes do commit,
+    tabelas publicadas e agregados continuam como estavam.
+
+    Returns:
+        dict[str, pd.DataFrame]: O star schema publicado, com os IDs gravados no banco.
+    """
+
+    with measure('load.prepare_staging'):
+        with engine.begin() as conn:
+            create_tables_from_sql(conn)
+            prepare_staging(conn)
+
+    with measure('load.build_star_schema', rows_in=len(df)) as record:
+        star = build_star_schema(df)
+        # sem o default da sequence na staging, o ID da fato também é atribuído no cliente
+        fact = star[FACT_TABLE]
+        star[FACT_TABLE] = fact[FACT_COLUMNS].assign(fact_id=np.arange(1, len(fact) + 1, dtype='int64'))
+        record['rows_out'] = len(fact)
+
+    logger.info("📦 Carregando tabelas de staging em paralelo...")
+    with measure('load.fill_staging', rows_in=len(df)):
+        fill_staging(star, engine)
+
+    logger.info("🔗 Criando chaves, restrições e índices nas tabelas de staging...")
+    with measure('load.staging_constraints'):
+        with engine.begin() as conn:
+            build_star_indexes(conn, STAGING_SUFFIX)
+
+    logger.info("🔀 Publicando as tabelas de staging...")
+    for attempt in range(1, SWAP_RETRIES + 1):
+        try:
+            with engine.begin() as conn:
+                # agregados e star schema publicados juntos: uma falha nos agregados desfaz a troca
+                with measure('load.rollups', rows_in=len(df)):
+                    refresh_rollups(df, conn)
+
+                start = time.perf_counter()
+                with measure('load.publish'):
+                    publish_staging(conn)
+            logger.info(f"✅ Publicação concluída: tabelas bloqueadas por {(time.perf_counter() - start) * 1000:.0f} ms")
+            return star
+        except OperationalError as e:
+            if attempt == SWAP_RETRIES:
+                raise
+            logger.warning(f"⚠️ Tentativa {attempt} de publicação sem lock em {SWAP_LOCK_TIMEOUT_MS} ms: {e.orig}")
+            time.sleep(attempt)
+
+
+
 def create_tables_from_sql(conn):
     """Garante que as tabelas existam antes de qualquer operação."""
-    # Se o load.py está em /app/src/ e o sql em /app/
-    sql_path = Path(__file__).parent.parent / 'sql' / 'create_tables.sql'
-    
+    sql_path = SQL_PATH
+
     if sql_path.exists():
         with open(sql_path, 'r', encoding='utf-8') as f:
             sql_commands = f.read()
@@ -101,35 +677,250 @@ def create_tables_from_sql(conn):
 
 
 
-def load_data(df):
-    """Orquestra a carga completa no DW, garantindo que dimensões e fato sejam inseridas em uma única transação (All-or-Nothing)."""
+def load_stream(chunks, finalize):
+    """
+    Carga full bloco a bloco, sobreposta à leitura e às transformações (ETL_PIPELINED).
+
+    Tudo acontece em uma única transação: as tabelas são limpas, e cada bloco que chega grava os
+    membros novos das dimensões (IDs continuam a partir dos blocos anteriores) e as suas linhas da
+    fato, enquanto os blocos seguintes ainda estão sendo lidos. Ao fim, `finalize` recebe os blocos
+    (ex.: para validar); se ele levantar uma exceção, ou se qualquer etapa anterior falhar, a
+    transação é desfeita e o banco permanece como estava.
+
+    Chaves compostas repetidas entre blocos são resolvidas como em load_data (vale o último registro);
+    índices, restrições, agregados e espelho são tratados como na carga full.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Blocos já transformados, na ordem da planilha.
+        finalize (Callable[[list[pd.DataFrame]], pd.DataFrame]): Junta (e valida) os blocos recebidos; deve
+            devolver as mesmas linhas, na ordem dos blocos (conferida pelo hash da chave).
+
+    Returns:
+        pd.DataFrame | None: O DataFrame final devolvido por `finalize`, ou None se o banco não estava acessível.
+
+    Raises:
+        ValueError: Se `finalize` devolver outras linhas ou outra ordem que a dos blocos gravados.
+    """
     logger.info("="*60)
-    logger.info("📤 INICIANDO CARGA NO DATA WAREHOUSE")
+    logger.info("📤 INICIANDO CARGA SOBREPOSTA NO DATA WAREHOUSE")
     logger.info("="*60 + "\n")
 
-    if not check_connection(): return
+    if LOAD_METHOD not in LOAD_METHODS:
+        raise ValueError(f"ETL_LOAD_METHOD inválido: '{LOAD_METHOD}' (opções: {LOAD_METHODS})")
 
-    engine = get_engine()
+    if not check_connection(): return None
 
     try:
-        with engine.begin() as conn:
+        with get_engine().begin() as conn:
+
+            with measure('load.create_tables'):
+                create_tables_from_sql(conn)
+                conn.execute(text("""
+                    TRUNCATE TABLE
+                    fact_energy_generation, dim_country, dim_technology, dim_time, dim_producer
+                    RESTART IDENTITY CASCADE
+                """))
+                drop_star_indexes(conn)
+
+            dimensions = {table: None for table in DIMENSIONS}
+            parts, facts = [], []
+
+            for number, chunk in enumerate(chunks, start=1):
+                with measure('load.chunk', rows_in=len(chunk)) as record:
+                    star = build_star_schema(chunk.assign(row_hash=compute_row_hash(chunk)), dimensions)
+
+                    for table, spec in DIMENSIONS.items():
+                        known = dimensions[table]
+                        members = star[table]
+                        if known is not None:
+                            members = members[members[spec['id']].to_numpy() > int(known[spec['id']].max())]
+                        if len(members) > 0:
+                            write_table(members, table, conn)
+                            dimensions[table] = members if known is None else pd.concat([known, members], ignore_index=True)
+
+                    write_table(star[FACT_TABLE][FACT_COLUMNS], FACT_TABLE, conn)
+                    record['rows_out'] = len(chunk)
+
+                parts.append(chunk)
+                facts.append(star[FACT_TABLE])
+                logger.info(f"📦 Bloco {number} gravado: {len(chunk)} registros")
+
+            if not parts:
+                raise ValueError("A extração em blocos não retornou registros.")
+
+            df = finalize(parts)
+            # o fact_id abaixo é a posição da linha: finalize não pode reordenar, remover nem acrescentar linhas
+            written = np.concatenate([key_hash(part).to_numpy() for part in parts])
+            if len(df) != len(written) or not np.array_equal(key_hash(df).to_numpy(), written):
+                raise ValueError("finalize deve devolver todas as linhas dos blocos, na ordem em que foram gravados.")
+
+            # RESTART IDENTITY + COPY na ordem dos blocos: o fact_id gravado é a posição + 1
+            fact = pd.concat(facts, ignore_index=True)
+            fact.insert(0, 'fact_id', np.arange(1, len(fact) + 1, dtype='int64'))
+
+            repeated = duplicated_keys(df, keep='last').to_numpy()
+            if repeated.any():
+                logger.warning(f"⚠️ {int(repeated.sum())} registros com chave composta repetida - mantendo o último")
+                conn.execute(text(f"DELETE FROM {FACT_TABLE} WHERE fact_id = ANY(:ids)"),
+                             {'ids': fact.loc[repeated, 'fact_id'].tolist()})
+                fact = fact[~repeated]
+
+            sync_sequences(conn)
+
+            logger.info("🔗 Recriando chaves, restrições e índices...")
+            with measure('load.build_indexes'):
+                build_star_indexes(conn)
+
+            with measure('load.rollups', rows_in=len(df)):
+                refresh_rollups(df[~repeated], conn)
 
-            create_tables_from_sql(conn)
+    except Exception as e:
+        logger.error(f"❌ Erro na carga. O banco permanece como estava antes.")
+        logger.error(f"⚠️ Detalhe: {e}")
+        raise
 
-            logger.info("🗑️  Limpando dados antigos...")
-            conn.execute(text("""
-                TRUNCATE TABLE 
-                fact_energy_generation, dim_country, dim_technology, dim_time, dim_producer 
-                RESTART IDENTITY CASCADE
-            """))
+    if MIRROR_ENABLED:
+        try:
+            with measure('load.mirror'):
+                write_mirror({**dimensions, FACT_TABLE: fact}, 'full')
+        except Exception as e:
+            logger.warning(f"⚠️ Carga confirmada, mas o espelho local não foi atualizado: {e}")
+
+    logger.info("="*60)
+    logger.info("✅ CARGA CONCLUÍDA COM SUCESSO!")
+    logger.info("="*60)
+
+    return df
+
+
+
+def load_data(df, mode=LOAD_MODE):
+    """
+    Orquestra a carga no DW, garantindo que dimensões e fato sejam inseridas em uma única transação (All-or-Nothing).
+
+    Modos (ETL_LOAD_MODE):
+    - 'full': limpa o star schema (TRUNCATE ... RESTART IDENTITY) e recarrega tudo.
+    - 'incremental': aplica apenas registros novos, alterados e removidos, mantendo os IDs existentes.
+    - 'swap': carrega tabelas de staging em paralelo e publica com uma troca de nomes (load_swap);
+      leitores nunca esperam pela carga, só pela publicação, que leva milissegundos.
+
+    Os agregados de src/rollups.py (ETL_ROLLUPS) são calculados do DataFrame em memória e gravados na
+    mesma transação (no swap, na transação da publicação); na carga incremental, só os anos alterados
+    são recalculados.
+
+    A fato tem chave composta única, então em todos os modos registros com a mesma chave são reduzidos
+    ao último (na ordem do DataFrame), com um aviso no log. Com ETL_VALIDATION_FAIL_FAST a carga é
+    recusada antes de abrir a transação - inclusive quando load_data é chamada sem passar pela
+    validação (ex.: `cli.py load --input`).
+
+    Com ETL_MIRROR (padrão) o star schema confirmado também é gravado no espelho local em Parquet
+    (mirror.write_mirror), consultável sem servidor; uma falha no espelho não desfaz a carga.
+
+    Returns:
+        bool: True se a transação foi confirmada; False se o banco não estava acessível.
+
+    Raises:
+        ValueError: Chaves compostas repetidas com ETL_VALIDATION_FAIL_FAST ativo.
+    """
+    logger.info("="*60)
+    logger.info("📤 INICIANDO CARGA NO DATA WAREHOUSE")
+    logger.info("="*60 + "\n")
+
+    if LOAD_METHOD not in LOAD_METHODS:
+        raise ValueError(f"ETL_LOAD_METHOD inválido: '{LOAD_METHOD}' (opções: {LOAD_METHODS})")
+    if mode not in LOAD_MODES:
+        raise ValueError(f"ETL_LOAD_MODE inválido: '{mode}' (opções: {LOAD_MODES})")
+
+    # a engine é compartilhada: a checagem reaproveita a conexão já aquecida por run_pipeline
+    if not check_connection(): return False
+
+    engine = get_engine()
+
+    try:
+        with measure('load.row_hash', rows_in=len(df)) as record:
+            df = df.assign(row_hash=compute_row_hash(df))
+            record['rows_out'] = len(df)
+
+        # a fato tem chave composta única: em todos os modos vale o último registro de cada chave
+        repeated = duplicated_keys(df, keep='last')
+        if repeated.any():
+            if VALIDATION_FAIL_FAST:
+                raise ValueError(f"{int(repeated.sum())} registros com chave composta repetida (ETL_VALIDATION_FAIL_FAST): carga recusada")
+            logger.warning(f"⚠️ {int(repeated.sum())} registros com chave composta repetida - mantendo o último")
+            df = df[~repeated.to_numpy()]
+
+        if mode == 'swap':
+            logger.info("🔀 Modo swap: carga em staging e publicação por troca de nomes...")
+            star = load_swap(df, engine)
+
+        else:
+            with engine.begin() as conn:
+
+                with measure('load.create_tables'):
+                    create_tables_from_sql(conn)
+
+                if mode == 'incremental':
+                    logger.info("🔄 Modo incremental: aplicando apenas as diferenças...")
+                    with measure('load.incremental', rows_in=len(df)):
+                        changed_years, changed_attributes = load_incremental(df, conn)
+
+                    with measure('load.build_indexes'):
+                        build_star_indexes(conn)
+
+                    with measure('load.rollups', rows_in=len(df)):
+                        refresh_rollups(df, conn, changed_years, changed_attributes)
+
+                    # a fato incremental mantém os fact_id antigos: o espelho lê o resultado da própria transação
+                    star = read_star(conn) if MIRROR_ENABLED else None
+
+                else:
+                    logger.info("🗑️  Limpando dados antigos...")
+                    with measure('load.truncate'):
+                        conn.execute(text("""
+                            TRUNCATE TABLE 
+                            fact_energy_generation, dim_country, dim_technology, dim_time, dim_producer 
+                            RESTART IDENTITY CASCADE
+                        """))
+
+                    # tabelas vazias: índices e restrições saem antes do COPY e voltam depois
+                    with measure('load.drop_indexes'):
+                        drop_star_indexes(conn)
+
+                    with measure('load.build_star_schema', rows_in=len(df)) as record:
+                        star = build_star_schema(df)
+                        record['rows_out'] = len(star['fact_energy_generation'])
+
+                    with measure('load.dimensions', rows_in=len(df)) as record:
+                        load_dimensions(star, conn)
+                        record['rows_out'] = sum(len(star[table]) for table in DIMENSIONS)
+
+                    with measure('load.fact', rows_in=len(star['fact_energy_generation'])) as record:
+                        load_fact(star['fact_energy_generation'], conn)
+                        record['rows_out'] = len(star['fact_energy_generation'])
+
+                    logger.info("🔗 Recriando chaves, restrições e índices...")
+                    with measure('load.build_indexes'):
+                        build_star_indexes(conn)
+
+                    with measure('load.rollups', rows_in=len(df)):
+                        refresh_rollups(df, conn)
+
+                    # RESTART IDENTITY + inserção na ordem do DataFrame: o fact_id gravado é 1..n
+                    fact = star['fact_energy_generation']
+                    star['fact_energy_generation'] = fact.assign(fact_id=np.arange(1, len(fact) + 1, dtype='int64'))
+
+        if MIRROR_ENABLED:
+            try:
+                with measure('load.mirror'):
+                    write_mirror(star, mode)
+            except Exception as e:
+                logger.warning(f"⚠️ Carga confirmada, mas o espelho local não foi atualizado: {e}")
 
-            load_dimensions(df, conn)
-            df_with_ids = get_ids_dimensions(df, conn)
-            load_fact(df_with_ids, conn)
-        
         logger.info("="*60)
         logger.info("✅ CARGA CONCLUÍDA COM SUCESSO!")
         logger.info("="*60)
+
+        return True
         
     except Exception as e:
         logger.error(f"❌ Erro na carga. O banco permanece como estava antes.")
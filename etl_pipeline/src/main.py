@@ -1,45 +1,250 @@
 import logging
-from dotenv import load_dotenv
+import sys
+import pandas as pd
 
-load_dotenv()
+from config import DATA_RAW_DIR, DATA_PROCESSED_DIR, DATA_LOGS_DIR, STREAMING_MODE, CHUNK_SIZE
+from config import LOAD_METHOD, LOAD_MODE, MIRROR_ENABLED, BATCH_MODE, BATCH_FILE_PATTERN, BATCH_SHEETS, FRAME_BACKEND, check_connection, get_engine
+from config import PIPELINED_MODE
 
-from config import DATA_PROCESSED_DIR, DATA_LOGS_DIR, check_connection
-
-logging.basicConfig(
-    level = logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    handlers=[
-        logging.FileHandler(DATA_LOGS_DIR / "etl.log", mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+# o logging (arquivo data/logs/etl.jsonl + console) é configurado pelo ponto de entrada: cli.configure_logging
 logger = logging.getLogger(__name__)
 
-from load import load_data
-from extract import extract_data
+import extract
+import keys
+import load
+import mirror
+import schema
+import transform.backends
+import transform.numeric
+import transform.rules
+import transform.text
+
+from load import load_data, load_stream, SQL_PATH
+from extract import extract_data, extract_data_chunks, extract_batch, discover_workbooks, RAW_FILE_NAME
 
 from transform.text import(
     normalize_text_columns,
     normalize_text_data,
     clean_text_data
 )
-from transform.numeric import(
-    clean_numeric_data,
-    fill_nan_numeric_data,
-    round_metrics
-)
-from validation import(
-    validate_columns,
-    validate_registers_count,
-    nulls_year_column,
-    validate_regions,
-    validate_country_count,
-    generation_without_instaled_capacity,
-    validate_composed_key
-)
+from transform.numeric import clean_fill_round_metrics
+from transform.backends import run_backend, BACKENDS
+from keys import add_key_hash, keep_latest_release
+from schema import KEY_HASH_COLUMN
+from validation import validate_data, REPORT_PATH
+from schema import memory_footprint, save_memory_report, dtype_plan
+from metrics import start_run, finish_run, measure, run_stage
+from overlap import overlapped
+from checkpoint import Stage, run_stages, input_key, code_version, load_marker_key, load_completed, mark_load_completed
+
+
+def transform_text(df):
+    """Aplica a sequência de transformações textuais (colunas, normalização e limpeza)."""
+    df = run_stage('normalize_text_columns', normalize_text_columns, df)
+    df = run_stage('normalize_text_data', normalize_text_data, df)
+    df = run_stage('clean_text_data', clean_text_data, df)
+    return df
+
+
+def transform_numeric(df):
+    """Aplica as transformações numéricas (limpeza, preenchimento e arredondamento, num único bloco 2D) e o hash da chave composta."""
+    df = run_stage('clean_fill_round_metrics', clean_fill_round_metrics, df)
+    df = run_stage('key_hash', add_key_hash, df)
+    return df
+
+
+def transform_frame(df, backend=FRAME_BACKEND):
+    """Etapas 2 e 3 no backend configurado: pandas etapa a etapa ou um único plano lazy (polars/duckdb)."""
+    if backend == 'pandas':
+        return transform_numeric(transform_text(df))
+    df = run_stage(f'transform_{backend}', run_backend, df, backend)
+    return run_stage('key_hash', add_key_hash, df)
+
+
+def extract_transform_chunks(chunk_size=CHUNK_SIZE):
+    """
+    Executa extração e transformações bloco a bloco (modo streaming).
+
+    Cada bloco lido da planilha passa pelas transformações textuais e numéricas e só o
+    resultado já filtrado é mantido; o bloco bruto é descartado antes da leitura do próximo.
+    Ao final os resultados parciais são concatenados em um único DataFrame.
+
+    Args:
+        chunk_size (int): Quantidade máxima de linhas por bloco.
+
+    Returns:
+        pd.DataFrame | None: DataFrame transformado, ou None se nenhuma linha foi lida.
+    """
+
+    parts = []
+    chunks = extract_data_chunks(chunk_size=chunk_size)
+    number = 0
+
+    while True:
+        # a leitura de cada bloco é medida separadamente das transformações
+        with measure('extract_chunk') as record:
+            chunk = next(chunks, None)
+            record['rows_out'] = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+
+        number += 1
+        logger.info(f"📦 Bloco {number}: {len(chunk)} registros")
+        parts.append(transform_frame(chunk))
+
+    if not parts:
+        return None
+
+    return combine_chunks(parts)
+
+
+def combine_chunks(parts):
+    """Concatena os blocos transformados em um único DataFrame, com índice 0..n-1 na ordem dos blocos."""
+
+    # blocos sem nenhum valor em uma coluna ficam como object; infer_objects recupera o dtype numérico
+    df = pd.concat(parts, ignore_index=True).infer_objects()
+
+    # categorias diferentes entre blocos viram object no concat; recategoriza as colunas textuais
+    categorical = [col for col in parts[0].columns if isinstance(parts[0][col].dtype, pd.CategoricalDtype)]
+    df[categorical] = df[categorical].astype('category')
+    logger.info(f"✅ {len(parts)} blocos processados, {len(df)} registros mantidos")
+
+    return df
+
+
+def validate_final(df):
+    """Etapa 4: valida o DataFrame final e grava o relatório; com ETL_VALIDATION_FAIL_FAST, validate_data interrompe se reprovar."""
+
+    logger.info("🔍 ETAPA 4/6: VALIDAÇÃO")
+    run_stage('validate_data', validate_data, df, report_path=REPORT_PATH)
+
+
+def save_final_csv(df):
+    """Etapa 5: grava o CSV final (sem as colunas internas do pipeline)."""
+
+    logger.info("💾 ETAPA 5/6 SALVAMENTO DOS DADOS")
+    with measure('write_csv', rows_in=len(df)) as record:
+        # o hash da chave é interno ao pipeline: o CSV final mantém as colunas do contrato
+        columns = [col for col in df.columns if col != KEY_HASH_COLUMN]
+        DATA_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_csv(DATA_PROCESSED_DIR / 'renewable_energy_data_final.csv', index=False, columns=columns)
+        record['rows_out'] = len(df)
+    logger.info(f"✅ Arquivo final salvo em {DATA_PROCESSED_DIR}")
+
+
+def run_overlapped(memory_report, batch=BATCH_MODE):
+    """
+    Modo sobreposto (ETL_STREAMING + ETL_PIPELINED): leitura, transformação e carga dos blocos ao mesmo tempo.
+
+    A leitura dos blocos e as transformações rodam em threads próprias (overlap.overlapped), ligadas
+    por filas de ETL_QUEUE_DEPTH blocos: enquanto o bloco N+1 é lido, o N é transformado e o N-1 é
+    gravado pela transação de load_stream. Se a carga atrasar, a leitura espera (backpressure).
+
+    A validação roda sobre o resultado completo antes do commit: reprovada (com
+    ETL_VALIDATION_FAIL_FAST) ou com erro em qualquer etapa, a transação é desfeita. Checkpoints, o
+    marcador de carga e a extração em lote (ETL_BATCH) não se aplicam a este modo.
+    """
+
+    if batch:
+        logger.warning("⚠️ ETL_BATCH é ignorado no modo sobreposto: lendo apenas o arquivo principal")
+
+    def finalize(parts):
+        df = combine_chunks(parts)
+        memory_footprint(df, 'overlapped', memory_report)
+        validate_final(df)
+        return df
 
+    logger.info(f"🔀 ETAPAS 1-6/6: LEITURA, TRANSFORMAÇÃO E CARGA SOBREPOSTAS EM BLOCOS DE {CHUNK_SIZE} LINHAS")
+    steps = [('extract_chunks', None), ('transform_chunks', transform_frame)]
+    with overlapped(extract_data_chunks(chunk_size=CHUNK_SIZE), steps) as chunks:
+        with measure('load_stream') as record:
+            df = load_stream(chunks, finalize)
+            record['rows_out'] = None if df is None else len(df)
 
-def run_pipeline():
+    if df is None:
+        raise ConnectionError("Carga não realizada: banco de dados inacessível.")
+
+    save_final_csv(df)
+
+
+def pipeline_stages(streaming, memory_report, batch=BATCH_MODE, backend=FRAME_BACKEND):
+    """
+    Etapas 1 a 3 com checkpoint, na ordem de execução.
+
+    Com `batch` (ETL_BATCH=true) a extração lê todas as planilhas de DATA_RAW_DIR em paralelo
+    (extract_batch); o modo streaming continua lendo apenas o arquivo principal.
+
+    Com um backend lazy (ETL_FRAME_BACKEND=polars ou duckdb) as etapas 2 e 3 viram uma só, executada
+    como um único plano de consulta (transform.backends); 'pandas' continua sendo a referência.
+
+    A versão de cada etapa cobre a função da etapa e os módulos de que ela depende (regras textuais,
+    plano de tipos etc.): editar qualquer um deles invalida o checkpoint daquela etapa em diante.
+    """
+
+    def extract_stage(_):
+        logger.info("📥 ETAPA 1/6: EXTRAÇÃO")
+        with measure('extract') as record:
+            df = extract_batch() if batch else extract_data()
+            record['rows_out'] = 0 if df is None else len(df)
+        if df is None or df.empty:
+            raise ValueError("A extração retornou um DataFrame vazio ou None.")
+        memory_footprint(df, 'extract', memory_report)
+        return df
+
+    def text_stage(df):
+        logger.info("📝 ETAPA 2/6: TRANSFORMAÇÕES TEXTUAIS")
+        df = transform_text(df)
+        memory_footprint(df, 'transform_text', memory_report)
+        return df
+
+    def numeric_stage(df):
+        logger.info("🔢 ETAPA 3/6: TRANSFORMAÇÕES NUMÉRICAS")
+        df = transform_numeric(df)
+        memory_footprint(df, 'transform_numeric', memory_report)
+        return df
+
+    def lazy_stage(df):
+        logger.info(f"🧮 ETAPAS 2-3/6: TRANSFORMAÇÕES NO BACKEND {backend.upper()}")
+        df = transform_frame(df, backend)
+        memory_footprint(df, f'transform_{backend}', memory_report)
+        return df
+
+    def chunks_stage(_):
+        logger.info(f"📥 ETAPAS 1-3/6: EXTRAÇÃO E TRANSFORMAÇÕES EM BLOCOS DE {CHUNK_SIZE} LINHAS")
+        df = extract_transform_chunks()
+        if df is None or df.empty:
+            raise ValueError("A extração em blocos não retornou registros.")
+        memory_footprint(df, 'extract_transform_chunks', memory_report)
+        return df
+
+    extract_sources = (extract, schema)
+    text_sources = (transform_text, transform.text, transform.rules)
+    numeric_sources = (transform_numeric, transform.numeric, keys)
+    backend_sources = (transform_frame, transform.backends) if backend != 'pandas' else ()
+
+    if backend not in BACKENDS:
+        raise ValueError(f"ETL_FRAME_BACKEND inválido: '{backend}' (opções: {BACKENDS})")
+
+    if streaming:
+        if batch:
+            logger.warning("⚠️ ETL_BATCH é ignorado no modo streaming: lendo apenas o arquivo principal")
+        return [Stage('extract_transform_chunks', chunks_stage,
+                      (extract_transform_chunks,) + extract_sources + text_sources + numeric_sources + backend_sources)]
+
+    if backend != 'pandas':
+        return [
+            Stage('extract', extract_stage, extract_sources),
+            Stage(f'transform_{backend}', lazy_stage, backend_sources + text_sources + numeric_sources),
+        ]
+
+    return [
+        Stage('extract', extract_stage, extract_sources),
+        Stage('transform_text', text_stage, text_sources),
+        Stage('transform_numeric', numeric_stage, numeric_sources),
+    ]
+
+
+def run_pipeline(streaming=STREAMING_MODE):
     """
     Executa o fluxo completo de ETL.
 
@@ -49,6 +254,20 @@ def run_pipeline():
     O pipeline garante a integridade dos dados através de validações de chaves 
     compostas e garante a atomicidade da carga no banco de dados.
 
+    No modo streaming (ETL_STREAMING=true) a planilha é lida em blocos de ETL_CHUNK_SIZE linhas
+    e as etapas 1 a 3 são aplicadas bloco a bloco, mantendo o pico de memória estável.
+
+    O resultado das etapas 1 a 3 é salvo em checkpoints (Feather em data/checkpoints), indexados pela
+    impressão digital da planilha e pela versão do código de cada etapa. Uma nova execução pula as
+    etapas sem mudanças e retoma da primeira desatualizada ou que falhou; a carga também é pulada se
+    os mesmos dados já foram carregados no mesmo destino (ETL_CHECKPOINTS=false desativa tudo isso).
+
+    Cada etapa é medida (tempo de parede e de CPU, linhas, memória) e o registro da execução é
+    gravado ao final em data/logs/runs e no textfile do Prometheus (data/logs/etl_metrics.prom).
+
+    Args:
+        streaming (bool): Ativa a leitura e transformação em blocos.
+
     Raises:
         Exception: Captura falhas em qualquer etapa do processo, 
                    interrompendo a execução e registrando o erro no log.
@@ -58,42 +277,49 @@ def run_pipeline():
     logger.info("PIPELINE ETL - RENEWABLE ENERGY DATA")
     logger.info("="*60)
 
+    memory_report = {}
+    success = False
+    start_run()
+
     try:
 
         logger.info("🔌 Verificando conexão com o Data Warehouse...")
         if not check_connection():
             raise ConnectionError("Não foi possível conectar ao banco de dados.")
 
-        logger.info("📥 ETAPA 1/6: EXTRAÇÃO")
-        df = extract_data()
-        if df is None or df.empty:
-            raise ValueError("A extração retornou um DataFrame vazio ou None.") 
+        if streaming and PIPELINED_MODE:
+            if LOAD_MODE == 'full':
+                run_overlapped(memory_report)
+                success = True
+                return
+            logger.warning(f"⚠️ ETL_PIPELINED só sobrepõe a carga no modo full: ETL_LOAD_MODE={LOAD_MODE} segue em sequência")
 
-        logger.info("📝 ETAPA 2/6: TRANSFORMAÇÕES TEXTUAIS")
-        df = normalize_text_columns(df)
-        df = normalize_text_data(df)
-        df = clean_text_data(df)
+        stages = pipeline_stages(streaming, memory_report)
+        if BATCH_MODE and not streaming:
+            source_key = input_key(discover_workbooks(), BATCH_FILE_PATTERN, BATCH_SHEETS, dtype_plan())
+        else:
+            source_key = input_key(DATA_RAW_DIR / RAW_FILE_NAME, dtype_plan())
+        df, data_key = run_stages(stages, source_key)
 
-        logger.info("🔢 ETAPA 3/6: TRANSFORMAÇÕES NUMÉRICAS")
-        df = clean_numeric_data(df)
-        df = fill_nan_numeric_data(df)
-        df = round_metrics(df)
-
-        logger.info("🔍 ETAPA 4/6: VALIDAÇÃO")
-        df = validate_columns(df)
-        df = validate_registers_count(df)
-        df = nulls_year_column(df)
-        df = validate_regions(df)
-        df = validate_country_count(df)
-        df = generation_without_instaled_capacity(df)
-        df = validate_composed_key(df)
-    
-        logger.info("💾 ETAPA 5/6 SALVAMENTO DOS DADOS")
-        df.to_csv(DATA_PROCESSED_DIR / 'renewable_energy_data_final.csv', index=False)
-        logger.info(f"✅ Arquivo final salvo em {DATA_PROCESSED_DIR}")
+        # extração em lote: a edição mais recente de cada registro (keys.keep_latest_release)
+        if 'source_file' in df.columns:
+            df = run_stage('keep_latest_release', keep_latest_release, df)
+
+        validate_final(df)
+        save_final_csv(df)
 
         logger.info("💾 ETAPA 6/6 CARREGAMENTO DOS DADOS NO DATA WAREHOUSE")
-        load_data(df)
+        load_key = load_marker_key(data_key, code_version(load, keys, mirror, SQL_PATH), LOAD_MODE, LOAD_METHOD, MIRROR_ENABLED,
+                                   get_engine().url.render_as_string(hide_password=True))
+
+        if load_completed(load_key):
+            logger.info("⏭️  Estes dados já foram carregados neste destino: carga ignorada")
+        elif run_stage('load_data', load_data, df):
+            mark_load_completed(load_key)
+        else:
+            raise ConnectionError("Carga não realizada: banco de dados inacessível.")
+
+        success = True
 
     except Exception as e:
         logger.error(f"❌ Pipeline falhou: {e}")
@@ -101,7 +327,22 @@ def run_pipeline():
         logger.info("Encerrando pipeline devido ao erro.")
         raise    
 
+    finally:
+        finish_run(success)
+        if memory_report:
+            save_memory_report(memory_report, DATA_LOGS_DIR / 'memory_report.json')
+
 
 
 if __name__ == "__main__":
-    run_pipeline()    
\ No newline at end of file
+
+    # equivalente a `python src/cli.py run`, chamando run_pipeline daqui: cli.cmd_run importaria este
+    # arquivo de novo como o módulo 'main', com uma segunda cópia do estado e dos loggers
+    from cli import configure_logging
+    configure_logging()
+
+    try:
+        run_pipeline()
+    except Exception:
+        # run_pipeline já registrou a falha no log
+        sys.exit(1)
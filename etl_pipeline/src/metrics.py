@@ -0,0 +1,247 @@
+import cProfile
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from config import DATA_LOGS_DIR, PROFILE_STAGES, TRACE_MEMORY, pool_stats
+from diagnostics import log_profile, reset_profiles
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+RUNS_DIR = DATA_LOGS_DIR / 'runs'
+PROFILES_DIR = DATA_LOGS_DIR / 'profiles'
+PROMETHEUS_FILE = DATA_LOGS_DIR / 'etl_metrics.prom'
+
+
+_run = {'run_id': None, 'started_at': None, 'start': None, 'stages': []}
+_profiler_active = False
+
+# picos de tracemalloc das etapas abertas na thread principal: reset_peak() numa etapa interna apagaria o
+# pico da externa. tracemalloc e cProfile só medem etapas da thread principal (o pico do tracemalloc é do
+# processo e reset_peak() é global, então etapas simultâneas em outras threads zerariam o pico umas das outras)
+_traced_peaks = []
+
+
+def _peak_rss_bytes():
+    """Pico de memória residente do processo até agora (ru_maxrss vem em KB no Linux)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+
+def start_run(name='run_pipeline'):
+    """Inicia um novo registro de execução; as etapas medidas a partir daqui entram nele."""
+
+    _run['run_id'] = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    _run['name'] = name
+    _run['started_at'] = datetime.now(timezone.utc).isoformat()
+    _run['start'] = time.perf_counter()
+    _run['stages'] = []
+    reset_profiles()
+
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    return _run['run_id']
+
+
+
+@contextmanager
+def measure(stage, rows_in=None):
+    """
+    Mede uma etapa do pipeline: tempo de parede, tempo de CPU, linhas e memória.
+
+    O registro é entregue ao bloco `with`, que pode preencher 'rows_out'. Com ETL_TRACEMALLOC
+    ativo também registra o pico de alocações Python da etapa (etapas aninhadas incluídas); com
+    ETL_PROFILE, grava um dump do cProfile por etapa em data/logs/profiles. Esses dois só valem para
+    etapas da thread principal; as medidas nas threads de sobreposição (overlap, load_stream) ficam sem eles.
+
+    'cpu_seconds' é o tempo de CPU da thread que executa a etapa (time.thread_time), então etapas
+    simultâneas não somam a CPU umas das outras; trabalho de threads nativas do pandas/pyarrow ou do
+    banco não entra nessa conta.
+
+    'peak_rss_delta_bytes' é quanto o pico de memória residente do processo (ru_maxrss) subiu durante a
+    etapa, não o consumo dela: uma etapa que não ultrapassa o pico anterior registra 0. Para a memória
+    de cada etapa use 'tracemalloc_peak_bytes'.
+
+    Args:
+        stage (str): Nome da etapa.
+        rows_in (int, opcional): Linhas recebidas pela etapa.
+
+    Yields:
+        dict: O registro da etapa.
+    """
+
+    global _profiler_active
+
+    record = {'stage': stage, 'rows_in': rows_in, 'rows_out': None, 'status': 'ok'}
+
+    main_thread = threading.current_thread() is threading.main_thread()
+
+    profiler = None
+    if PROFILE_STAGES and main_thread and not _profiler_active:
+        profiler = cProfile.Profile()
+        _profiler_active = True
+        profiler.enable()
+
+    tracing = main_thread and tracemalloc.is_tracing()
+    if tracing:
+        traced_start, peak_so_far = tracemalloc.get_traced_memory()
+        # reset_peak() apaga o pico já atingido pela etapa externa: ele é guardado antes no slot dela
+        if _traced_peaks:
+            _traced_peaks[-1] = max(_traced_peaks[-1], peak_so_far)
+        tracemalloc.reset_peak()
+        _traced_peaks.append(0)
+
+    rss_start = _peak_rss_bytes()
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+
+    try:
+        yield record
+    except BaseException:
+        record['status'] = 'error'
+        raise
+    finally:
+        record['wall_seconds'] = round(time.perf_counter() - wall_start, 6)
+        record['cpu_seconds'] = round(time.thread_time() - cpu_start, 6)
+
+        if rss_start is not None:
+            record['peak_rss_delta_bytes'] = _peak_rss_bytes() - rss_start
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], _traced_peaks.pop())
+            record['tracemalloc_peak_bytes'] = peak - traced_start
+            if _traced_peaks:
+                _traced_peaks[-1] = max(_traced_peaks[-1], peak)
+
+        if profiler is not None:
+            profiler.disable()
+            _profiler_active = False
+            PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+            # a mesma etapa pode rodar várias vezes (um bloco por vez no modo streaming)
+            sequence = len(_run['stages'])
+            profiler.dump_stats(PROFILES_DIR / f"{_run['run_id'] or 'adhoc'}_{sequence:03d}_{stage}.prof")
+
+        _run['stages'].append(record)
+        logger.debug(f"⏱️  {stage}: {record['wall_seconds']:.3f}s parede | {record['cpu_seconds']:.3f}s CPU")
+
+
+
+def stage_records():
+    """Cópia dos registros de etapa da execução corrente (usada pelos benchmarks)."""
+    return list(_run['stages'])
+
+
+
+def run_stage(stage, func, df, *args, **kwargs):
+    """
+    Executa `func(df, *args, **kwargs)` dentro de measure(), registrando as linhas de entrada e saída.
+
+    Com o log em DEBUG, o perfil da saída (diagnostics.log_profile) entra no registro da etapa; ele é
+    calculado fora da medição, então não altera os tempos da etapa.
+    """
+
+    with measure(stage, rows_in=len(df) if df is not None else None) as record:
+        result = func(df, *args, **kwargs)
+        if isinstance(result, pd.DataFrame):
+            record['rows_out'] = len(result)
+
+    if isinstance(result, pd.DataFrame):
+        profile = log_profile(stage, result)
+        if profile is not None:
+            record['profile'] = profile
+
+    return result
+
+
+
+def _prometheus_lines(run, success):
+    """Formata o registro da execução no formato textfile do Prometheus (node_exporter)."""
+
+    totals = {}
+    for record in run['stages']:
+        stage = totals.setdefault(record['stage'], {})
+        for field in ('wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out', 'peak_rss_delta_bytes', 'tracemalloc_peak_bytes'):
+            if record.get(field) is not None:
+                stage[field] = stage.get(field, 0) + record[field]
+
+    lines = [
+        "# HELP etl_run_success 1 se a última execução terminou sem erro.",
+        "# TYPE etl_run_success gauge",
+        f"etl_run_success {int(success)}",
+        "# HELP etl_run_duration_seconds Duração total da última execução.",
+        "# TYPE etl_run_duration_seconds gauge",
+        f"etl_run_duration_seconds {run['duration_seconds']}",
+        "# HELP etl_run_timestamp_seconds Momento em que a última execução terminou.",
+        "# TYPE etl_run_timestamp_seconds gauge",
+        f"etl_run_timestamp_seconds {time.time():.0f}",
+    ]
+
+    for field in ('wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out', 'peak_rss_delta_bytes', 'tracemalloc_peak_bytes'):
+        name = f"etl_stage_{field}"
+        values = [(stage, fields[field]) for stage, fields in totals.items() if field in fields]
+        if not values:
+            continue
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f'{name}{{stage="{stage}"}} {value}' for stage, value in values)
+
+    # contadores do pool de conexões compartilhado (acumulados desde o início do processo)
+    for field, value in run.get('db_pool', {}).items():
+        lines.append(f"# TYPE etl_db_pool_{field} gauge")
+        lines.append(f"etl_db_pool_{field} {round(value, 6)}")
+
+    return lines
+
+
+
+def finish_run(success=True):
+    """
+    Encerra a execução e grava o registro em JSON (data/logs/runs) e no textfile do Prometheus.
+
+    Args:
+        success (bool): Se a execução terminou sem erro.
+
+    Returns:
+        dict: O registro completo da execução.
+    """
+
+    if _run['start'] is None:
+        start_run()
+
+    run = {
+        'run_id': _run['run_id'],
+        'name': _run.get('name'),
+        'started_at': _run['started_at'],
+        'duration_seconds': round(time.perf_counter() - _run['start'], 6),
+        'success': success,
+        'stages': _run['stages'],
+        'db_pool': pool_stats(),
+    }
+
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    run_path = RUNS_DIR / f"{run['run_id']}.json"
+    with open(run_path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+
+    # escrita atômica: o coletor nunca lê um arquivo pela metade
+    tmp_path = PROMETHEUS_FILE.with_suffix('.tmp')
+    tmp_path.write_text('\n'.join(_prometheus_lines(run, success)) + '\n', encoding='utf-8')
+    tmp_path.replace(PROMETHEUS_FILE)
+
+    logger.info(f"📊 Métricas da execução salvas em: {run_path}")
+
+    return run
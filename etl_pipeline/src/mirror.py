@@ -0,0 +1,237 @@
+import json
+import logging
+import sys
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_MIRROR_DIR
+from schema import METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+MIRROR_SUFFIX = '.parquet'
+MANIFEST_PATH = DATA_MIRROR_DIR / 'manifest.json'
+
+# tabelas espelhadas e a chave de cada dimensão na fato
+MIRROR_DIMENSIONS = {
+    'dim_country': 'country_id',
+    'dim_technology': 'technology_id',
+    'dim_time': 'time_id',
+    'dim_producer': 'producer_id',
+}
+MIRROR_FACT = 'fact_energy_generation'
+MIRROR_FACT_COLUMNS = ['fact_id'] + list(MIRROR_DIMENSIONS.values()) + METRIC_COLUMNS
+
+# visão desnormalizada (fato + dimensões) em memória, reaproveitada enquanto o manifesto não mudar
+_energy = {'version': None, 'frame': None}
+
+
+def _table_file(table, version):
+    """Nome do arquivo de uma tabela numa versão do espelho: cada carga grava arquivos novos."""
+    return f"{table}__{version}{MIRROR_SUFFIX}"
+
+
+
+def write_mirror(star, mode):
+    """
+    Grava o star schema carregado como um conjunto Parquet local (data/mirror), um arquivo por tabela.
+
+    Cada carga grava uma versão nova, com nomes de arquivo próprios (tabela__versão.parquet), e só
+    então publica o manifesto que os lista, por rename atômico. Os leitores abrem apenas os arquivos
+    do manifesto que leram, então nunca juntam a fato de uma carga com dimensões de outra. Os arquivos
+    da versão anterior são mantidos (um leitor pode ter acabado de ler o manifesto antigo); os mais
+    antigos são removidos.
+
+    Args:
+        star (dict[str, pd.DataFrame]): As quatro dimensões e a fato, com os IDs gravados no banco.
+        mode (str): Modo da carga que gerou o espelho (registrado no manifesto).
+
+    Returns:
+        dict: O manifesto gravado.
+    """
+
+    DATA_MIRROR_DIR.mkdir(parents=True, exist_ok=True)
+
+    previous = read_manifest()
+    version = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    tables = {}
+    for table in list(MIRROR_DIMENSIONS) + [MIRROR_FACT]:
+        df = star[table]
+        if table == MIRROR_FACT:
+            df = df[[col for col in MIRROR_FACT_COLUMNS if col in df.columns]]
+
+        path = DATA_MIRROR_DIR / _table_file(table, version)
+        tmp_path = path.with_suffix('.tmp')
+        df.reset_index(drop=True).to_parquet(tmp_path, index=False, compression='zstd')
+        tmp_path.replace(path)
+        tables[table] = {'file': path.name, 'rows': len(df), 'bytes': path.stat().st_size}
+
+    manifest = {'version': version, 'loaded_at': datetime.now().isoformat(timespec='seconds'), 'mode': mode, 'tables': tables}
+    tmp_path = MANIFEST_PATH.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    tmp_path.replace(MANIFEST_PATH)
+
+    # mantém esta versão e a anterior; remove as demais (inclusive arquivos sem versão de espelhos antigos)
+    keep = {entry['file'] for entry in tables.values()}
+    if previous is not None:
+        keep |= {entry['file'] for entry in previous['tables'].values() if 'file' in entry}
+    for path in DATA_MIRROR_DIR.glob(f"*{MIRROR_SUFFIX}"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+
+    total = sum(entry['bytes'] for entry in tables.values())
+    logger.info(f"🪞 Espelho local atualizado em {DATA_MIRROR_DIR} ({total / 1024:.0f} KB)")
+
+    return manifest
+
+
+
+def read_star(conn):
+    """Lê o star schema inteiro do banco (usado para espelhar a carga incremental, que não tem a fato em memória)."""
+
+    star = {table: pd.read_sql(f"SELECT * FROM {table}", conn) for table in MIRROR_DIMENSIONS}
+    star[MIRROR_FACT] = pd.read_sql(f"SELECT {', '.join(MIRROR_FACT_COLUMNS)} FROM {MIRROR_FACT}", conn)
+    return star
+
+
+
+def read_manifest():
+    """Manifesto do espelho, ou None se nenhuma carga foi espelhada ainda."""
+
+    if not MANIFEST_PATH.exists():
+        return None
+    return json.loads(MANIFEST_PATH.read_text(encoding='utf-8'))
+
+
+
+def energy_frame():
+    """
+    Fato com os atributos das dimensões já resolvidos, lida do espelho local.
+
+    O manifesto é lido uma vez e só os arquivos listados nele são abertos, então fato e dimensões são
+    sempre da mesma carga. A junção é feita uma única vez por versão do espelho com indexação posicional
+    pelos IDs, e os atributos textuais ficam categóricos; as consultas seguintes só agrupam e filtram
+    em memória.
+
+    Raises:
+        FileNotFoundError: Se o espelho ainda não foi gerado por uma carga.
+        ValueError: Se a fato referencia IDs ausentes de uma dimensão (espelho inconsistente).
+    """
+
+    manifest = read_manifest()
+    if manifest is None:
+        raise FileNotFoundError(f"Espelho local não encontrado em {DATA_MIRROR_DIR}: execute uma carga primeiro.")
+
+    version = manifest.get('version', manifest['loaded_at'])
+    if _energy['version'] == version:
+        return _energy['frame']
+
+    # espelhos anteriores aos arquivos versionados não listam o nome do arquivo
+    files = {table: DATA_MIRROR_DIR / entry.get('file', f"{table}{MIRROR_SUFFIX}") for table, entry in manifest['tables'].items()}
+
+    fact = pd.read_parquet(files[MIRROR_FACT])
+    frame = fact[['fact_id'] + METRIC_COLUMNS].copy()
+
+    for table, id_col in MIRROR_DIMENSIONS.items():
+        dimension = pd.read_parquet(files[table])
+
+        # IDs de dimensão são inteiros pequenos: uma tabela de posições resolve a junção sem merge
+        ids = fact[id_col].to_numpy()
+        positions = np.full(max(int(dimension[id_col].max()), int(ids.max(initial=0))) + 1, -1, dtype='int64')
+        positions[dimension[id_col].to_numpy()] = np.arange(len(dimension))
+        rows = positions[ids]
+
+        # take(-1) devolveria a última linha da dimensão em silêncio
+        if (rows < 0).any():
+            missing = np.unique(ids[rows < 0])[:5].tolist()
+            raise ValueError(f"Espelho inconsistente (versão {version}): {table} sem os IDs {missing} usados na fato")
+
+        for col in dimension.columns.drop(id_col):
+            values = dimension[col].take(rows).reset_index(drop=True)
+            if not pd.api.types.is_numeric_dtype(values):
+                # categorias em ordem alfabética: os agrupamentos já saem ordenados
+                values = values.astype('category').cat.remove_unused_categories()
+                values = values.cat.reorder_categories(sorted(values.cat.categories))
+            frame[col] = values
+
+    _energy.update(version=version, frame=frame)
+    return frame
+
+
+
+def aggregate(by, metric='electricity_generation_gwh', how='sum', **filters):
+    """
+    Agregação genérica sobre o espelho local, sem servidor de banco.
+
+    Args:
+        by (str | list[str]): Atributos de agrupamento (ex.: 'region', ['decade', 'technology']).
+        metric (str | list[str]): Métrica(s) agregada(s).
+        how (str): Função de agregação do pandas ('sum', 'mean', 'max'...).
+        **filters: Igualdade por atributo; listas e tuplas filtram por pertinência (ex.: year=[2020, 2021]).
+
+    Returns:
+        pd.DataFrame: Uma linha por grupo, ordenada pelos atributos de agrupamento.
+    """
+
+    frame = energy_frame()
+    by = [by] if isinstance(by, str) else list(by)
+    metrics = [metric] if isinstance(metric, str) else list(metric)
+
+    if filters:
+        mask = np.ones(len(frame), dtype=bool)
+        for col, value in filters.items():
+            column = frame[col]
+            mask &= (column.isin(value) if isinstance(value, (list, tuple, set)) else column == value).to_numpy()
+        frame = frame[mask]
+
+    return frame.groupby(by, observed=True, sort=True)[metrics].agg(how).reset_index()
+
+
+
+def generation_by_region(year=None, metric='electricity_generation_gwh'):
+    """Total por região (opcionalmente em um ano)."""
+    filters = {} if year is None else {'year': year}
+    return aggregate('region', metric, **filters)
+
+
+
+def generation_by_decade(region=None, metric='electricity_generation_gwh'):
+    """Total por década (opcionalmente em uma região)."""
+    filters = {} if region is None else {'region': region}
+    return aggregate('decade', metric, **filters)
+
+
+
+def generation_by_technology(decade=None, renewable_only=False, metric='electricity_generation_gwh'):
+    """Total por grupo de tecnologia e tecnologia (opcionalmente em uma década e só renováveis)."""
+    filters = {} if decade is None else {'decade': decade}
+    if renewable_only:
+        filters['renewable_or_not'] = 'renewable'
+    return aggregate(['group_technology', 'technology'], metric, **filters)
+
+
+
+if __name__ == "__main__":
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    # uso: python src/mirror.py [region|decade|technology]
+    queries = {'region': generation_by_region, 'decade': generation_by_decade, 'technology': generation_by_technology}
+    query = sys.argv[1] if len(sys.argv) > 1 else 'region'
+    if query not in queries:
+        sys.exit(f"Consulta desconhecida: '{query}' (opções: {list(queries)})")
+
+    manifest = read_manifest()
+    if manifest is None:
+        sys.exit(f"❌ Espelho local não encontrado em {DATA_MIRROR_DIR}: execute uma carga primeiro.")
+
+    logger.info(f"🪞 Espelho da carga '{manifest['mode']}' de {manifest['loaded_at']}\n")
+    logger.info(queries[query]().to_string(index=False))
@@ -0,0 +1,146 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from config import QUEUE_DEPTH
+from metrics import measure
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# intervalo em que threads bloqueadas numa fila conferem se a execução foi abortada
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    """Exceção de uma etapa, repassada pela fila até o consumidor final."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+
+def _put(output, item, stop):
+    """Coloca um item na fila limitada, esperando enquanto ela estiver cheia; False se a execução foi abortada."""
+
+    while not stop.is_set():
+        try:
+            output.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+
+def drain(source, stop):
+    """
+    Itera os itens de uma fila até o marcador de fim.
+
+    Uma falha da etapa anterior é levantada aqui, na thread que consome; se a execução for abortada,
+    a iteração termina sem erro.
+    """
+
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+
+def _pump(name, source, func, output, stop):
+    """
+    Corpo de uma thread de etapa: lê da origem, aplica `func` e entrega o resultado na fila de saída.
+
+    O tempo ocupado (leitura + func) e o tempo bloqueado na fila cheia (consumidor atrasado) vão para
+    o registro da etapa em metrics.
+    """
+
+    with measure(f'overlap.{name}') as record:
+        busy = blocked = 0.0
+        items = 0
+        iterator = iter(source)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, _DONE)
+                if item is _DONE:
+                    break
+                if func is not None:
+                    item = func(item)
+                busy += time.perf_counter() - start
+
+                start = time.perf_counter()
+                if not _put(output, item, stop):
+                    break
+                blocked += time.perf_counter() - start
+                items += 1
+            _put(output, _DONE, stop)
+        except BaseException as e:
+            record['status'] = 'error'
+            _put(output, _Failure(e), stop)
+        finally:
+            # fecha o gerador de origem (ex.: a planilha aberta pela extração em blocos)
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            record.update(rows_out=items, busy_seconds=round(busy, 6), blocked_seconds=round(blocked, 6))
+
+
+
+@contextmanager
+def overlapped(source, steps, depth=QUEUE_DEPTH):
+    """
+    Encadeia etapas em threads ligadas por filas limitadas (produtor/consumidor).
+
+    A primeira thread percorre `source`; cada etapa seguinte aplica sua função aos itens da anterior.
+    Enquanto o bloco N+1 é lido, o bloco N é transformado e o consumidor grava o N-1. Com as filas
+    cheias (consumidor mais lento) as etapas anteriores esperam: no máximo `depth` itens por fila
+    ficam em memória.
+
+    Uma exceção em qualquer etapa chega ao consumidor na iteração; uma exceção no consumidor (ou a
+    saída antecipada do bloco `with`) aborta as threads, que são aguardadas antes de sair.
+
+    Args:
+        source (Iterable): Origem dos itens (ex.: extract_data_chunks()).
+        steps (list[tuple[str, Callable | None]]): (nome, função) de cada etapa; a primeira recebe os
+            itens de `source` (None repassa sem alterar).
+        depth (int): Capacidade de cada fila (ETL_QUEUE_DEPTH).
+
+    Yields:
+        Iterator: Os itens da última etapa, na ordem da origem.
+    """
+
+    stop = threading.Event()
+    threads = []
+    upstream = source
+
+    for name, func in steps:
+        output = queue.Queue(maxsize=max(depth, 1))
+        thread = threading.Thread(target=_pump, args=(name, upstream, func, output, stop), name=f"etl-{name}", daemon=True)
+        threads.append(thread)
+        upstream = drain(output, stop)
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield upstream
+    except BaseException:
+        logger.error("🛑 Execução sobreposta abortada: interrompendo as etapas em andamento")
+        raise
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
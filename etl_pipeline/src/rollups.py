@@ -0,0 +1,308 @@
+import hashlib
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import ROLLUPS, ROLLUP_UNUSED_DAYS
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# Agregados pré-calculados na carga, por nome da tabela: atributos de agrupamento e métricas somadas.
+# Toda tabela ganha também 'row_count' (registros da fato no grupo), para médias sem reler a fato.
+# 'decade' vem do ano, como em dim_time.
+ROLLUP_DEFINITIONS = {
+    'rollup_generation_region_year': {
+        'by': ['region', 'year'],
+        'metrics': ['electricity_generation_gwh', 'electricity_installed_capacity_mw'],
+    },
+    'rollup_capacity_group_decade': {
+        'by': ['group_technology', 'decade'],
+        'metrics': ['electricity_installed_capacity_mw', 'electricity_generation_gwh'],
+    },
+    'rollup_generation_technology_year': {
+        'by': ['renewable_or_not', 'group_technology', 'technology', 'year'],
+        'metrics': ['electricity_generation_gwh', 'electricity_installed_capacity_mw', 'heat_generation_tj'],
+    },
+    'rollup_generation_country_year': {
+        'by': ['country', 'region', 'year'],
+        'metrics': ['electricity_generation_gwh', 'electricity_installed_capacity_mw'],
+    },
+}
+
+# atributos temporais: permitem atualizar só os períodos que mudaram
+TIME_COLUMNS = ('year', 'decade')
+INTEGER_COLUMNS = ('year', 'decade')
+
+ROLLUP_METADATA = 'etl_rollups'
+
+
+def active_rollups(names=ROLLUPS):
+    """
+    Definições habilitadas em ETL_ROLLUPS ('all', 'none' ou nomes separados por vírgula).
+
+    Raises:
+        ValueError: Se algum nome não estiver em ROLLUP_DEFINITIONS.
+    """
+
+    if names == ['all']:
+        return dict(ROLLUP_DEFINITIONS)
+    if names in ([], ['none']):
+        return {}
+
+    unknown = [name for name in names if name not in ROLLUP_DEFINITIONS]
+    if unknown:
+        raise ValueError(f"ETL_ROLLUPS com agregados desconhecidos: {unknown} (opções: {list(ROLLUP_DEFINITIONS)})")
+    return {name: ROLLUP_DEFINITIONS[name] for name in names}
+
+
+
+def _definition_hash(definition):
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+
+def _time_column(definition):
+    return next((col for col in definition['by'] if col in TIME_COLUMNS), None)
+
+
+
+def compute_rollup(df, definition):
+    """
+    Calcula um agregado a partir do DataFrame final, antes da gravação no banco.
+
+    Args:
+        df (pd.DataFrame): DataFrame final do pipeline (ou o recorte dos períodos alterados).
+        definition (dict): Entrada de ROLLUP_DEFINITIONS.
+
+    Returns:
+        pd.DataFrame: Uma linha por grupo, com as métricas somadas (2 casas) e 'row_count'.
+    """
+
+    by, metrics = definition['by'], definition['metrics']
+
+    frame = df[[col for col in by if col != 'decade'] + metrics]
+    if 'decade' in by:
+        frame = frame.assign(decade=(df['year'] // 10) * 10)
+
+    # dropna=False: grupos com atributo nulo (ex.: país sem região) também entram no total
+    grouped = frame.groupby(by, observed=True, dropna=False, sort=False)
+    result = grouped[metrics].sum().round(2)
+    result['row_count'] = grouped.size()
+    result = result.reset_index()
+
+    return result.astype({col: 'Int64' for col in by if col in INTEGER_COLUMNS})
+
+
+
+def _create_rollup_table(name, definition, conn):
+    columns = [f"{col} INTEGER" if col in INTEGER_COLUMNS else f"{col} VARCHAR(100)" for col in definition['by']]
+    columns += [f"{col} NUMERIC(18,2)" for col in definition['metrics']]
+    columns.append("row_count BIGINT NOT NULL")
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    conn.execute(text(f"CREATE TABLE {name} ({', '.join(columns)})"))
+
+    time_column = _time_column(definition)
+    if time_column:
+        conn.execute(text(f"CREATE INDEX {name}_{time_column}_idx ON {name} ({time_column})"))
+
+
+
+def _table_scans(name, conn):
+    """Leituras da tabela (seq + index scans) já consolidadas mais as da transação corrente."""
+
+    return conn.execute(text("""
+        SELECT COALESCE((SELECT seq_scan + COALESCE(idx_scan, 0) FROM pg_stat_user_tables
+                         WHERE relid = to_regclass(:name)), 0)
+             + COALESCE((SELECT seq_scan + COALESCE(idx_scan, 0) FROM pg_stat_xact_user_tables
+                         WHERE relid = to_regclass(:name)), 0)
+    """), {'name': name}).scalar()
+
+
+
+def _read_metadata(conn):
+    rows = conn.execute(text(f"SELECT * FROM {ROLLUP_METADATA}")).mappings().all()
+    return {row['name']: dict(row) for row in rows}
+
+
+
+def refresh_rollups(df, conn, years=None, changed_attributes=()):
+    """
+    Atualiza as tabelas de agregados na mesma transação da carga.
+
+    - years=None (carga full/swap): recalcula todos os agregados;
+    - years=conjunto de anos (carga incremental): agregados com 'year' ou 'decade' só apagam e
+      reinserem os anos/décadas afetados; os demais são recalculados se algo mudou;
+    - agregados agrupados por um atributo de dimensão alterado (ex.: a região de um país) são
+      recalculados por inteiro: a mudança não aparece nos anos da fato;
+    - tabela nova ou definição alterada: recriada e calculada por inteiro.
+
+    O uso de cada agregado é medido pelas leituras registradas no pg_stat_user_tables entre uma
+    atualização e a seguinte (as leituras da própria carga são descontadas); agregados descartados
+    por falta de uso (drop_unused_rollups) não são recriados até serem reativados.
+
+    Args:
+        df (pd.DataFrame): DataFrame final do pipeline (todos os registros).
+        conn (sqlalchemy.engine.Connection): Conexão com a transação ativa.
+        years (set[int], opcional): Anos inseridos, alterados ou removidos nesta carga.
+        changed_attributes (set[str], opcional): Atributos de dimensão alterados nesta carga (upsert_dimension).
+
+    Returns:
+        dict[str, int]: Linhas gravadas por agregado.
+    """
+
+    definitions = active_rollups()
+    if not definitions:
+        return {}
+
+    metadata = _read_metadata(conn)
+    now = datetime.now()
+    written = {}
+
+    for name, definition in definitions.items():
+        entry = metadata.get(name)
+        if entry and entry['dropped_at'] is not None:
+            logger.info(f"    ⏭️  {name}: descartado por falta de uso (reative com: python src/rollups.py --restore {name})")
+            continue
+
+        definition_hash = _definition_hash(definition)
+        rebuild = entry is None or entry['definition_hash'] != definition_hash
+
+        # uso desde a última atualização, antes das leituras da própria carga (que entram em scans_after_refresh)
+        scans = 0 if rebuild else _table_scans(name, conn)
+        used = not rebuild and scans > entry['scans_after_refresh']
+
+        time_column = _time_column(definition)
+        stale = sorted(set(definition['by']) & set(changed_attributes))
+        kept = 0
+        if rebuild:
+            _create_rollup_table(name, definition, conn)
+            subset = df
+        elif years is None or stale:
+            conn.execute(text(f"TRUNCATE TABLE {name}"))
+            subset = df
+        elif not years:
+            # nada mudou: nenhum grupo é regravado, mas o uso desde a última carga ainda é registrado
+            kept = entry['group_count']
+            subset = df.iloc[:0]
+        elif time_column is None:
+            conn.execute(text(f"TRUNCATE TABLE {name}"))
+            subset = df
+        else:
+            periods = sorted({int(year) // 10 * 10 for year in years} if time_column == 'decade' else {int(year) for year in years})
+            deleted = conn.execute(text(f"DELETE FROM {name} WHERE {time_column} = ANY(:periods)"), {'periods': periods})
+            kept = entry['group_count'] - deleted.rowcount
+            period_of_row = (df['year'] // 10) * 10 if time_column == 'decade' else df['year']
+            subset = df[period_of_row.isin(periods).to_numpy(dtype=bool)]
+
+        rollup = compute_rollup(subset, definition)
+        if len(rollup) > 0:
+            rollup.to_sql(name, conn, if_exists='append', index=False, method='multi', chunksize=1000)
+        written[name] = len(rollup)
+
+        conn.execute(text(f"""
+            INSERT INTO {ROLLUP_METADATA} (name, definition, definition_hash, created_at, refreshed_at, group_count,
+                                           scans_after_refresh, uses, last_used_at, dropped_at)
+            VALUES (:name, :definition, :hash, :now, :now, :groups, :scans, 0, NULL, NULL)
+            ON CONFLICT (name) DO UPDATE SET
+                definition = EXCLUDED.definition,
+                definition_hash = EXCLUDED.definition_hash,
+                created_at = CASE WHEN :rebuild THEN EXCLUDED.created_at ELSE {ROLLUP_METADATA}.created_at END,
+                refreshed_at = EXCLUDED.refreshed_at,
+                group_count = EXCLUDED.group_count,
+                scans_after_refresh = EXCLUDED.scans_after_refresh,
+                uses = CASE WHEN :rebuild THEN 0 ELSE {ROLLUP_METADATA}.uses + :new_uses END,
+                last_used_at = CASE WHEN :used THEN :now WHEN :rebuild THEN NULL ELSE {ROLLUP_METADATA}.last_used_at END
+        """), {
+            'name': name, 'definition': json.dumps(definition), 'hash': definition_hash, 'now': now,
+            'groups': kept + len(rollup), 'scans': _table_scans(name, conn), 'rebuild': rebuild, 'used': used,
+            'new_uses': max(scans - entry['scans_after_refresh'], 0) if used else 0,
+        })
+
+        if subset is df:
+            scope = f"completo, {', '.join(stale)} alterado" if stale else 'completo'
+        else:
+            scope = f"{time_column} em {periods}" if years else 'sem alterações'
+        logger.info(f"    ✅ {name}: {len(rollup)} grupos ({scope})")
+
+    return written
+
+
+
+def rollup_usage(conn):
+    """Situação de cada agregado: linhas, última atualização, leituras acumuladas e último uso."""
+
+    return pd.read_sql(text(f"""
+        SELECT name, group_count, refreshed_at, uses, last_used_at, created_at, dropped_at
+        FROM {ROLLUP_METADATA} ORDER BY name
+    """), conn)
+
+
+
+def drop_unused_rollups(conn, days=ROLLUP_UNUSED_DAYS):
+    """
+    Descarta agregados sem leituras há `days` dias (ou nunca lidos desde a criação há mais de `days` dias).
+
+    A tabela é removida e o agregado fica marcado como descartado, para não ser recriado na próxima carga.
+
+    Returns:
+        list[str]: Agregados descartados.
+    """
+
+    limit = datetime.now() - timedelta(days=days)
+    dropped = []
+
+    for name, entry in _read_metadata(conn).items():
+        if entry['dropped_at'] is not None:
+            continue
+
+        # leituras ainda não contabilizadas por uma atualização também contam como uso
+        if _table_scans(name, conn) > entry['scans_after_refresh']:
+            continue
+
+        last_used = entry['last_used_at'] or entry['created_at']
+        if last_used < limit:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            conn.execute(text(f"UPDATE {ROLLUP_METADATA} SET dropped_at = :now, group_count = 0 WHERE name = :name"),
+                         {'now': datetime.now(), 'name': name})
+            dropped.append(name)
+            logger.info(f"🗑️  {name}: sem uso desde {last_used:%Y-%m-%d} - descartado")
+
+    return dropped
+
+
+
+def restore_rollup(conn, name):
+    """Reativa um agregado descartado: a próxima carga recria e recalcula a tabela."""
+
+    conn.execute(text(f"DELETE FROM {ROLLUP_METADATA} WHERE name = :name"), {'name': name})
+    logger.info(f"♻️  {name}: reativado - será recalculado na próxima carga")
+
+
+
+if __name__ == "__main__":
+
+    from config import get_engine
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    # uso: python src/rollups.py [--drop-unused [DIAS] | --restore NOME]
+    with get_engine().begin() as conn:
+        if '--drop-unused' in sys.argv:
+            position = sys.argv.index('--drop-unused') + 1
+            days = int(sys.argv[position]) if position < len(sys.argv) else ROLLUP_UNUSED_DAYS
+            dropped = drop_unused_rollups(conn, days)
+            logger.info(f"{len(dropped)} agregados descartados")
+        elif '--restore' in sys.argv:
+            restore_rollup(conn, sys.argv[sys.argv.index('--restore') + 1])
+        else:
+            logger.info(rollup_usage(conn).to_string(index=False))
@@ -0,0 +1,156 @@
+import json
+import logging
+import pandas as pd
+
+from config import METRIC_FLOAT_DTYPE, TEXT_DTYPE
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# Cabeçalhos originais da aba 'Country' da IRENA → nomes normalizados usados no pipeline
+SOURCE_COLUMNS = {
+    'Region': 'region',
+    'Sub-region': 'sub_region',
+    'Country': 'country',
+    'ISO3 code': 'iso3_code',
+    'M49 code': 'm49_code',
+    'RE or Non-RE': 'renewable_or_not',
+    'Group Technology': 'group_technology',
+    'Technology': 'technology',
+    'Sub-Technology': 'sub_technology',
+    'Producer Type': 'producer_type',
+    'Year': 'year',
+    'Electricity Generation (GWh)': 'electricity_generation_gwh',
+    'Electricity Installed Capacity (MW)': 'electricity_installed_capacity_mw',
+    'Heat Generation (TJ)': 'heat_generation_tj',
+    'Public Flows (2022 USD M)': 'total_public_flows_usd_m',
+    'SDG 7a1 Intl. Public Flows (2022 USD M)': 'international_public_flows_usd_m',
+    'SDG 7b1 RE capacity per capita (W/inhabitant)': 'capacity_per_capita_w'
+}
+
+# atributos das dimensões: poucas centenas de valores distintos em dezenas de milhares de linhas
+TEXT_COLUMNS = [
+    'region', 'sub_region', 'country', 'iso3_code', 'renewable_or_not',
+    'group_technology', 'technology', 'sub_technology', 'producer_type'
+]
+
+# códigos inteiros pequenos (ano e código M49 da ONU)
+SMALL_INT_COLUMNS = ['year', 'm49_code']
+
+# origem de cada linha na extração em lote (extract_batch)
+PROVENANCE_COLUMNS = ['source_file', 'sheet']
+
+# chave composta de um registro e o hash de 64 bits dela, calculado uma vez no fim das transformações (keys.py)
+COMPOSED_KEY = ['country', 'year', 'technology', 'sub_technology', 'producer_type']
+KEY_HASH_COLUMN = 'key_hash'
+
+METRIC_COLUMNS = [
+    'electricity_generation_gwh',
+    'electricity_installed_capacity_mw',
+    'heat_generation_tj',
+    'total_public_flows_usd_m',
+    'international_public_flows_usd_m',
+    'capacity_per_capita_w'
+]
+
+
+def dtype_plan(text_dtype=TEXT_DTYPE, float_dtype=METRIC_FLOAT_DTYPE):
+    """
+    Plano de tipos compactos por coluna (nomes normalizados).
+
+    - atributos textuais: 'category' (padrão) ou 'string[pyarrow]';
+    - year e m49_code: Int16 (inteiro anulável de 2 bytes);
+    - métricas: float64 (padrão) ou float32, conforme ETL_METRIC_DTYPE;
+    - colunas de origem da extração em lote: 'category'.
+    """
+
+    plan = {col: text_dtype for col in TEXT_COLUMNS}
+    plan.update({col: 'category' for col in PROVENANCE_COLUMNS})
+    plan.update({col: 'Int16' for col in SMALL_INT_COLUMNS})
+    plan.update({col: float_dtype for col in METRIC_COLUMNS})
+    return plan
+
+
+
+def _to_small_int(series):
+    """Converte para Int16 se todos os valores preenchidos forem numéricos inteiros; senão mantém a coluna."""
+
+    numeric = pd.to_numeric(series, errors='coerce')
+    convertible = numeric.notna().sum() == series.notna().sum() and (numeric.dropna() % 1 == 0).all()
+
+    if not convertible:
+        logger.warning(f"⚠️ Coluna '{series.name}' tem valores não inteiros - mantida sem conversão")
+        return series
+
+    return numeric.astype('Int16')
+
+
+
+def apply_dtype_plan(df, plan=None):
+    """
+    Aplica o plano de tipos ao DataFrame, aceitando tanto os cabeçalhos originais quanto os normalizados.
+
+    Pensado para rodar logo após a extração, de forma que todas as etapas seguintes já recebam
+    colunas compactas. Colunas ausentes no DataFrame são ignoradas.
+
+    Args:
+        df (pd.DataFrame): DataFrame extraído (ou já com colunas normalizadas).
+        plan (dict, opcional): Plano por nome normalizado; por padrão, dtype_plan().
+
+    Returns:
+        pd.DataFrame: O DataFrame com os tipos convertidos.
+    """
+
+    plan = plan or dtype_plan()
+    normalized = {col: SOURCE_COLUMNS.get(col, col) for col in df.columns}
+
+    for col, name in normalized.items():
+        dtype = plan.get(name)
+        if dtype is None or str(df[col].dtype) == dtype:
+            continue
+
+        if dtype == 'Int16':
+            df[col] = _to_small_int(df[col])
+        elif dtype.startswith('float'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+
+def memory_footprint(df, stage, report=None):
+    """
+    Mede a memória ocupada pelo DataFrame (memory_usage(deep=True)) e registra no log.
+
+    Args:
+        df (pd.DataFrame): DataFrame ao fim da etapa.
+        stage (str): Nome da etapa.
+        report (dict, opcional): Se informado, recebe {stage: bytes}.
+
+    Returns:
+        int: Total de bytes.
+    """
+
+    total = int(df.memory_usage(deep=True).sum())
+    logger.info(f"🧠 Memória após {stage}: {total / 1024 ** 2:,.2f} MB ({len(df):,} linhas)")
+
+    if report is not None:
+        report[stage] = total
+
+    return total
+
+
+
+def save_memory_report(report, path):
+    """Grava o relatório de memória por etapa (bytes e MB) em JSON."""
+
+    data = {stage: {'bytes': total, 'mb': round(total / 1024 ** 2, 2)} for stage, total in report.items()}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"📁 Relatório de memória salvo em: {path}")
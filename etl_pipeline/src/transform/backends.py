@@ -0,0 +1,209 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from config import FRAME_BACKEND
+from schema import SOURCE_COLUMNS, METRIC_COLUMNS, apply_dtype_plan
+from transform.rules import COMPILED_TEXT_RULES
+from transform.text import CRITICAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# 'pandas' é a referência (funções de transform.text e transform.numeric, etapa a etapa);
+# os demais executam as mesmas etapas como um único plano de consulta, sem cópias intermediárias
+BACKENDS = ('pandas', 'polars', 'duckdb')
+
+# posição original de cada linha: os filtros do pandas preservam o índice, os planos não
+ROW_COLUMN = '__row__'
+
+ROUND_DECIMALS = 2
+
+
+def _require(backend):
+    try:
+        return __import__(backend)
+    except ImportError as e:
+        raise ImportError(f"ETL_FRAME_BACKEND={backend} requer o pacote '{backend}' (pip install -r requirements-backends.txt).") from e
+
+
+
+def text_mappings(df, rules=COMPILED_TEXT_RULES):
+    """
+    Resultado das regras textuais para cada valor distinto das colunas tratadas.
+
+    É a mesma função compilada de transform.rules que o backend pandas aplica em map_unique_values,
+    então os planos lazy produzem exatamente os mesmos textos; como roda só sobre os valores distintos,
+    o custo depende da cardinalidade e não do número de linhas.
+
+    Args:
+        df (pd.DataFrame): Dados com os cabeçalhos originais ou já normalizados.
+
+    Returns:
+        dict[str, dict[str, str | None]]: {coluna original: {valor: valor normalizado}}.
+    """
+
+    mappings = {}
+
+    for col in df.columns:
+        compiled = rules.get(SOURCE_COLUMNS.get(col, col))
+        if compiled is None or not compiled.steps:
+            continue
+
+        series = df[col]
+        values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series.dropna().unique()
+
+        mapping = {}
+        for value in values:
+            if isinstance(value, str):
+                result = compiled.transform(value)
+                mapping[value] = result if isinstance(result, str) else None
+        mappings[col] = mapping
+
+    return mappings
+
+
+
+def _plan_columns(df):
+    """Nomes normalizados das colunas e das métricas presentes (o plano não depende da ordem de entrada)."""
+    names = {col: SOURCE_COLUMNS.get(col, col) for col in df.columns}
+    metrics = [name for name in names.values() if name in METRIC_COLUMNS]
+    return names, metrics
+
+
+
+def transform_polars(df):
+    """
+    Transformações textuais e numéricas como um único LazyFrame do Polars.
+
+    Renomeação, normalização textual, filtros e preenchimento/arredondamento das métricas entram no
+    mesmo plano; o otimizador funde os filtros e projeções e executa em todos os núcleos, e só o
+    resultado final é materializado.
+    """
+
+    pl = _require('polars')
+
+    names, metrics = _plan_columns(df)
+    mappings = text_mappings(df)
+    drop_values = list(COMPILED_TEXT_RULES['country'].drop_values)
+
+    # o índice pandas não é levado ao Polars: a posição original volta ao fim pela coluna ROW_COLUMN
+    frame = pl.from_pandas(df.reset_index(drop=True), nan_to_null=True).with_row_index(ROW_COLUMN)
+
+    plan = (
+        frame.lazy()
+        .rename(names)
+        .with_columns([
+            pl.col(names[col]).cast(pl.String).replace_strict(mapping, default=None, return_dtype=pl.String).cast(pl.Categorical)
+            for col, mapping in mappings.items()
+        ])
+        .filter(pl.all_horizontal([pl.col(col).is_not_null() for col in CRITICAL_COLUMNS]))
+        .filter(~pl.col('country').is_in(drop_values))
+        .filter(pl.any_horizontal([pl.col(col).is_not_null() & (pl.col(col) != 0) for col in metrics]))
+        .with_columns([pl.col(col).fill_null(0).round(ROUND_DECIMALS, mode='half_to_even') for col in metrics])
+    )
+
+    result = plan.collect().to_pandas()
+    return result, mappings
+
+
+
+def transform_duckdb(df):
+    """
+    Transformações textuais e numéricas como uma única consulta DuckDB sobre o DataFrame.
+
+    A normalização textual é um LEFT JOIN com as tabelas de valores distintos (text_mappings);
+    filtros, COALESCE e arredondamento rodam no mesmo plano vetorizado e paralelo do DuckDB.
+    """
+
+    duckdb = _require('duckdb')
+
+    names, metrics = _plan_columns(df)
+    mappings = text_mappings(df)
+    drop_values = list(COMPILED_TEXT_RULES['country'].drop_values)
+
+    def quoted(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    con = duckdb.connect()
+    try:
+        # registrado como tabela Arrow: o DuckDB lê os buffers direto, sem os atributos internos das colunas
+        # string[pyarrow] do pandas (que emitem FutureWarning)
+        source = df.reset_index(drop=True).assign(**{ROW_COLUMN: np.arange(len(df))})
+        con.register('source', pa.Table.from_pandas(source, preserve_index=False))
+
+        joins, selects = [], []
+        for position, (col, name) in enumerate(names.items()):
+            if col in mappings:
+                table = f"mapping_{position}"
+                con.register(table, pd.DataFrame({'value': list(mappings[col]), 'normalized': list(mappings[col].values())},
+                                                 dtype=object))
+                joins.append(f"LEFT JOIN {table} ON CAST(s.{quoted(col)} AS VARCHAR) = {table}.value")
+                selects.append(f"{table}.normalized AS {quoted(name)}")
+            else:
+                selects.append(f"s.{quoted(col)} AS {quoted(name)}")
+
+        # os filtros usam os textos já normalizados e as métricas ainda com nulos, como no pandas
+        conditions = [f"{quoted(name)} IS NOT NULL" for name in CRITICAL_COLUMNS]
+        conditions.append(f"{quoted('country')} <> ALL (SELECT unnest($drop_values::VARCHAR[]))")
+        conditions.append("(" + " OR ".join(f"COALESCE({quoted(name)}, 0) <> 0" for name in metrics) + ")")
+
+        outputs = [
+            f"round_even(COALESCE({quoted(name)}, 0), {ROUND_DECIMALS}) AS {quoted(name)}" if name in metrics else quoted(name)
+            for name in names.values()
+        ]
+
+        query = f"""
+            WITH normalized AS (
+                SELECT s.{ROW_COLUMN}, {', '.join(selects)}
+                FROM source s
+                {' '.join(joins)}
+            )
+            SELECT {ROW_COLUMN}, {', '.join(outputs)}
+            FROM normalized
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {ROW_COLUMN}
+        """
+        result = con.execute(query, {'drop_values': drop_values}).df()
+    finally:
+        con.close()
+
+    return result, mappings
+
+
+
+def run_backend(df, backend=FRAME_BACKEND):
+    """
+    Executa as etapas 2 e 3 (transformações textuais e numéricas) em um backend lazy.
+
+    O resultado segue o contrato do backend pandas: mesmas linhas na mesma ordem, índice original,
+    colunas textuais tratadas como categóricas e os demais tipos pelo plano de tipos (schema).
+
+    Args:
+        df (pd.DataFrame): Saída da extração (cabeçalhos originais).
+        backend (str): 'polars' ou 'duckdb' (ETL_FRAME_BACKEND).
+
+    Returns:
+        pd.DataFrame: O DataFrame transformado.
+    """
+
+    runners = {'polars': transform_polars, 'duckdb': transform_duckdb}
+    if backend not in runners:
+        raise ValueError(f"ETL_FRAME_BACKEND inválido para execução lazy: '{backend}' (opções: {list(runners)})")
+
+    before = len(df)
+    result, mappings = runners[backend](df)
+
+    result.index = df.index[result.pop(ROW_COLUMN).to_numpy()]
+    result = apply_dtype_plan(result)
+    for col in mappings:
+        name = SOURCE_COLUMNS.get(col, col)
+        result[name] = result[name].astype('category')
+
+    logger.info(f"✅ Transformações executadas no backend {backend}: {before - len(result)} registros removidos, "
+                f"{len(result)} mantidos")
+
+    return result
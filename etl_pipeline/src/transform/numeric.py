@@ -1,26 +1,23 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from config import DATA_RAW_DIR, DATA_PROCESSED_DIR
+from schema import METRIC_COLUMNS
+from frame_io import FRAME_SUFFIX, read_frame, write_frame
+from diagnostics import preview
 
 import logging
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-INPUT_FILE = DATA_PROCESSED_DIR / 'renewable_energy_data_text.csv'
-OUTPUT_PATH = DATA_PROCESSED_DIR / 'renewable_energy_data_clean.csv'
+INPUT_FILE = DATA_PROCESSED_DIR / f'renewable_energy_data_text{FRAME_SUFFIX}'
+OUTPUT_PATH = DATA_PROCESSED_DIR / f'renewable_energy_data_clean{FRAME_SUFFIX}'
 
 pd.set_option('display.max_columns', None)
 
 
-metric_columns = [
-    'electricity_generation_gwh',
-    'electricity_installed_capacity_mw',
-    'heat_generation_tj',
-    'total_public_flows_usd_m',
-    'international_public_flows_usd_m',
-    'capacity_per_capita_w'
-]
+metric_columns = METRIC_COLUMNS
 
 
 
@@ -53,7 +50,7 @@ def clean_numeric_data(df):
 
     logger.info(f"Removidos {removed} registros")
     logger.info("✅ Limpeza de dados concluída!")
-    logger.debug(f"{df.tail(5)}")
+    logger.debug("%s", preview(df, tail=True))
 
     return df
 
@@ -88,7 +85,7 @@ def fill_nan_numeric_data(df):
     logger.debug(f"\n{fiiled} células preenchidas com 0\n")
     logger.debug(f"\nNaNs antes: {nans_before}, depois: {nans_after}\n")
     logger.info("✅ Preenchimento de céluas vazias concluido!")
-    logger.debug(f"{df.tail(5)}")
+    logger.debug("%s", preview(df, tail=True))
 
     return df    
 
@@ -102,8 +99,61 @@ def round_metrics(df):
             df[col] = df[col].round(2)
 
     logger.info(f"✅ Dados numéricos arredondados!")
-    logger.debug(f"\nApós arrendondamento:\n")
-    logger.debug(f"{df.tail(5)}")     
+    logger.debug("\nApós arrendondamento:\n%s", preview(df, tail=True))
+
+    return df
+
+
+
+def clean_fill_round_metrics(df):
+    """
+    Limpeza, preenchimento e arredondamento das métricas sobre um único bloco 2D de floats.
+
+    Produz o mesmo resultado de clean_numeric_data → fill_nan_numeric_data → round_metrics, mas as seis
+    colunas métricas são copiadas uma vez para uma matriz NumPy contígua (linhas × métricas) e todas as
+    regras rodam nela, com ufuncs escrevendo no próprio bloco:
+
+    - a máscara "nenhuma métrica relevante" (todas nulas ou zero) sai de uma redução por linha, sem a
+      cópia em dtype object de `replace(0, pd.NA)`;
+    - as células nulas das linhas mantidas são contadas e zeradas com a mesma máscara;
+    - o arredondamento é um único np.round sobre o bloco, não coluna a coluna.
+
+    O DataFrame só é tocado duas vezes: a seleção das linhas mantidas e a atribuição do bloco de volta.
+
+    Args:
+        df (pd.DataFrame): Saída das transformações textuais.
+
+    Returns:
+        pd.DataFrame: Registros com ano e pelo menos uma métrica válida, métricas sem nulos e arredondadas.
+    """
+
+    before = len(df)
+
+    # mantém a largura do plano de tipos (float32 com ETL_METRIC_DTYPE=float32)
+    dtype = np.float32 if set(df[metric_columns].dtypes) == {np.dtype('float32')} else np.float64
+
+    block = df[metric_columns].to_numpy(dtype=dtype, na_value=np.nan)
+    missing = np.isnan(block)
+
+    # NaN != 0 é verdadeiro, então as células nulas precisam sair da comparação explicitamente
+    keep = ((block != 0) & ~missing).any(axis=1) & df['year'].notna().to_numpy()
+
+    block = block[keep]
+    missing = missing[keep]
+
+    filled = int(missing.sum())
+    block[missing] = 0
+    np.round(block, 2, out=block)
+
+    # take (e não df[keep]) devolve um DataFrame independente: a atribuição não dispara
+    # SettingWithCopyWarning nem exige um .copy() extra
+    df = df.take(np.flatnonzero(keep))
+    df[metric_columns] = block
+
+    logger.info(f"Removidos {before - len(df)} registros")
+    logger.debug(f"\n{filled} células preenchidas com 0\n")
+    logger.info("✅ Limpeza, preenchimento e arredondamento das métricas concluídos!")
+    logger.debug("%s", preview(df, tail=True))
 
     return df
 
@@ -121,14 +171,11 @@ if __name__ == "__main__":
     logger.info("🚀 INICIANDO TRANSFORMAÇÕES NUMÉRICAS")
     logger.info("="*60 + "\n")
 
-    df = pd.read_csv(INPUT_FILE)
+    df = read_frame(INPUT_FILE)
     logger.info(f"📊 Carregados {len(df)} registros\n")
 
-    df = clean_numeric_data(df)
-    df = fill_nan_numeric_data(df)
-    df = round_metrics(df)
+    df = clean_fill_round_metrics(df)
 
-    df.to_csv(OUTPUT_PATH, index=False)
+    write_frame(df, OUTPUT_PATH)
 
-    logger.debug("\n📊 Dados pós transformações:\n")
-    logger.debug(f"{df.tail(5)}")
\ No newline at end of file
+    logger.debug("\n📊 Dados pós transformações:\n%s", preview(df, tail=True))
\ No newline at end of file
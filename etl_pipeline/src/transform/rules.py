@@ -0,0 +1,181 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Regras de limpeza textual, por coluna e na ordem em que são aplicadas.
+#
+# Tipos de regra:
+# - ('strip',) / ('title',) / ('upper',) / ('lower',): métodos de string
+# - ('replace', antigo, novo): substituição literal
+# - ('regex', padrão, novo): substituição por expressão regular
+# - ('map', {valor: novo}): troca de valores inteiros
+# - ('drop', [valores]): remove as linhas com esses valores (aplicada em clean_text_data)
+#
+# Valores que não são texto viram nulos na primeira regra de string, como no acessor .str do pandas.
+
+TECH_MAPPING = {
+    'crops': 'energy crops',
+    'other biogases from anaerobic fermentation': 'biogas anaerobic',
+    'other primary solid biofuels': 'other primary biofuels'
+}
+
+INVALID_COUNTRIES = [
+    'Residual/Unallocated Oda: Sub-Saharan Africa',
+    'Residual/Unallocated Oda: Latin America And The Caribbean',
+    'Residual/Unallocated Oda: Central Asia And Southern Asia',
+    'Residual/Unallocated Oda: Western Asia\xa0And Northern Africa',
+    'Residual/Unallocated Oda: Eastern And South-Eastern Asia',
+    'Residual/Unallocated Oda: Northern America And Europe',
+    'Residual/Unallocated Oda: Oceania Excl. Aus. And N. Zealand',
+    'European Union (27)',
+    'Multilateral'
+]
+
+# padronização comum às colunas de categoria
+_CATEGORY_RULES = [
+    ('regex', '[*()-]', ''),
+    ('replace', ' excl. ', ' excluding '),
+    ('strip',),
+    ('lower',),
+]
+
+# remoção de termos genéricos nas colunas de detalhe da tecnologia
+_DETAIL_RULES = [
+    ('replace', 'n.e.s.', ''),
+    ('replace', 'energy', ''),
+    ('replace', 'renewable ', ''),
+    ('strip',),
+]
+
+TEXT_RULES = {
+    'region': [('strip',), ('title',)],
+    'sub_region': [('strip',), ('title',)],
+    'country': [('strip',), ('title',), ('drop', INVALID_COUNTRIES)],
+    'iso3_code': [('strip',), ('upper',)],
+    'renewable_or_not': _CATEGORY_RULES + [('replace', 'total ', ''), ('strip',)],
+    'group_technology': _CATEGORY_RULES + [('replace', ' n.e.s.', ''), ('strip',)],
+    'technology': _CATEGORY_RULES + _DETAIL_RULES + [('map', TECH_MAPPING)],
+    'sub_technology': _CATEGORY_RULES + [('replace', 'total ', ''), ('strip',)] + _DETAIL_RULES + [('map', TECH_MAPPING)],
+    'producer_type': _CATEGORY_RULES,
+}
+
+
+CompiledColumn = namedtuple('CompiledColumn', ['transform', 'steps', 'drop_values'])
+
+
+def _string_step(method):
+    def step(value):
+        return method(value) if isinstance(value, str) else np.nan
+    return step
+
+
+def _compile_rule(rule):
+    """Converte uma regra da tabela em (nome, função valor → valor)."""
+
+    kind, args = rule[0], rule[1:]
+
+    if kind in ('strip', 'title', 'upper', 'lower'):
+        return kind, _string_step(getattr(str, kind))
+
+    if kind == 'replace':
+        old, new = args
+        return f"replace {old!r} → {new!r}", _string_step(lambda value: value.replace(old, new))
+
+    if kind == 'regex':
+        pattern, new = re.compile(args[0]), args[1]
+        return f"regex {args[0]!r} → {new!r}", _string_step(lambda value: pattern.sub(new, value))
+
+    if kind == 'map':
+        mapping = args[0]
+        return f"map ({len(mapping)} valores)", lambda value: mapping.get(value, value) if isinstance(value, str) else value
+
+    raise ValueError(f"Tipo de regra textual desconhecido: '{kind}'")
+
+
+
+def compile_text_rules(rules):
+    """
+    Compila a tabela de regras em uma função por coluna.
+
+    As regras de cada coluna são fundidas em uma única função (valor → valor) que aplica todos os
+    passos em sequência, então uma coluna é percorrida uma vez só, não importa quantas regras tenha.
+    As regras 'drop' são separadas em um conjunto de valores a remover.
+
+    Args:
+        rules (dict): Tabela no formato de TEXT_RULES.
+
+    Returns:
+        dict[str, CompiledColumn]: Função fundida, passos individuais (para o dry-run) e valores a remover.
+    """
+
+    compiled = {}
+
+    for column, column_rules in rules.items():
+        steps = []
+        drop_values = set()
+
+        for rule in column_rules:
+            if rule[0] == 'drop':
+                drop_values.update(rule[1])
+            else:
+                steps.append(_compile_rule(rule))
+
+        functions = [function for _, function in steps]
+
+        def transform(value, functions=functions):
+            for function in functions:
+                value = function(value)
+            return value
+
+        compiled[column] = CompiledColumn(transform, steps, frozenset(drop_values))
+
+    return compiled
+
+
+
+def _changed(before, after):
+    if pd.isna(before) and pd.isna(after):
+        return False
+    return pd.isna(before) or pd.isna(after) or before != after
+
+
+
+def text_rules_report(df, compiled):
+    """
+    Dry-run das regras: conta em quantas linhas cada regra alteraria o valor, sem modificar o DataFrame.
+
+    A simulação roda sobre os valores distintos de cada coluna, ponderados pela contagem de linhas.
+
+    Returns:
+        pd.DataFrame: Uma linha por regra, com as colunas 'column', 'rule' e 'rows'.
+    """
+
+    report = []
+
+    for column, rules in compiled.items():
+        if column not in df.columns:
+            continue
+
+        counts = df[column].value_counts(dropna=False)
+        counts = counts[counts > 0]
+        values, weights = list(counts.index), counts.to_numpy()
+
+        for name, function in rules.steps:
+            new_values = [function(value) for value in values]
+            fired = sum(int(weight) for before, after, weight in zip(values, new_values, weights) if _changed(before, after))
+            report.append({'column': column, 'rule': name, 'rows': fired})
+            values = new_values
+
+        if rules.drop_values:
+            dropped = sum(int(weight) for value, weight in zip(values, weights) if value in rules.drop_values)
+            report.append({'column': column, 'rule': f"drop ({len(rules.drop_values)} valores)", 'rows': dropped})
+
+    return pd.DataFrame(report, columns=['column', 'rule', 'rows'])
+
+
+
+# compilada uma única vez, na importação do módulo
+COMPILED_TEXT_RULES = compile_text_rules(TEXT_RULES)
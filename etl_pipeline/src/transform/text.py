@@ -1,19 +1,57 @@
+import sys
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from config import DATA_RAW_DIR, DATA_PROCESSED_DIR
+from schema import SOURCE_COLUMNS
+from frame_io import FRAME_SUFFIX, read_frame, write_frame
+from diagnostics import preview
+from transform.rules import COMPILED_TEXT_RULES, text_rules_report
 
 import logging
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-FILE_PATH = DATA_RAW_DIR / 'renewable_energy_data.csv'
-OUTPUT_PATH = DATA_PROCESSED_DIR / 'renewable_energy_data_text.csv'
+FILE_PATH = DATA_RAW_DIR / f'renewable_energy_data{FRAME_SUFFIX}'
+OUTPUT_PATH = DATA_PROCESSED_DIR / f'renewable_energy_data_text{FRAME_SUFFIX}'
+
+# colunas sem as quais o registro não é identificável (clean_text_data)
+CRITICAL_COLUMNS = ['country', 'year', 'technology']
 
 # obriga o pandas a mostrar todas as colunas
 pd.set_option('display.max_columns', None) 
 
 
+def map_unique_values(series, transform):
+    """
+    Aplica uma transformação textual apenas aos valores distintos da coluna.
+
+    A coluna é fatorada em códigos inteiros + valores únicos; `transform` (uma função que recebe e
+    devolve uma Series) roda uma vez sobre os valores únicos e o resultado é remapeado pelos códigos.
+    Como as colunas textuais têm poucas centenas de valores distintos, o custo passa a depender da
+    cardinalidade e não do número de linhas. O resultado é uma coluna categórica com os mesmos
+    valores que `transform(series)` produziria.
+
+    Args:
+        series (pd.Series): Coluna textual (object ou category).
+        transform (Callable[[pd.Series], pd.Series]): Cadeia de operações .str/.replace.
+
+    Returns:
+        pd.Series: Coluna categórica transformada, com o mesmo índice.
+    """
+
+    codes, uniques = pd.factorize(series)
+    transformed = transform(pd.Series(np.asarray(uniques, dtype=object), dtype=object))
+
+    # valores diferentes podem convergir para o mesmo resultado (ex.: 'Solar ' e 'solar')
+    new_codes, categories = pd.factorize(transformed)
+    codes = np.where(codes >= 0, new_codes[codes], -1)
+
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+
+
+
 def normalize_text_columns(df):
     """
     Normaliza os nomes das colunas do DataFrame.
@@ -32,32 +70,12 @@ def normalize_text_columns(df):
         pd.DataFrame: O DataFrame com os nomes das colunas normalizados.
     """
 
-    normalized_columns={
-        'Region': 'region',
-        'Sub-region': 'sub_region',
-        'Country': 'country',
-        'ISO3 code': 'iso3_code',
-        'M49 code': 'm49_code',
-        'RE or Non-RE': 'renewable_or_not',
-        'Group Technology': 'group_technology',
-        'Technology': 'technology',
-        'Sub-Technology': 'sub_technology',
-        'Producer Type': 'producer_type',
-        'Year': 'year',
-        'Electricity Generation (GWh)': 'electricity_generation_gwh',
-        'Electricity Installed Capacity (MW)': 'electricity_installed_capacity_mw',
-        'Heat Generation (TJ)': 'heat_generation_tj',
-        'Public Flows (2022 USD M)': 'total_public_flows_usd_m',
-        'SDG 7a1 Intl. Public Flows (2022 USD M)': 'international_public_flows_usd_m',
-        'SDG 7b1 RE capacity per capita (W/inhabitant)': 'capacity_per_capita_w'
-    }
+    normalized_columns = SOURCE_COLUMNS
 
     df = df.rename(columns=normalized_columns)
 
 
-    logger.debug("\nnormalize_columns_names\n")
-    logger.debug(f"\n{df.head(10)}\n")    
-    logger.debug(f"\n{df.tail(10)}")
+    logger.debug("\nnormalize_columns_names\n%s", preview(df, 10))
 
     logger.info("✅ Normalização dos nomes de colunas concluida!")
 
@@ -65,43 +83,6 @@ def normalize_text_columns(df):
 
 
 
-def apply_text_rules(df):
-    """Aplica regras de texto como remoção de caracteres especiais e padronização de valores específicos em colunas textuais."""
-
-
-    detail_col = ['technology', 'sub_technology']
-
-    for col in detail_col:
-        if col in df.columns:
-            df[col] = (df[col]
-                       .str.replace('n.e.s.', '', regex=False)
-                       .str.replace('energy', '', regex=False)
-                       .str.replace('renewable ', '', regex=False)
-                       .str.strip())
-
-
-
-    if 'group_technology' in df.columns:
-        df['group_technology'] = (df['group_technology']
-                                  .str.replace(' n.e.s.', '', regex=False)
-                                  .str.strip())     
-
-
-
-    tech_mapping = {
-        'crops': 'energy crops',
-        'other biogases from anaerobic fermentation': 'biogas anaerobic',
-        'other primary solid biofuels': 'other primary biofuels'
-    }
-
-    for col in ['technology', 'sub_technology']:
-        if col in df.columns:
-            df[col] = df[col].replace(tech_mapping)                              
-
-    return df                       
-
-
-
 def normalize_text_data(df):
     """
     Normaliza os dados textuais do DataFrame
@@ -112,48 +93,22 @@ def normalize_text_data(df):
     - Padroniza as categorias (renewable_or_not, group_technology, technology, sub_technology, producer_type) para minúsculas, sem caracteres especiais e sem espaços vazios.
     - Aplica regras específicas de padronização de texto, como remoção de "total " e mais caracteres especiais.
 
+    As regras ficam declaradas em transform.rules.TEXT_RULES e já chegam compiladas em uma função
+    por coluna; essa função roda sobre os valores distintos da coluna (map_unique_values) e as
+    colunas textuais tratadas são devolvidas como categóricas.
+
     Args:
         df (pd.DataFrame): O DataFrame com os dados textuais a serem normalizados.
     Returns:
         pd.DataFrame: O DataFrame com os dados textuais normalizados.    
     """
 
-    # nomes próprios
-    locations_columns = ['region', 'sub_region', 'country'] 
-    for col in locations_columns:
-        if col in df.columns:
-           df[col] = df[col].str.strip().str.title()
+    for col, rules in COMPILED_TEXT_RULES.items():
+        if col in df.columns and rules.steps:
+            df[col] = map_unique_values(df[col], lambda values: values.map(rules.transform))
 
-    # código
-    df['iso3_code'] = df['iso3_code'].str.strip().str.upper()
 
-    # categorias
-    category_columns = ['renewable_or_not', 'group_technology', 'technology', 'sub_technology', 'producer_type']
-    
-    for col in category_columns:
-        if col in df.columns:
-
-            df[col] = (
-                df[col]
-                .str.replace('[*()-]', '', regex=True)
-                .str.replace(' excl. ', ' excluding ')
-                .str.strip()
-                .str.lower()
-            ) 
-
-    cols_to_fix = ['renewable_or_not', 'sub_technology']
-    
-    for col in cols_to_fix:
-        if col in df.columns:
-            df[col] = df[col].str.replace('total ', '', regex=False).str.strip()      
-
-
-    df = apply_text_rules(df)        
-
-
-    logger.debug("\nnormalize_textual_columns\n")
-    logger.debug(f"\n{df.head(5)}\n")
-    logger.debug(f"\n{df.tail(5)}")
+    logger.debug("\nnormalize_textual_columns\n%s", preview(df))
 
     logger.info("✅ Normalização de dados concluída!")
 
@@ -177,12 +132,10 @@ def clean_text_data(df):
     Returns:
         pd.DataFrame: O DataFrame com os registros inválidos removidos, mantendo apenas aqueles com identificação completa e válida.    
     """
-    critic_columuns = ['country', 'year', 'technology']
-
     before = len(df)
 
     removed_any = False
-    for col in critic_columuns:
+    for col in CRITICAL_COLUMNS:
         null_before = df[col].isna().sum()
         if null_before > 0:
             logger.info(f"⚠️ {null_before} registros sem '{col}' - removendo... ")
@@ -193,18 +146,8 @@ def clean_text_data(df):
         logger.info("✅ Nenhum registro com valor nulo nas colunas críticas!")           
 
 
- #remove linhas com valor inválido na coluna country
-    invalid_country = [
-        'Residual/Unallocated Oda: Sub-Saharan Africa',
-        'Residual/Unallocated Oda: Latin America And The Caribbean',
-        'Residual/Unallocated Oda: Central Asia And Southern Asia',
-        'Residual/Unallocated Oda: Western Asia\xa0And Northern Africa',
-        'Residual/Unallocated Oda: Eastern And South-Eastern Asia',
-        'Residual/Unallocated Oda: Northern America And Europe',
-        'Residual/Unallocated Oda: Oceania Excl. Aus. And N. Zealand',
-        'European Union (27)',
-        'Multilateral'
-    ]
+ #remove linhas com valor inválido na coluna country (regras 'drop' de TEXT_RULES)
+    invalid_country = list(COMPILED_TEXT_RULES['country'].drop_values)
     mask = df['country'].isin(invalid_country)
     count = mask.sum()
     if count > 0:
@@ -220,9 +163,7 @@ def clean_text_data(df):
     logger.info(f"Mantidos: {after} registros com identificação completa") 
 
 
-    logger.debug("\nclean_critic_colmuns\n")
-    logger.debug(f"\n{df.head(5)}\n")
-    logger.debug(f"\n{df.tail(5)}")
+    logger.debug("\nclean_critic_colmuns\n%s", preview(df))
 
     logger.info("✅ Limpeza de dados concluída!")
 
@@ -238,18 +179,27 @@ if __name__ == "__main__":
     logger.setLevel(logging.DEBUG)
     #logger.setLevel(logging.INFO) 
 
+    dry_run = '--dry-run' in sys.argv
+
     logger.info("="*60)
-    logger.info("🚀 INICIANDO TRANSFORMAÇÕES TEXTUAIS")
+    logger.info("🚀 INICIANDO TRANSFORMAÇÕES TEXTUAIS" + (" (DRY-RUN)" if dry_run else ""))
     logger.info("="*60 + "\n")
 
-    df = pd.read_csv(FILE_PATH)
+    df = read_frame(FILE_PATH)
     logger.info(f"📊 Carregados {len(df)} registros\n")
 
     df = normalize_text_columns(df)
+
+    if dry_run:
+        # apenas relata quais regras disparariam e em quantas linhas, sem gravar nada
+        report = text_rules_report(df, COMPILED_TEXT_RULES)
+        logger.info(f"\n{report.to_string(index=False)}")
+        sys.exit(0)
+
     df = normalize_text_data(df)
     df = clean_text_data(df)
 
-    df.to_csv(OUTPUT_PATH, index=False)
+    write_frame(df, OUTPUT_PATH)
     
     logger.info("="*60)
     logger.info("✅ TRANSFORMAÇÕES TEXTUAIS CONCLUÍDAS")
@@ -1,203 +1,310 @@
+import json
+import sys
+import numpy as np
 import pandas as pd
+from collections import namedtuple
 from pathlib import Path
-from config import DATA_PROCESSED_DIR
+from config import DATA_PROCESSED_DIR, DATA_LOGS_DIR, VALIDATION_FAIL_FAST
+from metrics import measure
+from schema import PROVENANCE_COLUMNS, COMPOSED_KEY, KEY_HASH_COLUMN
+from keys import duplicated_keys, duplicate_groups
+from frame_io import FRAME_SUFFIX, read_frame, write_frame
 
 import logging
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-INPUT_DIR = DATA_PROCESSED_DIR / 'renewable_energy_data_clean.csv'
-OUTPUT_PATH = DATA_PROCESSED_DIR / 'renewable_energy_data_validated.csv'
+INPUT_DIR = DATA_PROCESSED_DIR / f'renewable_energy_data_clean{FRAME_SUFFIX}'
+OUTPUT_PATH = DATA_PROCESSED_DIR / f'renewable_energy_data_validated{FRAME_SUFFIX}'
+REPORT_PATH = DATA_LOGS_DIR / 'validation_report.json'
+
+EXPECTED_COLUMNS = [
+    'region',
+    'sub_region',
+    'country',
+    'iso3_code',
+    'm49_code',
+    'renewable_or_not',
+    'group_technology',
+    'technology',
+    'sub_technology',
+    'producer_type',
+    'year',
+    'electricity_generation_gwh',
+    'electricity_installed_capacity_mw',
+    'heat_generation_tj',
+    'total_public_flows_usd_m',
+    'international_public_flows_usd_m',
+    'capacity_per_capita_w'
+]
+
+VALID_REGIONS = [
+    'Africa',
+    'Americas',
+    'Asia',
+    'Europe',
+    'Oceania'
+]
+
+MIN_RECORDS = 60000
+MIN_COUNTRIES = 200
+
+SAMPLE_SIZE = 5
+
+SEVERITIES = ('error', 'warning')
+
+
+# Registro das regras de validação, na ordem de execução
+ValidationRule = namedtuple('ValidationRule', ['name', 'severity', 'description', 'columns', 'check'])
+VALIDATION_RULES = []
+
+
+def validation_rule(name, severity, description, columns=()):
+    """
+    Registra uma função como regra de validação.
 
+    A função recebe o DataFrame e devolve as violações encontradas em uma das formas:
+    - pd.Series booleana: máscara das linhas que violam a regra (regra por linha);
+    - int: quantidade de violações no conjunto de dados (regra agregada, 0 = ok);
+    - tupla (máscara ou int, detalhe): o mesmo, com um texto de detalhe para o relatório.
 
-def validate_columns(df):
-    """ Valida a presença e a ordem correta das colunas esperadas, garantindo a integridade estrutural do DataFrame."""
-
-    logger.info("Iniciando validação de colunas...")
-
-    expected_columns = [
-        'region',
-        'sub_region',
-        'country',
-        'iso3_code',
-        'm49_code',
-        'renewable_or_not',
-        'group_technology',
-        'technology',
-        'sub_technology',
-        'producer_type',
-        'year',
-        'electricity_generation_gwh',
-        'electricity_installed_capacity_mw',
-        'heat_generation_tj',
-        'total_public_flows_usd_m',
-        'international_public_flows_usd_m',
-        'capacity_per_capita_w'
-    ]
-
-    currently_columns = df.columns.tolist()
-
-    if expected_columns == currently_columns:
-        logger.info(f"✅ Todas as {len(expected_columns)} colunas presentes e na ordem correta\n")
-    else:
-        missing = set(expected_columns) - set(currently_columns)
-        extra = set(currently_columns) - set(expected_columns)
-        wrong_order = currently_columns != expected_columns
+    Args:
+        name (str): Identificador da regra no relatório.
+        severity (str): 'error' (pode interromper o pipeline) ou 'warning'.
+        description (str): Descrição exibida no log quando a regra passa.
+        columns (tuple): Colunas necessárias; sem elas a regra é ignorada ('skipped').
+    """
 
-        if missing:
-            logger.error(f"❌ Colunas faltando: {missing}")
-        if extra:
-            logger.error(f"❌ Colunas extras: {extra}")
-        if wrong_order:
-            logger.error(f"❌ Ordem incorreta!\n Esperando: {expected_columns}\n Atual: {currently_columns} ")
+    if severity not in SEVERITIES:
+        raise ValueError(f"Severidade inválida: '{severity}' (opções: {SEVERITIES})")
 
+    def register(check):
+        VALIDATION_RULES.append(ValidationRule(name, severity, description, tuple(columns), check))
+        return check
 
-    return df
+    return register
 
 
 
-def validate_registers_count(df):
-    """ Valida a contagem total de registros, garantindo que o dataset não esteja vazio ou com um número anormalmente baixo de linhas."""
+@validation_rule('columns', 'error', "Todas as colunas presentes e na ordem correta")
+def validate_columns(df):
+    """
+    Valida a presença e a ordem correta das colunas esperadas, garantindo a integridade estrutural do DataFrame.
 
-    logger.info("Validando contagem de registros...")
+    As colunas de origem da extração em lote (source_file, sheet) e o hash da chave composta não fazem
+    parte do contrato e são ignorados.
+    """
 
-    total = len(df)
-    min_expected = 60000
+    currently_columns = [col for col in df.columns if col not in PROVENANCE_COLUMNS and col != KEY_HASH_COLUMN]
 
-    if total == 0:
-        logger.error("❌ Dataset vazio! Todas as linhas foram removidas!")
-    elif total < min_expected:
-        logger.warning(f"⚠️ Poucos registros: {total:,} (esperado: >{min_expected:,})")
-    else:
-        logger.info(f"✅ Total de registros: {total:,}")
+    if currently_columns == EXPECTED_COLUMNS:
+        return 0
 
+    missing = [col for col in EXPECTED_COLUMNS if col not in currently_columns]
+    extra = [col for col in currently_columns if col not in EXPECTED_COLUMNS]
+    detail = f"faltando: {missing} | extras: {extra} | atual: {currently_columns}"
 
-    return df
+    return max(len(missing) + len(extra), 1), detail
 
 
 
-def nulls_year_column(df):
-    """ Verifica a presença de valores nulos na coluna 'year', que é crítica para análises temporais, e registra a quantidade encontrada."""
+@validation_rule('empty_dataset', 'error', "Dataset com registros")
+def validate_not_empty(df):
+    """Garante que o dataset não ficou vazio após as transformações."""
 
-    logger.info("Verificando valores nulls na coluna year...")
+    return int(len(df) == 0)
 
-    null = df['year'].isna().sum()
 
-    if null > 0:
-        logger.error(f"\n❌ {null} linhas com a coluna year vazia")
-    else:
-        logger.info("✅ Sem null na coluna year!")
 
+@validation_rule('registers_count', 'warning', f"Total de registros acima de {MIN_RECORDS:,}")
+def validate_registers_count(df):
+    """Valida se o dataset não tem um número anormalmente baixo de linhas."""
 
-    return df
+    total = len(df)
+    if 0 < total < MIN_RECORDS:
+        return 1, f"{total:,} registros (esperado: >{MIN_RECORDS:,})"
+    return 0
 
 
 
-def validate_regions(df):
-    """ Valida os valores da coluna 'region' contra uma lista de regiões geográficas reconhecidas, garantindo a consistência dos dados regionais."""
+@validation_rule('nulls_year', 'error', "Sem null na coluna year", columns=('year',))
+def nulls_year_column(df):
+    """Linhas sem 'year', coluna crítica para análises temporais."""
 
-    logger.info("Verificando se há registros com região inválida...")
+    return df['year'].isna()
 
-    valid_regions = [
-        'Africa',
-        'Americas',
-        'Asia',
-        'Europe',
-        'Oceania'
-    ]
 
-    invalid_regions = df[~df['region'].isin(valid_regions)]
 
-    if len(invalid_regions) > 0:
-        found = invalid_regions['region'].unique().tolist()
-        logger.warning(f"⚠️  Regiões inválidas encontradas: {found}")
-    else:
-        logger.info("✅ Todas as linhas com region válido!")
+@validation_rule('regions', 'warning', "Todas as linhas com region válido", columns=('region',))
+def validate_regions(df):
+    """Linhas cuja 'region' não está na lista de regiões geográficas reconhecidas."""
 
+    mask = ~df['region'].isin(VALID_REGIONS)
 
-    return df
+    if not mask.any():
+        return mask
 
+    found = pd.unique(df.loc[mask, 'region'].astype(object)).tolist()
+    return mask, f"regiões inválidas: {found}"
 
 
-def validate_country_count(df):
-    """ Valida a contagem de países únicos, garantindo que o dataset contenha uma diversidade geográfica adequada para análises globais."""
 
-    logger.info("Validando contagem de países...")
+@validation_rule('country_count', 'warning', f"Mais de {MIN_COUNTRIES} países únicos", columns=('country',))
+def validate_country_count(df):
+    """Valida a contagem de países únicos, garantindo diversidade geográfica adequada para análises globais."""
 
     total_country = df['country'].nunique()
 
-    min_c_expected = 200
+    if total_country < MIN_COUNTRIES:
+        return 1, f"{total_country} países (esperado: >{MIN_COUNTRIES})"
+    return 0
 
-    if total_country < min_c_expected:
-        logger.warning(f"⚠️ Poucos países: {total_country} (esperado: >{min_c_expected})")
-    else:
-        logger.info(f"✅ Total de países únicos: {total_country}\n")
 
 
-    return df
+@validation_rule(
+    'generation_without_capacity', 'warning',
+    "Tem capacidade de energia instalada onde tem geração de energia",
+    columns=('electricity_generation_gwh', 'electricity_installed_capacity_mw')
+)
+def generation_without_instaled_capacity(df):
+    """
+    Linhas com geração de energia mas sem capacidade instalada.
 
+    É esperado que haja capacidade instalada sempre que houver geração; registros fora disso podem
+    indicar erros de entrada de dados que precisam ser investigados.
+    """
 
+    return (df['electricity_generation_gwh'] > 0) & (df['electricity_installed_capacity_mw'] <= 0)
 
-def generation_without_instaled_capacity(df):
+
+
+@validation_rule(
+    'per_capita_without_capacity', 'warning',
+    "Tem capacidade de energia instalada onde tem capacidade de energia per capta",
+    columns=('capacity_per_capita_w', 'electricity_installed_capacity_mw')
+)
+def per_capita_without_instaled_capacity(df):
+    """Linhas com capacidade per capta mas sem capacidade instalada."""
+
+    return (df['capacity_per_capita_w'] > 0) & (df['electricity_installed_capacity_mw'] <= 0)
+
+
+
+@validation_rule('composed_key', 'error', "Chave composta única. Sem duplicatas", columns=tuple(COMPOSED_KEY))
+def validate_composed_key(df):
     """
-    Compara a geração/capacidade de energia com a capacidade instalada para identificar inconsistências.
-    
-    Faz essas duas validações:
-    1. Verifica se existe capacidade de energia instalada onde há geração de energia.
-    2. Verifica se existe capacidade de energia instalada onde há capacidade de energia per capta.
+    Linhas repetidas na chave composta (country, year, technology, sub_technology, producer_type).
 
-    Ambas as validações são importantes para assegurar a qualidade dos dados, pois é esperado que haja capacidade instalada sempre que houver geração de energia ou capacidade per capta registrada.
-    Registros que apresentarem geração ou capacidade per capta sem capacidade instalada podem indicar erros de entrada de dados ou inconsistências que precisam ser investigadas.
-    O resultado dessas validações é registrado no log, destacando quaisquer inconsistências encontradas para posterior análise e correção.
+    Usa o hash de 64 bits calculado nas transformações (keys.duplicated_keys), com conferência exata
+    das chaves nas linhas de hash repetido.
+    """
 
-    Args:
-        df (pd.DataFrame): O DataFrame contendo os dados de energia renovável a serem investigados.
-    Returns:
-        pd.DataFrame: O mesmo DataFrame, sem modificações, mas com logs detalhados sobre as inconsistências encontradas entre geração/capacidade e capacidade instalada.    
-    """ 
+    mask = duplicated_keys(df)
+    if not mask.any():
+        return mask
 
+    groups = duplicate_groups(df)[COMPOSED_KEY].drop_duplicates()
+    example = {col: (value.item() if hasattr(value, 'item') else value) for col, value in groups.iloc[0].items()}
+    return mask, f"{len(groups)} chaves repetidas, ex.: {example}"
 
-    logger.info("Verificando se há geração de energia sem capacidade instalada...")
 
-    gen_w_cap = df[(df['electricity_generation_gwh'] > 0) & (df['electricity_installed_capacity_mw'] <= 0)]
-    
-    per_w_cap = df[(df['capacity_per_capita_w'] > 0) & (df['electricity_installed_capacity_mw'] <= 0)]
 
+def _evaluate(rule, df):
+    """Executa uma regra e normaliza o resultado em (contagem, índices de exemplo, detalhe)."""
 
-    if len(gen_w_cap) > 0:
-        logger.warning(f"⚠️  {len(gen_w_cap)} Registros não tem capacidade de energia instalada onde tem geração energia!")
-    else:
-        logger.info("✅ Tem capacidade de energia instalada onde tem geração de energia!")
+    result = rule.check(df)
+    detail = None
+    if isinstance(result, tuple):
+        result, detail = result
 
+    if isinstance(result, pd.Series):
+        positions = np.flatnonzero(result.to_numpy(dtype=bool, na_value=False))
+        sample = [int(i) if isinstance(i, (int, np.integer)) else str(i) for i in df.index[positions[:SAMPLE_SIZE]]]
+        return len(positions), sample, detail
+
+    return int(result), [], detail
 
-    if len(per_w_cap) > 0:
-        logger.warning(f"⚠️  {len(per_w_cap)} Registros não tem capacidade de energia instalada onde tem capacidade de energia per capta!")
-    else:
-        logger.info("✅ Tem capacidade de energia instalada onde tem capacidade de energia per capta!")
 
 
-    return df
+def validate_data(df, rules=None, fail_fast=VALIDATION_FAIL_FAST, report_path=None):
+    """
+    Executa todas as regras registradas e monta um relatório estruturado.
 
+    Cada regra é avaliada uma única vez como máscara booleana (ou contagem agregada) sobre o
+    DataFrame, sem gerar cópias filtradas. O relatório traz, por regra, a severidade, a contagem
+    de violações e alguns índices de linhas de exemplo.
 
+    Args:
+        df (pd.DataFrame): Dados transformados.
+        rules (list, opcional): Regras a executar; por padrão (None), VALIDATION_RULES. Uma lista vazia não executa nenhuma.
+        fail_fast (bool): Lança ValueError se alguma regra de severidade 'error' falhar.
+        report_path (Path, opcional): Grava o relatório neste arquivo (save_validation_report) antes
+            de um eventual ValueError do fail_fast, então a execução reprovada também deixa o relatório.
 
-def validate_composed_key(df):
-    """Verifica e reporta duplicatas na chave composta (country, year, technology, sub_technology, producer_type)."""
+    Returns:
+        dict: Relatório com 'rows', 'passed' e a lista 'rules'.
 
-    logger.info("Verificando se há duplicatas...")
+    Raises:
+        ValueError: Se `fail_fast` estiver ativo e houver falhas de severidade 'error'.
+    """
 
-    key = ['country', 'year', 'technology', 'sub_technology', 'producer_type']
+    logger.info("Iniciando validação...")
 
-    duplicates = df.duplicated(subset=key).sum()
+    results = []
+    for rule in VALIDATION_RULES if rules is None else rules:
+        missing = [col for col in rule.columns if col not in df.columns]
 
-    if duplicates > 0:
-        logger.error(f"❌ {duplicates} linhas duplicadas encontradas!")
-        logger.debug(f"\nExemplos:\n{df[df.duplicated(subset=key, keep=False)].head()}\n")
+        if missing:
+            logger.warning(f"⏭️  {rule.name}: ignorada, colunas ausentes {missing}")
+            results.append({'rule': rule.name, 'severity': rule.severity, 'status': 'skipped',
+                            'count': 0, 'sample_rows': [], 'detail': f"colunas ausentes: {missing}"})
+            continue
+
+        with measure(f"validate.{rule.name}", rows_in=len(df)) as record:
+            count, sample, detail = _evaluate(rule, df)
+            record['rows_out'] = count
+        status = 'failed' if count > 0 else 'passed'
+
+        if status == 'passed':
+            logger.info(f"✅ {rule.description}")
+        else:
+            message = f"{rule.name}: {count:,} violações" + (f" - {detail}" if detail else "")
+            if rule.severity == 'error':
+                logger.error(f"❌ {message}")
+            else:
+                logger.warning(f"⚠️  {message}")
+            if sample:
+                logger.debug(f"   Exemplos (índices): {sample}")
+
+        results.append({'rule': rule.name, 'severity': rule.severity, 'status': status,
+                        'count': count, 'sample_rows': sample, 'detail': detail})
+
+    errors = [r['rule'] for r in results if r['status'] == 'failed' and r['severity'] == 'error']
+    report = {'rows': len(df), 'passed': not errors, 'rules': results}
+
+    if report_path is not None:
+        save_validation_report(report, report_path)
+
+    if errors:
+        logger.error(f"❌ Validação com erros: {errors}")
+        if fail_fast:
+            raise ValueError(f"Validação falhou nas regras de severidade 'error': {errors}")
     else:
-        logger.info("✅ Chave composta única. Sem duplicatas!\n")
+        logger.info(f"✅ Validação concluída: {len(results)} regras sem erros\n")
+
+    return report
 
 
-    return df
+
+def save_validation_report(report, path=REPORT_PATH):
+    """Grava o relatório de validação em JSON."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"📁 Relatório de validação salvo em: {path}")
 
 
 
@@ -213,21 +320,16 @@ if __name__ == '__main__':
     logger.info("INICIANDO VALIDAÇÃO")
     logger.info("="*60)
 
-    df = pd.read_csv(INPUT_DIR)
+    df = read_frame(INPUT_DIR)
     logger.info(f"\n📊 Carregados {len(df)} registros")
 
+    report = validate_data(df, fail_fast=False, report_path=REPORT_PATH)
 
-    df = validate_columns(df)
-    validate_registers_count(df)
-    nulls_year_column(df)
-    validate_regions(df)
-    validate_country_count(df)
-    generation_without_instaled_capacity(df)
-    validate_composed_key(df)
-
-    df.to_csv(OUTPUT_PATH, index=False)
+    write_frame(df, OUTPUT_PATH)
 
     logger.info("="*60)
-    logger.info("✅ TRANSFORMAÇÕES TEXTUAIS CONCLUÍDAS")
+    logger.info("✅ VALIDAÇÃO CONCLUÍDA")
     logger.info(f"📁 Salvo em: {OUTPUT_PATH}")
-    logger.info("="*60)
\ No newline at end of file
+    logger.info("="*60)
+
+    sys.exit(0 if report['passed'] else 1)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# os módulos do pipeline se importam pelo nome (como em `python src/main.py`)
+sys.path[:0] = [str(ROOT), str(ROOT / 'src'), str(ROOT / 'benchmarks')]
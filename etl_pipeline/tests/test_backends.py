@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import apply_dtype_plan, dtype_plan
+from synthetic import generate_country_sheet
+from transform.backends import run_backend
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_numeric_data, fill_nan_numeric_data, round_metrics
+
+
+def pandas_reference(df):
+    for step in (normalize_text_columns, normalize_text_data, clean_text_data,
+                 clean_numeric_data, fill_nan_numeric_data, round_metrics):
+        df = step(df)
+    return df
+
+
+def edge_cases():
+    """Planilha sintética com os casos de borda das regras: nulos críticos, países inválidos, métricas zeradas e empates."""
+
+    df = generate_country_sheet(2_000, seed=7)
+
+    df.loc[0:9, 'Country'] = np.nan
+    df.loc[10:19, 'Year'] = np.nan
+    df.loc[20:29, 'Technology'] = np.nan
+    df.loc[30:39, 'Country'] = 'Multilateral'
+
+    metrics = df.columns[-6:]
+    df.loc[40:49, metrics] = 0.0
+    df.loc[50:59, metrics] = np.nan
+    df.loc[60:69, metrics[0]] = [0.125, 2.675, -0.005, 1.005, 0.0, 1e9 + 0.555, 3.14159, -2.5, 0.015, 7.0]
+
+    # índice não sequencial: os backends devem devolver os rótulos originais das linhas mantidas
+    df.index = df.index * 3 + 11
+    return df
+
+
+@pytest.mark.parametrize('backend', ['polars', 'duckdb'])
+@pytest.mark.parametrize('make_source', [edge_cases, lambda: generate_country_sheet(20_000, seed=3)])
+def test_backend_matches_pandas(backend, make_source):
+    pytest.importorskip(backend)
+
+    source = apply_dtype_plan(make_source())
+    expected = pandas_reference(source.copy())
+    result = run_backend(source.copy(), backend)
+
+    # categorias podem vir em outra ordem; valores, tipos, índice e ordem das linhas devem ser idênticos
+    pd.testing.assert_frame_equal(result, expected, check_categorical=False)
+
+
+@pytest.mark.parametrize('backend', ['polars', 'duckdb'])
+def test_backend_accepts_text_as_strings(backend):
+    pytest.importorskip(backend)
+
+    source = generate_country_sheet(1_000, seed=5)
+
+    expected = pandas_reference(apply_dtype_plan(source.copy()))
+    result = run_backend(apply_dtype_plan(source.copy(), dtype_plan(text_dtype='string[pyarrow]')), backend)
+
+    pd.testing.assert_frame_equal(result, expected, check_categorical=False)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        run_backend(generate_country_sheet(10), 'spark')
@@ -0,0 +1,21 @@
+import logging
+
+import config
+
+
+def test_connect_retry_is_logged_and_not_counted_as_wait(monkeypatch, caplog):
+    monkeypatch.setattr(config, 'DB_CONNECT_RETRIES', 1)
+    monkeypatch.setattr(config, 'DB_RETRY_BACKOFF', 0.3)
+    monkeypatch.delenv('DATABASE_URL_DOCKER', raising=False)
+    # porta sem servidor: a conexão é recusada na hora
+    monkeypatch.setenv('DATABASE_URL', 'postgresql://etl@127.0.0.1:1/renewable_energy')
+    before = config.pool_stats()
+
+    with caplog.at_level(logging.WARNING):
+        assert not config.check_connection()
+
+    after = config.pool_stats()
+    assert 'Falha ao conectar' in caplog.text
+    assert after['connect_retries'] == before['connect_retries'] + 1
+    # a pausa entre as tentativas faz parte da abertura da conexão, não da espera por conexão livre
+    assert after['wait_seconds_total'] - before['wait_seconds_total'] < 0.3
@@ -0,0 +1,60 @@
+import json
+import logging
+
+import pandas as pd
+
+import diagnostics
+from diagnostics import JsonFormatter, log_profile, preview, profile_frame
+
+
+class Unrenderable:
+    """Falha se alguém tentar convertê-lo em texto."""
+
+    def head(self, rows):
+        raise AssertionError('prévia renderizada com o DEBUG desligado')
+
+    tail = head
+
+
+def test_preview_not_rendered_when_debug_disabled(caplog):
+    caplog.set_level(logging.INFO)
+
+    logging.getLogger('test').debug("%s", preview(Unrenderable()))
+
+    assert caplog.records == []
+
+
+def test_profile_sampled():
+    df = pd.DataFrame({
+        'country': pd.Categorical(['Brazil', 'Chile'] * 50),
+        'year': pd.array([2000, None] * 50, dtype='Int16'),
+        'capacity_mw': [float(i) for i in range(100)],
+    })
+
+    profile = profile_frame(df, sample_rows=10)
+
+    assert profile['rows'] == 100 and profile['sample_rows'] == 10
+    assert profile['columns']['year']['min'] == 2000
+    assert 'min' not in profile['columns']['country']
+    assert profile == profile_frame(df, sample_rows=10)
+
+
+def test_profile_once_per_stage(caplog):
+    caplog.set_level(logging.DEBUG, logger='diagnostics')
+    diagnostics.reset_profiles()
+    df = pd.DataFrame({'capacity_mw': [1.0, None]})
+
+    assert log_profile('round_metrics', df)['columns']['capacity_mw']['nulls'] == 1
+    assert log_profile('round_metrics', df) is None
+    assert len(caplog.records) == 1
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.LogRecord('load', logging.INFO, __file__, 1, "carga %s", ('ok',), None)
+    record.stage = 'load_data'
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == 'carga ok'
+    assert entry['stage'] == 'load_data'
+    assert entry['level'] == 'INFO'
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from pandas.testing import assert_frame_equal
+
+import extract
+from main import combine_chunks
+from schema import SOURCE_COLUMNS, apply_dtype_plan
+from synthetic import generate_country_sheet
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract, 'DATA_RAW_DIR', tmp_path)
+    df = generate_country_sheet(12, seed=2).astype(object)
+    df = df.where(df.notna(), None)
+
+    book = Workbook()
+    sheet = book.active
+    sheet.title = 'Country'
+    # uma coluna sem cabeçalho no meio, uma linha vazia entre os dados e duas no fim da aba
+    sheet.append(list(SOURCE_COLUMNS)[:3] + [None] + list(SOURCE_COLUMNS)[3:])
+    for position, row in enumerate(df.itertuples(index=False)):
+        values = list(row)
+        sheet.append(values[:3] + ['nota' if position % 4 == 0 else None] + values[3:])
+        if position == 5:
+            sheet.append([None] * (len(values) + 1))
+    sheet.append([None] * (len(SOURCE_COLUMNS) + 1))
+    sheet.append([''] * (len(SOURCE_COLUMNS) + 1))
+
+    path = tmp_path / 'planilha.xlsx'
+    book.save(path)
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [5, 100])
+def test_chunks_match_read_excel(workbook, chunk_size):
+    full = apply_dtype_plan(pd.read_excel(workbook, sheet_name='Country'))
+
+    chunks = list(extract.extract_data_chunks(workbook.name, chunk_size=chunk_size, use_cache=False))
+
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    assert_frame_equal(combine_chunks(chunks), full, check_dtype=False, check_categorical=False)
+    assert len(full) == 13 and 'Unnamed: 3' in full.columns
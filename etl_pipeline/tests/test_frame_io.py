@@ -0,0 +1,42 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from frame_io import read_frame, read_input, write_frame
+
+
+def sample_frame():
+    # índice com lacunas, como depois de clean_text_data
+    return pd.DataFrame({
+        'country': pd.Categorical(['Brazil', 'Chile', 'Brazil']),
+        'year': pd.array([2000, None, 2020], dtype='Int16'),
+        'm49_code': pd.array([76, 152, 76], dtype='Int16'),
+        'electricity_generation_gwh': [1.5, 0.0, 2.25],
+        'key_hash': [11, -7, 3],
+    }, index=[0, 4, 9])
+
+
+def test_round_trip_keeps_dtypes_and_index(tmp_path):
+    df = sample_frame()
+    path = tmp_path / 'stage.arrow'
+
+    write_frame(df, path)
+
+    assert_frame_equal(read_frame(path), df)
+    assert not path.with_suffix('.tmp').exists()
+
+
+def test_read_selected_columns(tmp_path):
+    path = tmp_path / 'stage.arrow'
+    write_frame(sample_frame(), path)
+
+    df = read_frame(path, columns=['year', 'key_hash'])
+
+    assert list(df.columns) == ['year', 'key_hash']
+    assert str(df['year'].dtype) == 'Int16'
+
+
+def test_read_input_accepts_csv(tmp_path):
+    path = tmp_path / 'dados.csv'
+    sample_frame().to_csv(path, index=False)
+
+    assert len(read_input(path)) == 3
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from keys import compute_key_hash, duplicated_keys, duplicate_groups, keep_latest_release, merge_on_key
+from schema import COMPOSED_KEY, KEY_HASH_COLUMN
+
+
+def sample_frame(rows=500, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'country': rng.choice(['Brazil', 'Chile', 'Peru', None], rows),
+        'year': rng.choice([2020, 2021, 2022], rows),
+        'technology': rng.choice(['Solar', 'Wind'], rows),
+        'sub_technology': rng.choice(['On-grid', 'Off-grid', None], rows),
+        'producer_type': rng.choice(['On-grid', 'Off-grid'], rows),
+        'value': rng.random(rows),
+    })
+    return df.astype({'country': 'category', 'year': 'Int16'})
+
+
+def test_hash_ignores_dtypes():
+    df = sample_frame()
+    as_read = df.astype({'country': object, 'year': 'float64', 'technology': 'string[pyarrow]'})
+
+    assert (compute_key_hash(df).to_numpy() == compute_key_hash(as_read).to_numpy()).all()
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', False])
+@pytest.mark.parametrize('collide', [False, True])
+def test_duplicated_keys_is_exact(keep, collide):
+    df = sample_frame()
+    # com todos os hashes iguais, só a conferência das colunas separa as chaves
+    df[KEY_HASH_COLUMN] = 0 if collide else compute_key_hash(df)
+
+    expected = df.duplicated(subset=COMPOSED_KEY, keep=keep)
+
+    assert duplicated_keys(df, keep=keep).equals(expected)
+    assert len(duplicate_groups(df)) == df.duplicated(subset=COMPOSED_KEY, keep=False).sum()
+
+
+@pytest.mark.parametrize('collide', [False, True])
+def test_merge_on_key_matches_merge(collide):
+    left = sample_frame(seed=2).drop_duplicates(subset=COMPOSED_KEY)
+    right = sample_frame(seed=3).drop_duplicates(subset=COMPOSED_KEY)
+    if collide:
+        left[KEY_HASH_COLUMN], right[KEY_HASH_COLUMN] = 0, 0
+
+    merged = merge_on_key(left, right, how='outer', suffixes=('', '_db'))
+    expected = left.merge(right, on=COMPOSED_KEY, how='outer', suffixes=('', '_db'), indicator=True)
+
+    def pairs(frame):
+        keys = frame[COMPOSED_KEY].astype(object).astype(str).agg('|'.join, axis=1)
+        return sorted(zip(keys, frame['_merge'].astype(str), frame['value'].fillna(-1), frame['value_db'].fillna(-1)))
+
+    assert pairs(merged) == pairs(expected)
+
+
+def test_latest_release_wins_across_files_only():
+    key = {'country': 'Brazil', 'technology': 'Solar', 'sub_technology': None, 'producer_type': 'On-grid'}
+    df = pd.DataFrame([
+        {**key, 'year': 2020, 'value': 1.0, 'source_file': 'IRENA_2024.xlsx'},
+        {**key, 'year': 2020, 'value': 0.5, 'source_file': 'IRENA_2023.xlsx'},
+        {**key, 'year': 2019, 'value': 0.4, 'source_file': 'IRENA_2023.xlsx'},
+        # duplicata dentro da mesma edição: fica para a validação apontar
+        {**key, 'year': 2021, 'value': 2.0, 'source_file': 'IRENA_2024.xlsx'},
+        {**key, 'year': 2021, 'value': 2.1, 'source_file': 'IRENA_2024.xlsx'},
+    ]).astype({'year': 'Int16', 'source_file': 'category'})
+
+    result = keep_latest_release(df)
+
+    assert result.index.tolist() == [0, 2, 3, 4]
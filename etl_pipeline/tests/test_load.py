@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import load
+from config import get_engine
+from keys import add_key_hash, duplicated_keys
+from load import write_table
+from schema import apply_dtype_plan
+from synthetic import generate_country_sheet
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_fill_round_metrics
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # os testes de carga apagam e recriam tabelas: só rodam num banco descartável
+    url = os.getenv('ETL_TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('ETL_TEST_DATABASE_URL não definida')
+    monkeypatch.delenv('DATABASE_URL_DOCKER', raising=False)
+    monkeypatch.setenv('DATABASE_URL', url)
+    return get_engine()
+
+
+def final_frame(rows, seed):
+    df = apply_dtype_plan(generate_country_sheet(rows, seed=seed))
+    for step in (normalize_text_columns, normalize_text_data, clean_text_data, clean_fill_round_metrics, add_key_hash):
+        df = step(df)
+    return df[~duplicated_keys(df, keep='last').to_numpy()]
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+@pytest.mark.parametrize('method', ['copy', 'insert'])
+def test_empty_text_and_null_round_trip(engine, method):
+    df = pd.DataFrame({'id': [1, 2, 3], 'name': ['', np.nan, 'Brazil'], 'value': [1.5, np.nan, 0.0]})
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TEMP TABLE round_trip (id integer, name text, value double precision) ON COMMIT DROP"))
+        write_table(df, 'round_trip', conn, method=method)
+        rows = conn.execute(text("SELECT id, name, value FROM round_trip ORDER BY id")).all()
+
+    assert rows == [(1, '', 1.5), (2, None, None), (3, 'Brazil', 0.0)]
+
+
+def test_swap_is_undone_when_rollups_fail(engine, monkeypatch):
+    monkeypatch.setattr(load, 'MIRROR_ENABLED', False)
+    published = final_frame(2_000, seed=3)
+    load.load_data(published, mode='full')
+
+    def failing_rollups(*args, **kwargs):
+        raise RuntimeError('agregados indisponíveis')
+
+    monkeypatch.setattr(load, 'refresh_rollups', failing_rollups)
+    with pytest.raises(RuntimeError, match='agregados indisponíveis'):
+        load.load_data(final_frame(1_000, seed=4), mode='swap')
+
+    # nem a troca de nomes nem os agregados foram confirmados: o banco segue com a carga anterior
+    assert count(engine, 'fact_energy_generation') == len(published)
+    with engine.connect() as conn:
+        grouped = conn.execute(text("SELECT sum(row_count) FROM rollup_generation_region_year")).scalar()
+    assert grouped == len(published)
+
+
+def test_stream_requires_rows_in_written_order(engine, monkeypatch):
+    monkeypatch.setattr(load, 'MIRROR_ENABLED', False)
+    df = final_frame(1_000, seed=5)
+    parts = [df.iloc[:500], df.iloc[500:]]
+
+    with pytest.raises(ValueError, match='na ordem'):
+        load.load_stream(iter(parts), lambda parts: pd.concat(parts).iloc[::-1])
+
+    loaded = load.load_stream(iter(parts), lambda parts: pd.concat(parts))
+    assert count(engine, 'fact_energy_generation') == len(loaded) == len(df)
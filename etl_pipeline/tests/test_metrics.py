@@ -0,0 +1,55 @@
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from metrics import measure
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_outer_stage_keeps_peak_before_nested_stage(tracing):
+    with measure('outer') as outer:
+        block = bytearray(20 * 1024 * 1024)
+        del block
+        with measure('inner') as inner:
+            small = bytearray(1024)
+
+    assert inner['tracemalloc_peak_bytes'] < 1024 * 1024
+    assert outer['tracemalloc_peak_bytes'] >= 20 * 1024 * 1024
+
+
+def test_outer_stage_includes_nested_peak(tracing):
+    with measure('outer') as outer:
+        with measure('inner') as inner:
+            block = bytearray(20 * 1024 * 1024)
+            del block
+
+    assert inner['tracemalloc_peak_bytes'] >= 20 * 1024 * 1024
+    assert outer['tracemalloc_peak_bytes'] >= 20 * 1024 * 1024
+
+
+def test_stage_in_worker_thread_measures_only_its_own_cpu(tracing):
+    records = {}
+
+    def worker():
+        with measure('worker') as record:
+            time.sleep(0.3)
+        records['worker'] = record
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:  # CPU gasta pela thread principal enquanto a etapa dorme
+        pass
+    thread.join()
+
+    assert records['worker']['cpu_seconds'] < 0.1
+    # tracemalloc só mede etapas da thread principal
+    assert 'tracemalloc_peak_bytes' not in records['worker']
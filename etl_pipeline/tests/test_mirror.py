@@ -0,0 +1,70 @@
+import pytest
+
+import mirror
+from load import build_star_schema
+from schema import apply_dtype_plan
+from synthetic import generate_country_sheet
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_numeric_data, fill_nan_numeric_data, round_metrics
+
+
+@pytest.fixture
+def mirror_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror, 'DATA_MIRROR_DIR', tmp_path)
+    monkeypatch.setattr(mirror, 'MANIFEST_PATH', tmp_path / 'manifest.json')
+    return tmp_path
+
+
+def loaded_star(rows=5_000, seed=11):
+    df = apply_dtype_plan(generate_country_sheet(rows, seed=seed))
+    for step in (normalize_text_columns, normalize_text_data, clean_text_data,
+                 clean_numeric_data, fill_nan_numeric_data, round_metrics):
+        df = step(df)
+    star = build_star_schema(df)
+    star['fact_energy_generation']['fact_id'] = range(1, len(df) + 1)
+    return df, star
+
+
+def test_aggregations_match_final_frame(mirror_dir):
+    df, star = loaded_star()
+    mirror.write_mirror(star, 'full')
+
+    result = mirror.generation_by_region()
+    expected = df.groupby(df['region'].astype(str))['electricity_generation_gwh'].sum().reset_index()
+    assert result['region'].tolist() == expected['region'].tolist()
+    assert result['electricity_generation_gwh'].tolist() == pytest.approx(expected['electricity_generation_gwh'].tolist())
+
+    by_decade = mirror.aggregate('decade', year=[2000, 2001])
+    assert by_decade['decade'].tolist() == [2000]
+    assert by_decade['electricity_generation_gwh'].iloc[0] == pytest.approx(
+        df.loc[df['year'].isin([2000, 2001]), 'electricity_generation_gwh'].sum())
+
+
+def test_missing_mirror(mirror_dir):
+    with pytest.raises(FileNotFoundError):
+        mirror.energy_frame()
+
+
+def test_reader_uses_files_listed_in_manifest(mirror_dir):
+    _, first = loaded_star(seed=11)
+    mirror.write_mirror(first, 'full')
+    manifest = mirror.read_manifest()
+
+    # uma segunda carga (com outros IDs) grava arquivos novos; os da versão anterior continuam legíveis
+    _, second = loaded_star(rows=2_000, seed=12)
+    mirror.write_mirror(second, 'full')
+    assert all((mirror_dir / entry['file']).exists() for entry in manifest['tables'].values())
+
+    # uma terceira remove a primeira versão
+    mirror.write_mirror(second, 'full')
+    assert not any((mirror_dir / entry['file']).exists() for entry in manifest['tables'].values())
+    assert len(mirror.energy_frame()) == len(second['fact_energy_generation'])
+
+
+def test_fact_with_unknown_dimension_id(mirror_dir):
+    _, star = loaded_star(rows=1_000)
+    star['fact_energy_generation'].loc[0, 'country_id'] = 10_000
+    mirror.write_mirror(star, 'full')
+
+    with pytest.raises(ValueError, match='dim_country'):
+        mirror.energy_frame()
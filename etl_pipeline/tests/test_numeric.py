@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+from schema import apply_dtype_plan, dtype_plan
+from synthetic import generate_country_sheet
+from test_backends import edge_cases
+from transform.text import normalize_text_columns, normalize_text_data, clean_text_data
+from transform.numeric import clean_numeric_data, fill_nan_numeric_data, round_metrics, clean_fill_round_metrics
+
+
+@pytest.mark.parametrize('float_dtype', ['float64', 'float32'])
+@pytest.mark.parametrize('make_source', [edge_cases, lambda: generate_country_sheet(20_000, seed=3)])
+def test_fused_kernel_matches_three_steps(make_source, float_dtype):
+    df = apply_dtype_plan(make_source(), dtype_plan(float_dtype=float_dtype))
+    df = clean_text_data(normalize_text_data(normalize_text_columns(df)))
+
+    expected = round_metrics(fill_nan_numeric_data(clean_numeric_data(df.copy())))
+    result = clean_fill_round_metrics(df.copy())
+
+    # mesmas linhas (e rótulos), mesmos valores arredondados e mesma largura das métricas
+    pd.testing.assert_frame_equal(result, expected)
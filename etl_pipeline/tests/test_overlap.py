@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from overlap import overlapped
+
+
+def test_items_keep_order():
+    steps = [('read', None), ('double', lambda x: x * 2)]
+
+    with overlapped(range(50), steps, depth=2) as items:
+        assert list(items) == [x * 2 for x in range(50)]
+
+
+def test_failure_reaches_consumer():
+    def fail_on_three(x):
+        if x == 3:
+            raise RuntimeError('bloco 3')
+        return x
+
+    received = []
+    with pytest.raises(RuntimeError, match='bloco 3'):
+        with overlapped(range(10), [('read', None), ('check', fail_on_three)]) as items:
+            for item in items:
+                received.append(item)
+
+    assert received == [0, 1, 2]
+
+
+def test_consumer_failure_stops_producers():
+    produced = []
+    closed = threading.Event()
+
+    def source():
+        try:
+            for x in range(1_000):
+                produced.append(x)
+                yield x
+        finally:
+            closed.set()
+
+    with pytest.raises(ValueError):
+        with overlapped(source(), [('read', None), ('pass', lambda x: x)], depth=2) as items:
+            for item in items:
+                time.sleep(0.01)
+                if item == 2:
+                    raise ValueError('carga falhou')
+
+    # backpressure: além do que o consumidor recebeu, só o que cabe nas filas e nas etapas em andamento
+    assert closed.is_set()
+    assert len(produced) <= 3 + 2 * 2 + 2
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from validation import VALIDATION_RULES, validate_data
+
+
+def test_empty_rule_list_runs_nothing():
+    # sem colunas e sem linhas: columns e empty_dataset reprovariam com fail_fast
+    report = validate_data(pd.DataFrame(), rules=[], fail_fast=True)
+
+    assert report['rules'] == []
+    assert report['passed']
+
+
+def test_runs_only_the_given_rules():
+    rules = [rule for rule in VALIDATION_RULES if rule.name == 'nulls_year']
+
+    report = validate_data(pd.DataFrame({'year': [2000, None]}), rules=rules, fail_fast=False)
+
+    assert [r['rule'] for r in report['rules']] == ['nulls_year']
+    assert report['rules'][0]['count'] == 1
+
+    with pytest.raises(ValueError, match='nulls_year'):
+        validate_data(pd.DataFrame({'year': [2000, None]}), rules=rules, fail_fast=True)